@@ -5,9 +5,14 @@ from dotenv import load_dotenv
 from flask import Flask, request, jsonify
 from flask_cors import CORS
 from lexer.tokenizer import Tokenizer
-from parser.parser import CParser
+from lexer.line_index import LineIndex
+from parser.parser import CParser, DEFAULT_MAX_ERRORS
+from parser.trace import TRACE_LEVELS
+from parser.ast_cache import ASTCache, DEFAULT_CACHE_SIZE
 from semantic.semantic_analyzer import SemanticAnalyzer
 from icg.icg_generator import ICGGenerator
+from icg.cfg import ControlFlowGraph
+from icg.optimizer import LocalValueNumbering, OPTIMIZE_LEVELS
 
 load_dotenv()
 
@@ -19,6 +24,15 @@ CORS(app, origins=cors_origins, supports_credentials=False)
 
 tokenizer = Tokenizer()
 
+# Trees of /analyze requests that asked for stubs or references, for /ast/expand and /references
+# (and trees of /parse and /analyze requests that had to be cut at MAX_AST_DEPTH)
+ast_cache = ASTCache(int(os.getenv('AST_CACHE_SIZE', DEFAULT_CACHE_SIZE)))
+
+# A serialized AST nests at most this many levels: to_dict() and the JSON encoder recurse once
+# per level, and a long operator chain nests one level per operator. Deeper trees come back cut
+# at this depth with "astTruncated" set; their stubs expand through /ast/expand, capped the same
+MAX_AST_DEPTH = int(os.getenv('MAX_AST_DEPTH', 200))
+
 
 @app.route('/')
 def home():
@@ -26,7 +40,7 @@ def home():
         'message': 'C Parser Visualizer API',
         'phase':   'Phase 4 — Intermediate Code Generation',
         'status':  'running',
-        'endpoints': ['/tokenize', '/parse', '/analyze', '/icg']
+        'endpoints': ['/tokenize', '/parse', '/analyze', '/icg', '/ast/expand', '/references']
     })
 
 
@@ -37,12 +51,60 @@ def tokenize():
         data = request.get_json()
         if not data or 'code' not in data:
             return jsonify({'error': 'Missing "code" field'}), 400
-        tokens = tokenizer.tokenize_to_dict(data['code'])
+        code   = data['code']
+        tokens = tokenizer.tokenize_stream(code).to_dicts(LineIndex(code))
         return jsonify(tokens), 200
     except Exception as e:
         return jsonify({'error': f'Tokenization failed: {str(e)}'}), 500
 
 
+def _trace_param(data):
+    # Optional "trace" field: off / statements / full (default full, as before)
+    level = data.get('trace', 'full')
+    if level not in TRACE_LEVELS:
+        return None
+    return level
+
+
+def _recovery_params(data):
+    # Optional "recover" (bool, default false) and "max_errors" (positive int) fields —
+    # returns (recover, max_errors), or None if either is invalid
+    recover    = data.get('recover', False)
+    max_errors = data.get('max_errors', DEFAULT_MAX_ERRORS)
+    if not isinstance(recover, bool):
+        return None
+    if not isinstance(max_errors, int) or isinstance(max_errors, bool) or max_errors < 1:
+        return None
+    return recover, max_errors
+
+
+ICG_VIEWS = ['tac', 'quadruples']
+
+RECOVERY_PARAM_ERROR = '"recover" must be true or false and "max_errors" a positive integer'
+
+
+def _depth_param(data, field):
+    # Optional non-negative int (depth, page size) — returns (ok, value); None means unlimited
+    depth = data.get(field)
+    if depth is None:
+        return True, None
+    if not isinstance(depth, int) or isinstance(depth, bool) or depth < 0:
+        return False, None
+    return True, depth
+
+
+def _over_depth_limit(tree, ast_depth):
+    # Whether serializing tree ast_depth levels deep (None = in full) would pass MAX_AST_DEPTH
+    # — a parsed tree's depth bound answers without a walk unless the tree may be that deep
+    return (ast_depth is None or ast_depth > MAX_AST_DEPTH) and tree.deeper_than(MAX_AST_DEPTH)
+
+
+def _flag_param(data, field):
+    # Optional bool flag, default false — None if it is not a bool
+    flag = data.get(field, False)
+    return flag if isinstance(flag, bool) else None
+
+
 @app.route('/parse', methods=['POST'])
 def parse():
     # Lexical + Syntax analysis — returns tokens, AST, errors, and trace
@@ -51,24 +113,46 @@ def parse():
         if not data or 'code' not in data:
             return jsonify({'error': 'Missing "code" field'}), 400
 
-        code = data['code']
+        code  = data['code']
+        trace = _trace_param(data)
+        if trace is None:
+            return jsonify({'error': f'"trace" must be one of: {", ".join(TRACE_LEVELS)}'}), 400
 
-        token_dicts = tokenizer.tokenize_to_dict(code)
+        recovery = _recovery_params(data)
+        if recovery is None:
+            return jsonify({'error': RECOVERY_PARAM_ERROR}), 400
+        recover, max_errors = recovery
 
-        parser_result = CParser(token_dicts).parse()
+        stream = tokenizer.tokenize_stream(code)
 
-        ast        = parser_result.get('ast')
+        parser_result = CParser(stream, trace=trace, recover=recover, max_errors=max_errors).parse_tree()
+
+        tree       = parser_result.get('tree')
         parse_err  = parser_result.get('error')
+        parse_errs = parser_result.get('errors', [])
         trace      = parser_result.get('trace', [])
 
-        errors = [parse_err['message']] if parse_err else []
+        errors = [e['message'] for e in parse_errs]
+
+        # A tree too deep to serialize whole is cached, so its stubs can be expanded
+        ast       = None
+        ast_id    = None
+        truncated = tree is not None and _over_depth_limit(tree, None)
+        if truncated:
+            ast_id, cached = ast_cache.put(tree)
+            ast = cached.to_dict(MAX_AST_DEPTH)
+        elif tree is not None:
+            ast = tree.to_dict()
 
         return jsonify({
-            'tokens':     token_dicts,
-            'ast':        ast,
-            'parseError': parse_err,
-            'errors':     errors,
-            'trace':      trace,
+            'tokens':       stream.to_dicts(LineIndex(code)),
+            'ast':          ast,
+            'astId':        ast_id,
+            'astTruncated': truncated,
+            'parseError':   parse_err,
+            'parseErrors':  parse_errs,
+            'errors':       errors,
+            'trace':        trace,
         }), 200
 
     except Exception as e:
@@ -83,55 +167,167 @@ def analyze():
         if not data or 'code' not in data:
             return jsonify({'error': 'Missing "code" field'}), 400
 
-        code = data['code']
+        code  = data['code']
+        trace = _trace_param(data)
+        if trace is None:
+            return jsonify({'error': f'"trace" must be one of: {", ".join(TRACE_LEVELS)}'}), 400
+
+        recovery = _recovery_params(data)
+        if recovery is None:
+            return jsonify({'error': RECOVERY_PARAM_ERROR}), 400
+        recover, max_errors = recovery
+
+        # Optional "ast_depth": serialize only that many levels below the root; deeper nodes
+        # come back as stubs ({id, childCount, collapsed}) expandable through /ast/expand.
+        # Optional "ast_page_size": statement lists longer than this end in a "More" stub
+        ok, ast_depth = _depth_param(data, 'ast_depth')
+        if not ok:
+            return jsonify({'error': '"ast_depth" must be a non-negative integer'}), 400
+        ok, page_size = _depth_param(data, 'ast_page_size')
+        if not ok or page_size == 0:
+            return jsonify({'error': '"ast_page_size" must be a positive integer'}), 400
+        # Optional "cfg": add the control-flow graph of the generated code
+        want_cfg = _flag_param(data, 'cfg')
+        if want_cfg is None:
+            return jsonify({'error': '"cfg" must be true or false'}), 400
+        # Optional "references": keep the cross-reference index for /references
+        want_refs = _flag_param(data, 'references')
+        if want_refs is None:
+            return jsonify({'error': '"references" must be true or false'}), 400
 
         # Phase 1: Lexical analysis
-        token_dicts = tokenizer.tokenize_to_dict(code)
+        stream = tokenizer.tokenize_stream(code)
 
-        # Phase 2: Syntax analysis
-        parser_result = CParser(token_dicts).parse()
-        ast       = parser_result.get('ast')
-        parse_err = parser_result.get('error')
-        trace     = parser_result.get('trace', [])
+        # Phase 2: Syntax analysis — the typed tree feeds phases 3 and 4, the dict is only for JSON.
+        # With "recover", the tree holds every statement that parsed, so one request reports
+        # all syntax errors along with the semantic errors and code for the rest
+        parser_result = CParser(stream, trace=trace, recover=recover, max_errors=max_errors).parse_tree()
+        tree       = parser_result.get('tree')
+        parse_err  = parser_result.get('error')
+        parse_errs = parser_result.get('errors', [])
+        trace      = parser_result.get('trace', [])
 
-        syntax_errors = [parse_err['message']] if parse_err else []
+        syntax_errors = [e['message'] for e in parse_errs]
 
         # Phase 3: Semantic analysis (only if AST was produced)
         symbol_table = []
         semantic_errors = []
+        xref = None
 
-        if ast:
+        if tree:
             analyzer = SemanticAnalyzer()
-            sem_result = analyzer.analyze(ast)
+            sem_result = analyzer.analyze(tree)
             symbol_table = sem_result.get('symbol_table', [])
             semantic_errors = sem_result.get('semantic_errors', [])
+            xref = analyzer.xref
 
         # Phase 4: Intermediate Code Generation (only if AST was produced)
         tac = []
         quadruples = []
-
-        if ast:
-            icg = ICGGenerator()
-            icg_result = icg.generate(ast)
-            tac = icg_result.get('tac', [])
-            quadruples = icg_result.get('quadruples', [])
-
-        return jsonify({
-            'tokens':          token_dicts,
+        cfg = None
+
+        if tree:
+            ir = ICGGenerator().generate_ir(tree)
+            tac = ir.tac()
+            quadruples = ir.quadruples()
+            if want_cfg:
+                cfg = ControlFlowGraph.build(ir).to_dict()
+
+        # The tree is cached under "astId" only when a follow-up request needs it: stubs for
+        # /ast/expand (a depth or page limit), or "references" — only then is the
+        # cross-reference index kept too. The full tree is only built without a limit
+        ast       = None
+        ast_id    = None
+        truncated = False
+        if tree:
+            if _over_depth_limit(tree, ast_depth):
+                ast_depth, truncated = MAX_AST_DEPTH, True
+            limited = ast_depth is not None or page_size is not None
+            if limited or want_refs:
+                ast_id, cached = ast_cache.put(tree, page_size, xref if want_refs else None)
+            ast = cached.to_dict(ast_depth) if limited else tree.to_dict()
+
+        response = {
+            'tokens':          stream.to_dicts(LineIndex(code)),
             'ast':             ast,
+            'astId':           ast_id,
+            'astTruncated':    truncated,
             'parseError':      parse_err if parse_err else None,
+            'parseErrors':     parse_errs,
             'syntax_errors':   syntax_errors,
             'symbol_table':    symbol_table,
             'semantic_errors': semantic_errors,
             'tac':             tac,
             'quadruples':      quadruples,
             'trace':           trace,
-        }), 200
+        }
+        if want_cfg:
+            response['cfg'] = cfg
+        return jsonify(response), 200
 
     except Exception as e:
         return jsonify({'error': f'Analysis failed: {str(e)}'}), 500
 
 
+@app.route('/ast/expand', methods=['POST'])
+def expand_ast():
+    # Subtree of a collapsed stub from an /analyze (or cut /parse) response, itself cut at
+    # "depth" (optional, at most MAX_AST_DEPTH); for a "More" stub, the next page of statements
+    try:
+        data = request.get_json()
+        if not data or 'astId' not in data or 'nodeId' not in data:
+            return jsonify({'error': 'Missing "astId" or "nodeId" field'}), 400
+
+        ok, depth = _depth_param(data, 'depth')
+        if not ok:
+            return jsonify({'error': '"depth" must be a non-negative integer'}), 400
+
+        ast_id = data['astId']
+        cached = ast_cache.get(ast_id) if isinstance(ast_id, str) else None
+        if cached is None:
+            return jsonify({'error': 'Unknown or expired "astId" — analyze the code again'}), 404
+
+        depth = MAX_AST_DEPTH if depth is None else min(depth, MAX_AST_DEPTH)
+        node  = cached.expand(data['nodeId'], depth)
+        if node is None:
+            return jsonify({'error': f'Unknown "nodeId" {data["nodeId"]!r}'}), 404
+
+        return jsonify({'astId': ast_id, 'node': node}), 200
+
+    except Exception as e:
+        return jsonify({'error': f'Expand failed: {str(e)}'}), 500
+
+
+@app.route('/references', methods=['POST'])
+def references():
+    # Declaration and uses of one symbol of an /analyze response — picked by "symbolId" (the
+    # symbol table entry's "id") or by a source "offset" inside its declaration or a use
+    try:
+        data = request.get_json()
+        if not data or 'astId' not in data or ('symbolId' not in data and 'offset' not in data):
+            return jsonify({'error': 'Missing "astId", or both "symbolId" and "offset"'}), 400
+
+        field = 'symbolId' if 'symbolId' in data else 'offset'
+        ok, value = _depth_param(data, field)
+        if not ok or value is None:
+            return jsonify({'error': f'"{field}" must be a non-negative integer'}), 400
+
+        ast_id = data['astId']
+        cached = ast_cache.get(ast_id) if isinstance(ast_id, str) else None
+        if cached is None or cached.xref is None:
+            return jsonify({'error': 'Unknown or expired "astId" — analyze the code again with '
+                                     '"references": true'}), 404
+
+        symbol_id = value if field == 'symbolId' else cached.xref.symbol_at(value)
+        refs      = None if symbol_id is None else cached.xref.references(symbol_id)
+        if refs is None:
+            return jsonify({'error': f'No symbol for "{field}" {value}'}), 404
+
+        return jsonify({'astId': ast_id, **refs}), 200
+
+    except Exception as e:
+        return jsonify({'error': f'References failed: {str(e)}'}), 500
+
 
 @app.route('/icg', methods=['POST'])
 def icg():
@@ -143,15 +339,36 @@ def icg():
 
         code = data['code']
 
+        recovery = _recovery_params(data)
+        if recovery is None:
+            return jsonify({'error': RECOVERY_PARAM_ERROR}), 400
+        recover, max_errors = recovery
+
+        # Optional "views": which renderings of the generated code to return (default both)
+        views = data.get('views', ICG_VIEWS)
+        if not isinstance(views, list) or not views or any(v not in ICG_VIEWS for v in views):
+            return jsonify({'error': f'"views" must be a non-empty list of: {", ".join(ICG_VIEWS)}'}), 400
+        want_cfg = _flag_param(data, 'cfg')
+        if want_cfg is None:
+            return jsonify({'error': '"cfg" must be true or false'}), 400
+
+        # Optional "optimize": off (default) / fold / lvn — see icg/optimizer.py
+        optimize = data.get('optimize', 'off')
+        if optimize not in OPTIMIZE_LEVELS:
+            return jsonify({'error': f'"optimize" must be one of: {", ".join(OPTIMIZE_LEVELS)}'}), 400
+
         # Phase 1: Lexical analysis
-        token_dicts = tokenizer.tokenize_to_dict(code)
+        stream = tokenizer.tokenize_stream(code)
 
-        # Phase 2: Syntax analysis
-        parser_result = CParser(token_dicts).parse()
-        ast       = parser_result.get('ast')
-        parse_err = parser_result.get('error')
+        # Phase 2: Syntax analysis (the trace is not part of this response)
+        parser_result = CParser(stream, trace='off', recover=recover, max_errors=max_errors).parse_tree()
+        tree       = parser_result.get('tree')
+        parse_err  = parser_result.get('error')
+        parse_errs = parser_result.get('errors', [])
 
-        if parse_err:
+        # Without recovery a syntax error means no code; with it, code is generated for
+        # the statements that parsed and the errors are returned alongside
+        if parse_err and not recover:
             return jsonify({
                 'error': parse_err['message'],
                 'parseError': parse_err,
@@ -159,19 +376,26 @@ def icg():
                 'quadruples': [],
             }), 200
 
-        # Phase 4: ICG
-        tac = []
-        quadruples = []
-        if ast:
-            icg_gen = ICGGenerator()
-            icg_result = icg_gen.generate(ast)
-            tac = icg_result.get('tac', [])
-            quadruples = icg_result.get('quadruples', [])
-
-        return jsonify({
-            'tac':        tac,
-            'quadruples': quadruples,
-        }), 200
+        # Phase 4: ICG — only the requested views are rendered from the instruction buffer;
+        # with "cfg", its basic blocks, dominators and loops are added (block start/end index
+        # the unoptimized TAC list), and with "optimize", the same views of the optimized code
+        # under "optimized" along with a report of what was removed
+        response = {view: [] for view in views}
+        if want_cfg:
+            response['cfg'] = None
+        if optimize != 'off':
+            response['optimized'] = None
+        if tree:
+            ir = ICGGenerator().generate_ir(tree)
+            response.update(ir.render(views))
+            if want_cfg:
+                response['cfg'] = ControlFlowGraph.build(ir).to_dict()
+            if optimize != 'off':
+                optimizer = LocalValueNumbering(optimize)
+                response['optimized'] = {**optimizer.optimize(ir).render(views), 'report': optimizer.report()}
+        if recover:
+            response['parseErrors'] = parse_errs
+        return jsonify(response), 200
 
     except Exception as e:
         return jsonify({'error': f'ICG failed: {str(e)}'}), 500
@@ -184,5 +408,5 @@ if __name__ == '__main__':
 
     print("🚀 Starting C Parser Visualizer API — Phase 4")
     print(f"📍 Running on http://{host}:{port}")
-    print("📝 Endpoints: /tokenize  /parse  /analyze  /icg")
+    print("📝 Endpoints: /tokenize  /parse  /analyze  /icg  /ast/expand  /references")
     app.run(debug=debug, host=host, port=port)
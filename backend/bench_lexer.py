@@ -0,0 +1,235 @@
+# Lexer benchmark — run from backend/ folder: python bench_lexer.py [lines]
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, '.')
+
+from lexer.tokenizer import Tokenizer, Token
+from lexer.token_types import KEYWORD, IDENTIFIER, UNKNOWN, WHITESPACE, COMMENT, KEYWORDS
+
+SNIPPET = '''int a = 10;
+float b = 3.14;
+// running total
+if (a <= b) {
+    printf("%d items\\n", a);
+}
+while (b != 0) {
+    b = b - 1; /* countdown */
+}
+scanf("%d", &a);
+int result = a + b * 2;'''
+
+
+def make_source(lines):
+    # Repeat the snippet until the source has roughly `lines` lines
+    per = SNIPPET.count('\n') + 1
+    return '\n'.join([SNIPPET] * max(1, lines // per))
+
+
+def legacy_tokenize(tokenizer, code):
+    # Line-by-line scanner the lexer used before the single-pass engine (baseline for comparison)
+    tokens = []
+    for line_num, line in enumerate(code.split('\n'), start=1):
+        position = 0
+        while position < len(line):
+            match = tokenizer.master_regex.match(line, position)
+            if match and match.lastgroup != 'MISMATCH':
+                token_type  = None
+                token_value = match.group()
+                for i, (pattern_type, _) in enumerate(tokenizer.token_patterns):
+                    if match.group(f'{pattern_type}{i}'):
+                        token_type = pattern_type
+                        break
+                if token_type not in (WHITESPACE, COMMENT):
+                    if token_type == IDENTIFIER and token_value in KEYWORDS:
+                        token_type = KEYWORD
+                    tokens.append(Token(token_type, token_value, line_num))
+                position = match.end()
+            else:
+                ch = line[position]
+                if ch not in (' ', '\t', '\n', '\r'):
+                    tokens.append(Token(UNKNOWN, ch, line_num))
+                position += 1
+    return tokens
+
+
+def best_of(fn, repeat=3):
+    # Return (best wall time, last result) over `repeat` runs
+    best, result = None, None
+    for _ in range(repeat):
+        start  = time.perf_counter()
+        result = fn()
+        took   = time.perf_counter() - start
+        best   = took if best is None else min(best, took)
+    return best, result
+
+
+def bytes_per_token(fn):
+    # Peak bytes allocated by fn() divided by the number of tokens it returns
+    tracemalloc.start()
+    result = fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / max(1, len(result))
+
+
+def streamed_peak(t, lines):
+    # Peak traced memory while counting tokens from a lazily generated source
+    per = SNIPPET.count('\n') + 1
+
+    def chunks():
+        for _ in range(max(1, lines // per)):
+            yield SNIPPET + '\n'
+
+    tracemalloc.start()
+    count = sum(1 for _ in t.iter_tokens(chunks()))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return count, peak
+
+
+def file_pipelines(t, code):
+    # Time and peak memory of read+decode+tokenize versus tokenize_file() on the same file
+    fd, path = tempfile.mkstemp(suffix='.c')
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        f.write(code)
+
+    def read_and_tokenize():
+        with open(path, encoding='utf-8') as f:
+            return t.tokenize_stream(f.read())
+
+    try:
+        for name, fn in (("read + tokenize_stream()", read_and_tokenize),
+                         ("tokenize_file() (mmap)", lambda: t.tokenize_file(path))):
+            seconds, stream = best_of(fn)
+            tracemalloc.start()
+            fn()
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            print(f"{name:28} | {seconds * 1000:9.1f} ms | peak {peak / 1024:9.1f} KiB")
+    finally:
+        os.remove(path)
+
+
+def incremental_edits(t, lines=50_000, edits=20):
+    # Average latency of one-character edits: full re-tokenize versus IncrementalLexer
+    import random
+    from lexer.incremental import IncrementalLexer
+
+    inc    = IncrementalLexer(t)
+    code   = make_source(lines)
+    stream = inc.tokenize(code)
+    rng    = random.Random(0)
+    full_s = incr_s = 0.0
+    same   = True
+
+    for _ in range(edits):
+        offset = rng.randrange(len(code))
+        text   = rng.choice('abx1 ;+')
+        new    = code[:offset] + text + code[offset + 1:]
+
+        start  = time.perf_counter()
+        full   = t.tokenize_stream(new)
+        full_s += time.perf_counter() - start
+
+        start  = time.perf_counter()
+        stream = inc.apply_edit(stream, offset, 1, text)
+        incr_s += time.perf_counter() - start
+
+        same = same and stream.types == full.types and stream.lines == full.lines \
+            and stream.starts == full.starts and stream.ends == full.ends
+        code = new
+
+    print(f"{'full re-tokenize':28} | {full_s / edits * 1000:9.2f} ms / edit")
+    print(f"{'IncrementalLexer':28} | {incr_s / edits * 1000:9.2f} ms / edit")
+    print(f"\nIdentical output: {same}   speedup: {full_s / incr_s:.1f}x")
+
+
+def engines(code):
+    # Throughput of the regex and DFA engines, then adversarial inputs that make regex backtrack
+    regex, dfa = Tokenizer(engine='regex'), Tokenizer(engine='dfa')
+    for name, t in (("regex engine", regex), ("dfa engine", dfa)):
+        seconds, stream = best_of(lambda: t.tokenize_stream(code))
+        report(name, seconds, len(stream))
+
+    print()
+    for label, unit in (('unterminated /*', '/* '), ('unterminated "', '"\\')):
+        for count in (2_000, 8_000):
+            bad = unit * count
+            regex_s, _ = best_of(lambda: regex.tokenize_stream(bad), repeat=1)
+            dfa_s, _   = best_of(lambda: dfa.tokenize_stream(bad), repeat=1)
+            print(f"{label + ' x' + format(count, ','):28} | regex {regex_s * 1000:9.1f} ms | dfa {dfa_s * 1000:7.1f} ms")
+
+
+def batch(t, submissions=2_000):
+    # Many small independent sources (e.g. student submissions): serial versus process pool
+    import os
+    sources = [make_source(60) for _ in range(submissions)]
+    serial_s, serial = best_of(lambda: [t.tokenize_stream(c) for c in sources], repeat=1)
+    workers = os.cpu_count() or 1
+    pool_s, pooled = best_of(lambda: t.tokenize_many(sources, workers=max(2, workers)), repeat=1)
+    count = sum(len(s) for s in serial)
+    report(f"serial x{submissions:,}", serial_s, count)
+    report(f"tokenize_many ({max(2, workers)} workers)", pool_s, count)
+    print(f"Identical output: {all(a.types == b.types and a.starts == b.starts for a, b in zip(serial, pooled))}"
+          f"   ({workers} CPU(s) available)")
+
+
+def report(name, seconds, count):
+    print(f"{name:28} | {seconds * 1000:9.1f} ms | {count / seconds:12,.0f} tokens/sec")
+
+
+def main():
+    lines = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    code  = make_source(lines)
+    t     = Tokenizer()
+
+    print("=" * 70)
+    print(f"Lexer benchmark — {code.count(chr(10)) + 1:,} lines, {len(code):,} chars")
+    print("=" * 70)
+
+    legacy_s, legacy = best_of(lambda: legacy_tokenize(t, code))
+    report("legacy line-by-line", legacy_s, len(legacy))
+
+    single_s, single = best_of(lambda: t.tokenize(code))
+    report("single-pass (lastgroup)", single_s, len(single))
+
+    same = [(a.type, a.value, a.line) for a in legacy] == \
+           [(b.type, b.value, b.line) for b in single]
+    print(f"\nIdentical output: {same}   speedup: {legacy_s / single_s:.2f}x")
+
+    stream_s, stream = best_of(lambda: t.tokenize_stream(code))
+    report("single-pass (TokenStream)", stream_s, len(stream))
+
+    print("\nMemory per token (peak, includes scan temporaries)")
+    print(f"{'Token objects':28} | {bytes_per_token(lambda: t.tokenize(code)):7.1f} bytes")
+    print(f"{'token dicts':28} | {bytes_per_token(lambda: [tok.to_dict() for tok in t.tokenize(code)]):7.1f} bytes")
+    print(f"{'TokenStream':28} | {bytes_per_token(lambda: t.tokenize_stream(code)):7.1f} bytes")
+
+    print("\nPeak memory, whole input")
+    tracemalloc.start()
+    count = len(t.tokenize(code))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{'tokenize() list':28} | {peak / 1024:9.1f} KiB | {count:,} tokens")
+    count, peak = streamed_peak(t, lines)
+    print(f"{'iter_tokens() streamed':28} | {peak / 1024:9.1f} KiB | {count:,} tokens")
+
+    print("\nTokenizing from disk")
+    file_pipelines(t, code)
+
+    print("\nScanning engines")
+    engines(code)
+
+    print("\nBatch tokenization")
+    batch(t)
+
+    print("\nOne-character edits, 50k-line file")
+    incremental_edits(t)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+# Parser benchmark — run from backend/ folder: python bench_parser.py [statements]
+import sys
+import time
+
+sys.path.insert(0, '.')
+
+from lexer.tokenizer import Tokenizer
+from parser.parser import CParser
+from parser.trace import TRACE_LEVELS
+
+SNIPPET = '''int a{n} = 10;
+float b{n} = 3.14;
+if (a{n} <= b{n}) {{
+    printf("%d items", a{n});
+}} else {{
+    a{n} = a{n} + 1;
+}}
+while (b{n} != 0) {{
+    b{n} = b{n} - 1;
+    a{n}++;
+}}
+scanf("%d", &a{n});
+int r{n} = (a{n} + b{n}) * 2 - a{n} / 3;'''
+
+
+def make_source(statements):
+    # Each snippet holds 7 top-level statements
+    return '\n'.join(SNIPPET.format(n=i) for i in range(max(1, statements // 7)))
+
+
+def best_of(fn, repeat=3):
+    # Return (best wall time, last result) over `repeat` runs
+    best, result = None, None
+    for _ in range(repeat):
+        start  = time.perf_counter()
+        result = fn()
+        took   = time.perf_counter() - start
+        best   = took if best is None else min(best, took)
+    return best, result
+
+
+def chain_source(terms):
+    # One long arithmetic chain cycling through + - * /
+    return ' '.join(f'a{i} {"+-*/"[i % 4]}' for i in range(terms)) + ' z'
+
+
+def expression_benchmark(t):
+    # Expression engine alone (no statements, no to_dict) — long chains and deep parentheses
+    print(f"\n{'expression':28} | {'parse':>12} | {'per operand':>12}")
+    print("-" * 60)
+    for terms in (1_000, 10_000, 50_000):
+        stream  = t.tokenize_stream(chain_source(terms))
+        took, _ = best_of(lambda: CParser(stream, trace='off')._parse_expr(), repeat=5)
+        print(f"{f'chain of {terms:,} operands':28} | {took * 1000:9.1f} ms | {took / terms * 1e6:9.2f} us")
+    for depth in (1_000, 100_000):
+        stream  = t.tokenize_stream('(' * depth + 'a + 1' + ')' * depth)
+        took, _ = best_of(lambda: CParser(stream, trace='off')._parse_expr(), repeat=5)
+        print(f"{f'{depth:,} nested parentheses':28} | {took * 1000:9.1f} ms |")
+
+    # Left-nested comparisons ((a0 < a1) < a2) ... — linear now that no node is serialized mid-parse
+    for depth in (100, 1_000, 10_000):
+        code    = '(' * depth + 'a0' + ''.join(f' < a{i})' for i in range(1, depth + 1))
+        stream  = t.tokenize_stream(code)
+        took, _ = best_of(lambda: CParser(stream, trace='off')._parse_expr(), repeat=5)
+        print(f"{f'{depth:,} nested comparisons':28} | {took * 1000:9.1f} ms | {took / depth * 1e6:9.2f} us")
+
+
+def incremental_benchmark(t, code, repeat=3):
+    # Single-line edits: full parse_tree() of the edited file vs reparse() from the previous tree
+    edits = {
+        'edit line near start': ('a1 = a1 + 1;', 'a1 = a1 + 2;'),
+        'edit line in middle':  (f'a{code.count(chr(10)) // 26} = ', f'a{code.count(chr(10)) // 26} = 7 + '),
+        'insert line near end': ('scanf("%d", &a', 'int z = 1;\nscanf("%d", &a'),
+    }
+    print(f"\n{'single-line edit':28} | {'full parse':>12} | {'reparse':>12} | {'reused':>8}")
+    print("-" * 72)
+    for label, (before, after) in edits.items():
+        start  = code.rfind(before) if 'end' in label else code.find(before)
+        new    = code[:start] + after + code[start + len(before):]
+        edit   = (start, start + len(before), start + len(after))
+        stream = t.tokenize_stream(new)
+        full_s, full = best_of(lambda: CParser(stream, trace='off').parse_tree(), repeat)
+
+        best = None
+        for _ in range(repeat):
+            previous = CParser(t.tokenize_stream(code), trace='off').parse_tree()['tree']
+            began    = time.perf_counter()
+            parser   = CParser(stream, trace='off')
+            result   = parser.reparse(previous, edit)
+            took     = time.perf_counter() - began
+            best     = took if best is None else min(best, took)
+        assert result['tree'].to_dict() == full['tree'].to_dict()
+        print(f"{label:28} | {full_s * 1000:9.1f} ms | {best * 1000:9.1f} ms | {parser.reused_count:8,}")
+
+
+def main():
+    statements = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    code       = make_source(statements)
+    t          = Tokenizer()
+
+    print("=" * 70)
+    print(f"Parser benchmark — {statements:,} statements, {code.count(chr(10)) + 1:,} lines")
+    print("=" * 70)
+
+    token_dicts = t.tokenize_to_dict(code)
+    stream      = t.tokenize_stream(code)
+
+    dict_s, dict_r     = best_of(lambda: CParser(token_dicts).parse())
+    stream_s, stream_r = best_of(lambda: CParser(stream).parse())
+
+    dict_pipe_s, _   = best_of(lambda: CParser(t.tokenize_to_dict(code)).parse())
+    stream_pipe_s, _ = best_of(lambda: CParser(t.tokenize_stream(code)).parse())
+
+    print(f"{'parse (token dicts)':28} | {dict_s * 1000:9.1f} ms")
+    print(f"{'parse (TokenStream)':28} | {stream_s * 1000:9.1f} ms")
+    print(f"{'lex + parse (token dicts)':28} | {dict_pipe_s * 1000:9.1f} ms")
+    print(f"{'lex + parse (TokenStream)':28} | {stream_pipe_s * 1000:9.1f} ms")
+    print(f"\nIdentical result: {dict_r == stream_r}")
+
+    # Trace levels, uncapped — `full` is the trace every request paid for before levels existed
+    print(f"\n{'trace level':28} | {'parse':>12} | {'events':>8}")
+    print("-" * 56)
+    for level in TRACE_LEVELS:
+        took, result = best_of(lambda: CParser(stream, trace=level, trace_cap=None).parse())
+        print(f"{level:28} | {took * 1000:9.1f} ms | {len(result['trace']):8,}")
+
+    expression_benchmark(t)
+    incremental_benchmark(t, code)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+# Full pipeline benchmark — run from backend/ folder: python bench_pipeline.py [statements]
+import json
+import sys
+import tracemalloc
+
+sys.path.insert(0, '.')
+
+from lexer.tokenizer import Tokenizer
+from lexer.line_index import LineIndex
+from parser.parser import CParser
+from parser.arena import ASTArena
+from parser.ast_cache import CachedTree
+from semantic.semantic_analyzer import SemanticAnalyzer
+from icg.icg_generator import ICGGenerator
+from icg.cfg import ControlFlowGraph
+from icg.optimizer import LocalValueNumbering
+from bench_parser import make_source, best_of
+
+
+def count_nodes(root):
+    # Number of AST nodes reachable from root
+    count, stack = 0, [root]
+    while stack:
+        node = stack.pop()
+        count += 1
+        stack.extend(node.children())
+    return count
+
+
+def retained_bytes(fn):
+    # Bytes still allocated once fn() has returned (its result is kept alive)
+    tracemalloc.start()
+    result = fn()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return current, result
+
+
+def count_unique(root):
+    # Number of distinct node objects reachable from root (shared subtrees counted once)
+    seen, stack = set(), [root]
+    while stack:
+        node = stack.pop()
+        if id(node) not in seen:
+            seen.add(id(node))
+            stack.extend(node.children())
+    return len(seen)
+
+
+def analyze_pipeline(t, code, compact=False):
+    # What /analyze does: lex, parse, semantic, ICG, then serialize tokens and AST for JSON
+    stream = t.tokenize_stream(code)
+    tree   = CParser(stream, trace='off').parse_tree(compact)['tree']
+    sem    = SemanticAnalyzer().analyze(tree)
+    icg    = ICGGenerator().generate(tree)
+    return stream.to_dicts(LineIndex(code)), tree.to_dict(), sem, icg
+
+
+def icg_pipeline(t, code, compact=False):
+    # What /icg does: lex, parse, ICG — no JSON AST
+    tree = CParser(t.tokenize_stream(code), trace='off').parse_tree(compact)['tree']
+    return ICGGenerator().generate(tree)
+
+
+def payload_benchmark(tree):
+    # /analyze AST payload: whole to_dict() tree vs depth-limited, paged stubs
+    print(f"\n{'AST payload':28} | {'serialize':>12} | {'JSON bytes':>12}")
+    print("-" * 60)
+    for label, depth, page in (('full to_dict()', None, None), ('depth 2, pages of 100', 2, 100),
+                               ('depth 4, pages of 100', 4, 100)):
+        took, ast = best_of(lambda: json.dumps(CachedTree(tree, page).to_dict(depth)
+                                               if page else tree.to_dict()))
+        print(f"{label:28} | {took * 1000:9.1f} ms | {len(ast):12,}")
+
+
+def icg_benchmark(tree):
+    # ICG output: the columnar InstructionBuffer vs the TAC/quadruple lists rendered from it
+    ir_bytes, ir = retained_bytes(lambda: ICGGenerator().generate_ir(tree))
+    both_bytes, _ = retained_bytes(lambda: ICGGenerator().generate(tree))
+    tac_bytes, _  = retained_bytes(lambda: ICGGenerator().generate(tree, views=("tac",)))
+    ir_s, _   = best_of(lambda: ICGGenerator().generate_ir(tree))
+    both_s, _ = best_of(lambda: ICGGenerator().generate(tree))
+    tac_s, _  = best_of(lambda: ICGGenerator().generate(tree, views=("tac",)))
+
+    print(f"\n{f'ICG output ({len(ir):,} instructions)':28} | {'generate':>12} | {'bytes/instr':>12}")
+    print("-" * 60)
+    print(f"{'InstructionBuffer':28} | {ir_s * 1000:9.1f} ms | {ir_bytes / len(ir):12.1f}")
+    print(f"{'+ TAC text':28} | {tac_s * 1000:9.1f} ms | {tac_bytes / len(ir):12.1f}")
+    print(f"{'+ TAC text and quadruples':28} | {both_s * 1000:9.1f} ms | {both_bytes / len(ir):12.1f}")
+
+
+def cfg_benchmark(tree):
+    # Control-flow graph of the generated code: build (blocks, edges, dominators, loops) and
+    # serialize, for the first half of the program and for all of it to show the growth
+    half = type(tree)(tree.statements[:len(tree.statements) // 2])
+    print(f"\n{'Control-flow graph':28} | {'build':>12} | {'to_dict()':>12}")
+    print("-" * 60)
+    for program in (half, tree):
+        ir = ICGGenerator().generate_ir(program)
+        build_s, cfg = best_of(lambda: ControlFlowGraph.build(ir))
+        dict_s, _    = best_of(cfg.to_dict)
+        label = f"{len(ir):,} instructions"
+        print(f"{label:28} | {build_s * 1000:9.1f} ms | {dict_s * 1000:9.1f} ms"
+              f"   ({len(cfg):,} blocks, {len(cfg.loops):,} loops)")
+
+
+def optimizer_benchmark(tree):
+    # Local value numbering over the generated code, per level: time and instructions removed
+    ir = ICGGenerator().generate_ir(tree)
+    print(f"\n{f'Optimizer ({len(ir):,} instructions)':28} | {'optimize':>12} | {'removed':>12}")
+    print("-" * 60)
+    for level in ('fold', 'lvn'):
+        optimizer = LocalValueNumbering(level)
+        took, _   = best_of(lambda: optimizer.optimize(ir))
+        print(f"{level:28} | {took * 1000:9.1f} ms | {optimizer.report()['removed']:12,}")
+
+
+def main():
+    statements = int(sys.argv[1]) if len(sys.argv) > 1 else 40_000
+    code       = make_source(statements)
+    t          = Tokenizer()
+    stream     = t.tokenize_stream(code)
+
+    tree_bytes, result = retained_bytes(lambda: CParser(stream, trace='off').parse_tree())
+    tree  = result['tree']
+    nodes = count_nodes(tree)
+    dict_bytes, _ = retained_bytes(tree.to_dict)
+    arena_bytes, arena = retained_bytes(lambda: ASTArena.from_tree(tree))
+
+    print("=" * 70)
+    print(f"Pipeline benchmark — {statements:,} statements, {nodes:,} AST nodes")
+    print("=" * 70)
+
+    print(f"{'typed AST (slotted nodes)':28} | {tree_bytes / nodes:9.1f} bytes/node")
+    print(f"{'ASTArena (compact mode)':28} | {arena_bytes / nodes:9.1f} bytes/node"
+          f"   ({arena.nbytes() / nodes:.1f} in arrays + strings)")
+    print(f"{'to_dict() JSON form':28} | {dict_bytes / nodes:9.1f} bytes/node")
+
+    cons_bytes, result = retained_bytes(
+        lambda: CParser(stream, trace='off', hash_cons=True).parse_tree())
+    unique = count_unique(result['tree'])
+    print(f"{'hash-consed AST':28} | {cons_bytes / nodes:9.1f} bytes/node"
+          f"   ({unique:,} distinct node objects)")
+
+    print()
+    for compact in (False, True):
+        mode = "compact" if compact else "nodes"
+        parse_s, _   = best_of(lambda: CParser(stream, trace='off').parse_tree(compact))
+        analyze_s, _ = best_of(lambda: analyze_pipeline(t, code, compact))
+        icg_s, _     = best_of(lambda: icg_pipeline(t, code, compact))
+        print(f"{f'parse_tree() [{mode}]':28} | {parse_s * 1000:9.1f} ms")
+        print(f"{f'/analyze pipeline [{mode}]':28} | {analyze_s * 1000:9.1f} ms")
+        print(f"{f'/icg pipeline [{mode}]':28} | {icg_s * 1000:9.1f} ms")
+
+    cons_s, _ = best_of(lambda: CParser(stream, trace='off', hash_cons=True).parse_tree())
+    print(f"{'parse_tree() [hash-consed]':28} | {cons_s * 1000:9.1f} ms")
+
+    payload_benchmark(tree)
+    icg_benchmark(tree)
+    cfg_benchmark(tree)
+    optimizer_benchmark(tree)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+# Semantic analysis benchmark — run from backend/ folder: python bench_semantic.py [statements]
+import sys
+
+sys.path.insert(0, '.')
+
+from lexer.tokenizer import Tokenizer
+from parser.parser import CParser
+from semantic.semantic_analyzer import SemanticAnalyzer
+from semantic.symbol_table import SymbolTable, ShadowSymbolTable
+from bench_parser import make_source, best_of
+
+BACKENDS = (('SymbolTable', SymbolTable), ('ShadowSymbolTable', ShadowSymbolTable))
+
+
+def nested_source(depth, uses):
+    # `depth` alternating if/while bodies, each declaring a local; the innermost body reads
+    # the global `g0` (found only at the bottom of the scope stack) `uses` times
+    opening = ''.join(f'{"if" if d % 2 else "while"} (g0 < {d}) {{\nint v{d} = g0;\n'
+                      for d in range(depth))
+    body    = '\n'.join(f'v{depth - 1} = g0 + g0 * {i};' for i in range(uses))
+    return f'int g0 = 1;\n{opening}{body}\n' + '}\n' * depth
+
+
+def repeated_source(statements):
+    # The same few compound right-hand sides over and over
+    body = '\n'.join(f'a = (a + b * 2) * (a - b / 3) + (a * a - b * b) + {i % 7};'
+                     for i in range(statements))
+    return f'int a = 1;\nfloat b = 2.5;\n{body}'
+
+
+def main():
+    statements = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    t          = Tokenizer()
+
+    print("=" * 70)
+    print("Semantic analysis benchmark — symbol table backends")
+    print("=" * 70)
+
+    # Scope-stack walks grow with nesting depth; the shadow stack's lookups do not
+    print(f"{'nesting depth (2k uses)':28} | {BACKENDS[0][0]:>17} | {BACKENDS[1][0]:>17}")
+    print("-" * 70)
+    for depth in (4, 32, 128):
+        tree  = CParser(t.tokenize_stream(nested_source(depth, 2_000)), trace='off').parse_tree()['tree']
+        times = []
+        for _, backend in BACKENDS:
+            took, result = best_of(lambda: SemanticAnalyzer(backend).analyze(tree), repeat=5)
+            times.append((took, result))
+        assert times[0][1] == times[1][1]
+        print(f"{depth:<28,} | {times[0][0] * 1000:14.1f} ms | {times[1][0] * 1000:14.1f} ms")
+
+    tree = CParser(t.tokenize_stream(make_source(statements)), trace='off').parse_tree()['tree']
+    row  = [best_of(lambda: SemanticAnalyzer(backend).analyze(tree))[0] for _, backend in BACKENDS]
+    print(f"{f'{statements:,} flat statements':28} | {row[0] * 1000:14.1f} ms | {row[1] * 1000:14.1f} ms")
+
+    # Hash-consed trees share repeated subexpressions; their types and errors are memoized
+    print(f"\n{'repeated expressions':28} | {'plain AST':>17} | {'hash-consed AST':>17}")
+    print("-" * 70)
+    code = repeated_source(statements)
+    row  = []
+    for hash_cons in (False, True):
+        tree = CParser(t.tokenize_stream(code), trace='off', hash_cons=hash_cons).parse_tree()['tree']
+        row.append(best_of(lambda: SemanticAnalyzer().analyze(tree))[0])
+    print(f"{f'{statements:,} statements':28} | {row[0] * 1000:14.1f} ms | {row[1] * 1000:14.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+# Control-flow graph over generated code — basic blocks, dominators and natural loops
+#
+# Built straight from an InstructionBuffer (ICGGenerator.generate_ir()). A block starts at a
+# leader: the first instruction, every label, and every instruction after a goto, ifFalse or
+# return. Edges are kept in compressed adjacency arrays (successors of block b are
+# succs[succ_start[b]:succ_start[b + 1]], likewise for predecessors). Immediate dominators
+# come from the iterative Cooper–Harvey–Kennedy algorithm over reverse postorder, and each
+# back edge (an edge into a block that dominates its source) yields a natural loop. Every
+# step is linear in instructions + edges, apart from loop bodies, which are as large as the
+# loops nest.
+
+from array import array
+
+from .ir import OP_GOTO, OP_IFFALSE, OP_LABEL, OP_RETURN
+
+_UNDEFINED = -1   # idom of a block not reachable from the entry
+
+
+class ControlFlowGraph:
+
+    __slots__ = ('starts', 'ends', 'succ_start', 'succs', 'pred_start', 'preds', 'idom', 'loops')
+
+    def __init__(self):
+        self.starts     = array('I')   # block -> first instruction
+        self.ends       = array('I')   # block -> one past its last instruction
+        self.succ_start = array('I', [0])
+        self.succs      = array('I')
+        self.pred_start = array('I', [0])
+        self.preds      = array('I')
+        self.idom       = array('i')   # block -> immediate dominator (entry: itself)
+        self.loops      = []           # (header, [latch, ...], [block, ...]) per loop header
+
+    @classmethod
+    def build(cls, ir):
+        graph = cls()
+        graph._split(ir)
+        graph._link(ir)
+        graph._dominators()
+        graph._natural_loops()
+        return graph
+
+    def __len__(self):
+        return len(self.starts)
+
+    def successors(self, block):
+        return self.succs[self.succ_start[block]:self.succ_start[block + 1]]
+
+    def predecessors(self, block):
+        return self.preds[self.pred_start[block]:self.pred_start[block + 1]]
+
+    # --- Construction ---
+
+    def _split(self, ir):
+        # Leaders -> block boundaries
+        ops    = ir.ops
+        starts = self.starts
+        count  = len(ops)
+        after_jump = True
+        for i, code in enumerate(ops):
+            if after_jump or code == OP_LABEL:
+                if not starts or starts[-1] != i:
+                    starts.append(i)
+            after_jump = code == OP_GOTO or code == OP_IFFALSE or code == OP_RETURN
+        self.ends = array('I', starts[1:])
+        if starts:
+            self.ends.append(count)
+
+    def _link(self, ir):
+        # Successor lists from each block's last instruction, then predecessors by counting
+        ops, arg1, result = ir.ops, ir.arg1, ir.result
+        starts, ends      = self.starts, self.ends
+        blocks            = len(starts)
+        label_block       = {arg1[start]: b for b, start in enumerate(starts) if ops[start] == OP_LABEL}
+
+        succs, succ_start = self.succs, self.succ_start
+        for b in range(blocks):
+            last = ends[b] - 1
+            code = ops[last]
+            if code == OP_GOTO:
+                succs.append(label_block[result[last]])
+            elif code == OP_IFFALSE:
+                target = label_block[result[last]]
+                if b + 1 < blocks and b + 1 != target:
+                    succs.append(b + 1)
+                succs.append(target)
+            elif code != OP_RETURN and b + 1 < blocks:
+                succs.append(b + 1)
+            succ_start.append(len(succs))
+
+        counts = [0] * (blocks + 1)
+        for s in succs:
+            counts[s + 1] += 1
+        for b in range(blocks):
+            counts[b + 1] += counts[b]
+        self.pred_start = array('I', counts)
+        fill  = counts[:-1]
+        preds = [0] * len(succs)
+        for b in range(blocks):
+            for k in range(succ_start[b], succ_start[b + 1]):
+                s = succs[k]
+                preds[fill[s]] = b
+                fill[s] += 1
+        self.preds = array('I', preds)
+
+    def _reverse_postorder(self):
+        # Blocks reachable from the entry, in reverse postorder (iterative DFS)
+        succs, succ_start = self.succs, self.succ_start
+        seen  = bytearray(len(self.starts))
+        order = []
+        stack = [(0, succ_start[0])]
+        seen[0] = 1
+        while stack:
+            block, k = stack[-1]
+            if k < succ_start[block + 1]:
+                stack[-1] = (block, k + 1)
+                s = succs[k]
+                if not seen[s]:
+                    seen[s] = 1
+                    stack.append((s, succ_start[s]))
+            else:
+                stack.pop()
+                order.append(block)
+        order.reverse()
+        return order
+
+    def _dominators(self):
+        # Cooper, Harvey & Kennedy, "A Simple, Fast Dominance Algorithm": iterate
+        # idom(b) = intersection of the processed predecessors' dominator chains in reverse
+        # postorder until nothing changes — two passes on the structured code the ICG emits
+        blocks = len(self.starts)
+        idom   = [_UNDEFINED] * blocks
+        if not blocks:
+            self.idom = array('i')
+            return
+
+        order    = self._reverse_postorder()
+        rpo_num  = [blocks] * blocks          # unreachable blocks sort after everything
+        for n, b in enumerate(order):
+            rpo_num[b] = n
+        preds, pred_start = self.preds, self.pred_start
+
+        idom[0] = 0
+        changed = True
+        while changed:
+            changed = False
+            for b in order[1:]:
+                new = _UNDEFINED
+                for k in range(pred_start[b], pred_start[b + 1]):
+                    p = preds[k]
+                    if idom[p] == _UNDEFINED:
+                        continue
+                    if new == _UNDEFINED:
+                        new = p
+                        continue
+                    while p != new:          # intersect: climb whichever is deeper in RPO
+                        while rpo_num[p] > rpo_num[new]:
+                            p = idom[p]
+                        while rpo_num[new] > rpo_num[p]:
+                            new = idom[new]
+                if idom[b] != new:
+                    idom[b] = new
+                    changed = True
+        self.idom = array('i', idom)
+
+    def _natural_loops(self):
+        # A back edge latch -> header (header dominates latch) gives the loop of all blocks
+        # that reach the latch without passing the header; loops sharing a header are merged
+        blocks = len(self.starts)
+        idom   = self.idom
+        if not blocks:
+            return
+
+        # Dominator-tree pre/post numbers make "a dominates b" an O(1) interval test
+        children = [[] for _ in range(blocks)]
+        for b in range(1, blocks):
+            if idom[b] != _UNDEFINED:
+                children[idom[b]].append(b)
+        pre, post = [0] * blocks, [0] * blocks
+        clock = 0
+        stack = [(0, 0)]
+        pre[0] = clock
+        while stack:
+            block, k = stack[-1]
+            if k < len(children[block]):
+                stack[-1] = (block, k + 1)
+                child = children[block][k]
+                clock += 1
+                pre[child] = clock
+                stack.append((child, 0))
+            else:
+                stack.pop()
+                clock += 1
+                post[block] = clock
+
+        latches = {}
+        succs, succ_start = self.succs, self.succ_start
+        for b in range(blocks):
+            if idom[b] == _UNDEFINED:
+                continue
+            for k in range(succ_start[b], succ_start[b + 1]):
+                h = succs[k]
+                if pre[h] <= pre[b] and post[b] <= post[h]:
+                    latches.setdefault(h, []).append(b)
+
+        preds, pred_start = self.preds, self.pred_start
+        mark = [-1] * blocks
+        for header in sorted(latches):
+            mark[header] = header
+            body  = [header]
+            stack = [b for b in latches[header] if mark[b] != header]
+            for b in stack:
+                mark[b] = header
+            while stack:
+                b = stack.pop()
+                body.append(b)
+                for k in range(pred_start[b], pred_start[b + 1]):
+                    p = preds[k]
+                    if mark[p] != header and idom[p] != _UNDEFINED:
+                        mark[p] = header
+                        stack.append(p)
+            body.sort()
+            self.loops.append((header, latches[header], body))
+
+    # --- Serialization ---
+
+    def to_dict(self):
+        # JSON form for the visualizer: blocks as instruction ranges (indices into the TAC
+        # list) with their edges and immediate dominator, plus the natural loops
+        starts, ends, idom = self.starts, self.ends, self.idom
+        return {
+            "entry":  0 if len(starts) else None,
+            "blocks": [{
+                "id":           b,
+                "start":        starts[b],
+                "end":          ends[b],
+                "successors":   self.successors(b).tolist(),
+                "predecessors": self.predecessors(b).tolist(),
+                "idom":         None if idom[b] == _UNDEFINED or b == 0 else idom[b],
+            } for b in range(len(starts))],
+            "loops":  [{"header": header, "latches": latches, "blocks": body}
+                       for header, latches, body in self.loops],
+        }
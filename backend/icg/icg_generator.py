@@ -1,429 +1,267 @@
-# Intermediate Code Generator — walks AST dict and produces Three-Address Code (Phase 4)
+# Intermediate Code Generator — walks the typed AST from CParser and produces Three-Address Code (Phase 4)
 #
 # Output formats:
-#   • TAC list  — human-readable lines of three-address code
-#   • Quadruples — (op, arg1, arg2, result) tuples for tabular display
+#   • InstructionBuffer — columnar opcodes + pooled operands (see ir.py), what the walk builds
+#   • TAC list  — human-readable lines of three-address code     } rendered from the
+#   • Quadruples — (op, arg1, arg2, result) tuples for tabular display } buffer on demand
+#   • Optionally, both again for the code after local value numbering (see optimizer.py)
 #
 # Supports: VarDecl, Assign, If, While, BinaryOp, UnaryOp, Printf, Scanf,
 #           Return, PostfixStmt, PrefixStmt, Number, Identifier, String
 
+from parser.visitor import ASTVisitor
+from .ir import (
+    InstructionBuffer, OPCODE_CODES,
+    OP_ASSIGN, OP_ADD, OP_SUB, OP_UMINUS, OP_IFFALSE, OP_GOTO, OP_LABEL, OP_CALL, OP_RETURN,
+)
+from .optimizer import LocalValueNumbering
 
-class ICGGenerator:
-    """Accepts an AST dict (from ast_node.to_dict()) and generates Three-Address Code."""
+_OPERATORS = frozenset(("BinaryOp", "UnaryOp"))
+
+
+class ICGGenerator(ASTVisitor):
+    """Accepts the ProgramNode from CParser.parse_tree() and generates Three-Address Code.
+
+    Statement visitors emit code and return None; expression visitors return the
+    place (temp, name or literal) holding the expression's value.
+    """
 
     def __init__(self):
-        self._temp_counter = 0
         self._label_counter = 0
-        self._tac = []          # list of TAC instruction strings
-        self._quadruples = []   # list of (op, arg1, arg2, result) dicts
+        self._ir = InstructionBuffer()
 
     # --- Public API ---
 
-    def generate(self, ast_dict):
-        """Entry point — returns { tac, quadruples }."""
-        self._temp_counter = 0
+    def generate(self, program, views=("tac", "quadruples"), optimize="off"):
+        """Entry point — returns { tac, quadruples }, or only the views asked for.
+
+        With an optimize level other than "off" (see optimizer.OPTIMIZE_LEVELS), the result
+        also holds "optimized": the same views of the locally optimized code, plus a "report"
+        of the instructions removed.
+        """
+        ir = self.generate_ir(program)
+        result = ir.render(views)
+        if optimize != "off":
+            optimizer = LocalValueNumbering(optimize)
+            result["optimized"] = optimizer.optimize(ir).render(views)
+            result["optimized"]["report"] = optimizer.report()
+        return result
+
+    def generate_ir(self, program):
+        """Generate code into a fresh InstructionBuffer and return it (nothing rendered)."""
         self._label_counter = 0
-        self._tac = []
-        self._quadruples = []
-
-        if not ast_dict:
-            return self._result()
+        self._ir = InstructionBuffer()   # numbers the temps itself
 
-        self._visit(ast_dict)
-        return self._result()
-
-    def _result(self):
-        return {
-            "tac": list(self._tac),
-            "quadruples": list(self._quadruples),
-        }
+        if program is not None:
+            self.run(program)
+        return self._ir
 
     # --- Temp / Label generators ---
 
     def _new_temp(self):
-        self._temp_counter += 1
-        return f"t{self._temp_counter}"
+        return self._ir.new_temp()
 
     def _new_label(self):
         self._label_counter += 1
-        return f"L{self._label_counter}"
+        return self._ir.fresh(f"L{self._label_counter}")
 
     # --- Emit helpers ---
 
-    def _emit(self, code, op="", arg1="", arg2="", result=""):
-        """Append a TAC line and its quadruple representation."""
-        self._tac.append(code)
-        self._quadruples.append({
-            "op": op,
-            "arg1": str(arg1),
-            "arg2": str(arg2),
-            "result": str(result),
-        })
+    def _emit(self, code, arg1=0, arg2=0, result=0):
+        """Append one instruction: an opcode code (ir.OPCODES) and operand pool indices."""
+        self._ir.emit(code, arg1, arg2, result)
 
-    # --- Visitor dispatch ---
+    def _place(self, text):
+        """Pool index of a name, constant or other operand text."""
+        return self._ir.intern(text)
 
-    def _visit(self, node):
-        if not node or not isinstance(node, dict):
-            return None
+    # --- Statement visitors ---
 
-        node_type = node.get("type", "")
-        handler = getattr(self, f"_visit_{node_type}", None)
+    def visit_Program(self, node):
+        self.defer_visits(node.statements)
 
-        if handler:
-            return handler(node)
-        else:
-            # Generic: visit children
-            for child in node.get("children", []):
-                self._visit(child)
-            return None
+    def visit_VarDecl(self, node):
+        # Bare declarations (no initializer) emit nothing in TAC
+        if node.init_expr is not None:
+            val = self.visit(node.init_expr)
+            self._emit(OP_ASSIGN, arg1=val, result=self._place(node.name))
 
-    # --- Statement visitors ---
+    def visit_Assign(self, node):
+        val = self.visit(node.expr)
+        self._emit(OP_ASSIGN, arg1=val, result=self._place(node.name))
+
+    def visit_If(self, node):
+        # Bodies (and the labels after them) are deferred — see ASTVisitor.run
+        cond_result = self.visit(node.condition)
 
-    def _visit_Program(self, node):
-        for child in node.get("children", []):
-            self._visit(child)
-
-    def _visit_VarDecl(self, node):
-        name = node.get("name", "?")
-        children = node.get("children", [])
-
-        # Check for initializer (Assign child with label "= (init)")
-        for child in children:
-            if child.get("type") == "Assign" and child.get("label") == "= (init)":
-                init_children = child.get("children", [])
-                if init_children:
-                    val = self._visit_expr(init_children[0])
-                    self._emit(
-                        f"{name} = {val}",
-                        op="=", arg1=val, arg2="", result=name,
-                    )
-                    return
-
-        # No initializer — just declare (emit nothing or a placeholder)
-        # In TAC we typically don't emit for bare declarations
-
-    def _visit_Assign(self, node):
-        label = node.get("label", "")
-        # Extract variable name from label "Assign (varname =)"
-        name = None
-        if label.startswith("Assign (") and label.endswith(" =)"):
-            name = label[8:-3]
-
-        if not name:
-            name = "?"
-
-        children = node.get("children", [])
-        if children:
-            val = self._visit_expr(children[0])
-            self._emit(
-                f"{name} = {val}",
-                op="=", arg1=val, arg2="", result=name,
-            )
-
-    def _visit_If(self, node):
-        children = node.get("children", [])
-        cond_node = None
-        then_stmts = []
-        else_stmts = []
-
-        for child in children:
-            ctype = child.get("type")
-            if ctype == "Condition":
-                cond_children = child.get("children", [])
-                if cond_children:
-                    cond_node = cond_children[0]
-            elif ctype == "Then":
-                then_stmts = child.get("children", [])
-            elif ctype == "Else":
-                else_stmts = child.get("children", [])
-
-        cond_result = self._visit_expr(cond_node) if cond_node else "true"
-
-        if else_stmts:
+        if node.else_body:
             label_else = self._new_label()
             label_end = self._new_label()
 
-            self._emit(
-                f"ifFalse {cond_result} goto {label_else}",
-                op="ifFalse", arg1=cond_result, arg2="", result=label_else,
-            )
-
-            for stmt in then_stmts:
-                self._visit(stmt)
-
-            self._emit(
-                f"goto {label_end}",
-                op="goto", arg1="", arg2="", result=label_end,
-            )
-            self._emit(
-                f"{label_else}:",
-                op="label", arg1=label_else, arg2="", result="",
-            )
-
-            for stmt in else_stmts:
-                self._visit(stmt)
-
-            self._emit(
-                f"{label_end}:",
-                op="label", arg1=label_end, arg2="", result="",
-            )
+            self._emit(OP_IFFALSE, arg1=cond_result, result=label_else)
+
+            self.defer_visits(node.then_body)
+            self.defer(self._emit_goto, label_end)
+            self.defer(self._emit_label, label_else)
+            self.defer_visits(node.else_body)
+            self.defer(self._emit_label, label_end)
         else:
             label_end = self._new_label()
 
-            self._emit(
-                f"ifFalse {cond_result} goto {label_end}",
-                op="ifFalse", arg1=cond_result, arg2="", result=label_end,
-            )
-
-            for stmt in then_stmts:
-                self._visit(stmt)
-
-            self._emit(
-                f"{label_end}:",
-                op="label", arg1=label_end, arg2="", result="",
-            )
-
-    def _visit_While(self, node):
-        children = node.get("children", [])
-        cond_node = None
-        body_stmts = []
-
-        for child in children:
-            ctype = child.get("type")
-            if ctype == "Condition":
-                cond_children = child.get("children", [])
-                if cond_children:
-                    cond_node = cond_children[0]
-            elif ctype == "Body":
-                body_stmts = child.get("children", [])
+            self._emit(OP_IFFALSE, arg1=cond_result, result=label_end)
+
+            self.defer_visits(node.then_body)
+            self.defer(self._emit_label, label_end)
 
+    def visit_While(self, node):
         label_start = self._new_label()
         label_end = self._new_label()
 
-        self._emit(
-            f"{label_start}:",
-            op="label", arg1=label_start, arg2="", result="",
-        )
-
-        cond_result = self._visit_expr(cond_node) if cond_node else "true"
-
-        self._emit(
-            f"ifFalse {cond_result} goto {label_end}",
-            op="ifFalse", arg1=cond_result, arg2="", result=label_end,
-        )
-
-        for stmt in body_stmts:
-            self._visit(stmt)
-
-        self._emit(
-            f"goto {label_start}",
-            op="goto", arg1="", arg2="", result=label_start,
-        )
-        self._emit(
-            f"{label_end}:",
-            op="label", arg1=label_end, arg2="", result="",
-        )
-
-    def _visit_Printf(self, node):
-        children = node.get("children", [])
-        fmt = ""
-        args = []
-
-        for child in children:
-            if child.get("type") == "Format":
-                fmt = child.get("label", "").replace("Format: ", "")
-            else:
-                val = self._visit_expr(child)
-                args.append(val)
+        self._emit_label(label_start)
+
+        cond_result = self.visit(node.condition)
+
+        self._emit(OP_IFFALSE, arg1=cond_result, result=label_end)
+
+        self.defer_visits(node.body)
+        self.defer(self._emit_goto, label_start)
+        self.defer(self._emit_label, label_end)
+
+    def _emit_goto(self, label):
+        self._emit(OP_GOTO, result=label)
+
+    def _emit_label(self, label):
+        self._emit(OP_LABEL, arg1=label)
+
+    def visit_Printf(self, node):
+        fmt = node.fmt_string
+        args = [self.visit(arg) for arg in node.args]
 
         if args:
-            args_str = ", ".join(args)
-            self._emit(
-                f'call printf, "{fmt}", {args_str}',
-                op="call", arg1="printf", arg2=f'"{fmt}", {args_str}', result="",
-            )
+            args_str = ", ".join(map(self._ir.operand, args))
+            self._emit(OP_CALL, arg1=self._place("printf"), arg2=self._place(f'"{fmt}", {args_str}'))
         else:
-            self._emit(
-                f'call printf, "{fmt}"',
-                op="call", arg1="printf", arg2=f'"{fmt}"', result="",
-            )
-
-    def _visit_Scanf(self, node):
-        children = node.get("children", [])
-        fmt = ""
-        refs = []
-
-        for child in children:
-            if child.get("type") == "Format":
-                fmt = child.get("label", "").replace("Format: ", "")
-            elif child.get("type") == "Ref":
-                label = child.get("label", "")
-                refs.append(label)
-
-        refs_str = ", ".join(refs) if refs else ""
-        self._emit(
-            f'call scanf, "{fmt}", {refs_str}',
-            op="call", arg1="scanf", arg2=f'"{fmt}", {refs_str}', result="",
-        )
-
-    def _visit_Return(self, node):
-        children = node.get("children", [])
-        if children:
-            val = self._visit_expr(children[0])
-            self._emit(
-                f"return {val}",
-                op="return", arg1=val, arg2="", result="",
-            )
+            self._emit(OP_CALL, arg1=self._place("printf"), arg2=self._place(f'"{fmt}"'))
+
+    def visit_Scanf(self, node):
+        fmt = node.fmt_string
+        refs_str = ", ".join(f"&{name}" for name in node.vars_)
+        self._emit(OP_CALL, arg1=self._place("scanf"), arg2=self._place(f'"{fmt}", {refs_str}'))
+
+    def visit_Return(self, node):
+        if node.expr is not None:
+            val = self.visit(node.expr)
+            self._emit(OP_RETURN, arg1=val)
         else:
-            self._emit(
-                "return",
-                op="return", arg1="", arg2="", result="",
-            )
-
-    def _visit_PostfixStmt(self, node):
-        label = node.get("label", "")
-        # label format: "Postfix (name++)" or "Postfix (name--)"
-        if label.startswith("Postfix (") and label.endswith(")"):
-            inner = label[9:-1]
-            if inner.endswith("++"):
-                name = inner[:-2]
-                t = self._new_temp()
-                self._emit(
-                    f"{t} = {name} + 1",
-                    op="+", arg1=name, arg2="1", result=t,
-                )
-                self._emit(
-                    f"{name} = {t}",
-                    op="=", arg1=t, arg2="", result=name,
-                )
-            elif inner.endswith("--"):
-                name = inner[:-2]
-                t = self._new_temp()
-                self._emit(
-                    f"{t} = {name} - 1",
-                    op="-", arg1=name, arg2="1", result=t,
-                )
-                self._emit(
-                    f"{name} = {t}",
-                    op="=", arg1=t, arg2="", result=name,
-                )
-
-    def _visit_PrefixStmt(self, node):
-        label = node.get("label", "")
-        # label format: "Prefix (++name)" or "Prefix (--name)"
-        if label.startswith("Prefix (") and label.endswith(")"):
-            inner = label[8:-1]
-            if inner.startswith("++"):
-                name = inner[2:]
-                t = self._new_temp()
-                self._emit(
-                    f"{t} = {name} + 1",
-                    op="+", arg1=name, arg2="1", result=t,
-                )
-                self._emit(
-                    f"{name} = {t}",
-                    op="=", arg1=t, arg2="", result=name,
-                )
-            elif inner.startswith("--"):
-                name = inner[2:]
-                t = self._new_temp()
-                self._emit(
-                    f"{t} = {name} - 1",
-                    op="-", arg1=name, arg2="1", result=t,
-                )
-                self._emit(
-                    f"{name} = {t}",
-                    op="=", arg1=t, arg2="", result=name,
-                )
-
-    # --- Expression visitors (return the "place" holding the result) ---
-
-    def _visit_expr(self, node):
-        """Visit an expression node and return the temp/name holding its value."""
-        if not node or not isinstance(node, dict):
-            return "?"
-
-        etype = node.get("type", "")
-
-        if etype == "Number":
-            return str(node.get("value", "0"))
-
-        if etype == "Identifier":
-            return str(node.get("name", "?"))
-
-        if etype == "String":
-            return f'"{node.get("value", "")}"'
-
-        if etype == "BinaryOp":
-            return self._visit_BinaryOp_expr(node)
-
-        if etype == "UnaryOp":
-            return self._visit_UnaryOp_expr(node)
-
-        # Fallback — visit children and return last
-        children = node.get("children", [])
-        last = "?"
-        for child in children:
-            last = self._visit_expr(child)
-        return last
-
-    def _visit_BinaryOp_expr(self, node):
-        op = node.get("op", "+")
-        children = node.get("children", [])
-
-        left_node = children[0] if len(children) > 0 else None
-        right_node = children[1] if len(children) > 1 else None
-
-        left = self._visit_expr(left_node)
-        right = self._visit_expr(right_node)
+            self._emit(OP_RETURN)
+
+    def visit_PostfixStmt(self, node):
+        self._emit_step(self._place(node.name), OP_ADD if node.op == "++" else OP_SUB)
 
+    def visit_PrefixStmt(self, node):
+        self._emit_step(self._place(node.name), OP_ADD if node.op == "++" else OP_SUB)
+
+    def _emit_step(self, name, code):
+        # name = name ± 1 through a temp (statement-level ++/--)
+        t = self._new_temp()
+        self._emit(code, arg1=name, arg2=self._place("1"), result=t)
+        self._emit(OP_ASSIGN, arg1=t, result=name)
+
+    # --- Expression visitors (return the "place" holding the result, as a pool index) ---
+
+    def visit_Number(self, node):
+        return self._place(str(node.value))
+
+    def visit_Identifier(self, node):
+        return self._place(str(node.name))
+
+    def visit_String(self, node):
+        return self._place(f'"{node.value}"')
+
+    def visit_BinaryOp(self, node):
+        return self._expression(node)
+
+    def visit_UnaryOp(self, node):
+        return self._expression(node)
+
+    def _expression(self, node):
+        # Post-order over an operator subtree with an explicit stack (no recursion on long
+        # chains); emits operands left to right before each operator, as a recursive walk would
+        places = []       # places of the finished subexpressions
+        open_  = []       # operators waiting for their operands' places
+        stack  = [node]   # None = finish the innermost open operator
+        root   = node     # visit() has counted it already when profiling
+        counts = self._counts
+
+        while stack:
+            node = stack.pop()
+
+            if node is None:
+                node = open_.pop()
+                if node.node_type == "BinaryOp":
+                    right = places.pop()
+                    places.append(self._emit_binary(node.op, places.pop(), right))
+                else:
+                    places.append(self._emit_unary(node.op, places.pop()))
+                continue
+
+            kind = node.node_type
+            if counts is not None and kind in _OPERATORS and node is not root:
+                counts[kind] += 1
+            if kind == "BinaryOp":
+                left, right = node.left, node.right
+                if left.node_type not in _OPERATORS and right.node_type not in _OPERATORS:
+                    left = self._leaf_place(left)
+                    places.append(self._emit_binary(node.op, left, self._leaf_place(right)))
+                    continue
+                open_.append(node)
+                stack.append(None)
+                stack.append(right)
+                stack.append(left)
+            elif kind == "UnaryOp":
+                open_.append(node)
+                stack.append(None)
+                stack.append(node.operand)
+            else:
+                places.append(self._leaf_place(node))
+
+        return places[0]
+
+    def _leaf_place(self, node):
+        kind = node.node_type
+        if self._counts is not None and kind != "String":    # a string goes through visit()
+            self._counts[kind] += 1
+        if kind == "Identifier":
+            return self._place(str(node.name))
+        if kind == "Number":
+            return self._place(str(node.value))
+        return self.visit(node)
+
+    def _emit_binary(self, op, left, right):
         # Comparison operators produce a boolean temp used for branching
         t = self._new_temp()
-        self._emit(
-            f"{t} = {left} {op} {right}",
-            op=op, arg1=left, arg2=right, result=t,
-        )
+        self._emit(OPCODE_CODES[op], arg1=left, arg2=right, result=t)
         return t
 
-    def _visit_UnaryOp_expr(self, node):
-        op = node.get("op", "-")
-        children = node.get("children", [])
-        operand_node = children[0] if children else None
-        operand = self._visit_expr(operand_node)
-
+    def _emit_unary(self, op, operand):
         if op in ("++", "post++"):
             t = self._new_temp()
-            self._emit(
-                f"{t} = {operand} + 1",
-                op="+", arg1=operand, arg2="1", result=t,
-            )
+            self._emit(OP_ADD, arg1=operand, arg2=self._place("1"), result=t)
             if op == "++":
                 # Prefix: update first, result is new value
-                self._emit(
-                    f"{operand} = {t}",
-                    op="=", arg1=t, arg2="", result=operand,
-                )
+                self._emit(OP_ASSIGN, arg1=t, result=operand)
             return t
 
         if op in ("--", "post--"):
             t = self._new_temp()
-            self._emit(
-                f"{t} = {operand} - 1",
-                op="-", arg1=operand, arg2="1", result=t,
-            )
+            self._emit(OP_SUB, arg1=operand, arg2=self._place("1"), result=t)
             if op == "--":
-                self._emit(
-                    f"{operand} = {t}",
-                    op="=", arg1=t, arg2="", result=operand,
-                )
+                self._emit(OP_ASSIGN, arg1=t, result=operand)
             return t
 
         if op == "-":
             t = self._new_temp()
-            self._emit(
-                f"{t} = uminus {operand}",
-                op="uminus", arg1=operand, arg2="", result=t,
-            )
+            self._emit(OP_UMINUS, arg1=operand, result=t)
             return t
 
         # Fallback
@@ -0,0 +1,152 @@
+# Columnar instruction buffer — the ICG's output before it is rendered for display
+#
+# One entry per instruction in four parallel arrays: an opcode (index into OPCODES) and three
+# operands (arg1, arg2, result). An operand >= 0 indexes a pool of operand strings — names and
+# constants deduplicated, plus one entry per label, with entry 0 = "" (no operand); a negative
+# operand -n is temp tn, whose name is only spelled out when rendering. TAC lines and quadruple dicts
+# are rendered from the buffer only when asked for, and can be streamed one by one.
+
+from array import array
+
+OPCODES = (
+    "=", "+", "-", "*", "/", "==", "!=", "<", ">", "<=", ">=",
+    "uminus", "ifFalse", "goto", "label", "call", "return",
+)
+OPCODE_CODES = {op: code for code, op in enumerate(OPCODES)}
+
+(OP_ASSIGN, OP_ADD, OP_SUB, OP_UMINUS, OP_IFFALSE, OP_GOTO,
+ OP_LABEL, OP_CALL, OP_RETURN) = (OPCODE_CODES[op] for op in
+                                  ("=", "+", "-", "uminus", "ifFalse", "goto", "label", "call", "return"))
+
+
+class InstructionBuffer:
+
+    __slots__ = ('ops', 'arg1', 'arg2', 'result', 'pool', 'temps', '_pool_ids')
+
+    def __init__(self):
+        self.ops       = array('B')
+        self.arg1      = array('i')
+        self.arg2      = array('i')
+        self.result    = array('i')
+        self.pool      = [""]
+        self.temps     = 0        # temps handed out so far (t1 .. t<temps>)
+        self._pool_ids = {"": 0}
+
+    def __len__(self):
+        return len(self.ops)
+
+    def intern(self, operand):
+        # Pool index of an operand string, adding it on first sight
+        index = self._pool_ids.get(operand)
+        if index is None:
+            index = self._pool_ids[operand] = len(self.pool)
+            self.pool.append(operand)
+        return index
+
+    def fresh(self, operand):
+        # Pool index for a new label — its own entry, kept out of the intern map, so a variable
+        # spelled like a label (a user's "L1") stays a separate operand
+        self.pool.append(operand)
+        return len(self.pool) - 1
+
+    def new_temp(self):
+        # Operand of the next temp
+        self.temps += 1
+        return -self.temps
+
+    def empty_copy(self):
+        # A buffer with no instructions but this one's operand pool and temp numbering, for
+        # rewritten code that keeps reading the same operands
+        other = InstructionBuffer()
+        other.pool, other._pool_ids, other.temps = list(self.pool), dict(self._pool_ids), self.temps
+        return other
+
+    def operand(self, index):
+        # Text of one operand
+        return self.pool[index] if index >= 0 else f"t{-index}"
+
+    def _names(self):
+        # Operand texts indexable by any operand: the pool, then t<temps> .. t1 so that
+        # names[-n] is tn
+        return self.pool + [f"t{n}" for n in range(self.temps, 0, -1)]
+
+    def emit(self, code, arg1=0, arg2=0, result=0):
+        # Append an instruction given its opcode code and operand pool indices
+        self.ops.append(code)
+        self.arg1.append(arg1)
+        self.arg2.append(arg2)
+        self.result.append(result)
+
+    def append(self, op, arg1="", arg2="", result=""):
+        # Append an instruction given its opcode and operand strings
+        intern = self.intern
+        self.emit(OPCODE_CODES[op], intern(arg1), intern(arg2), intern(result))
+
+    def nbytes(self):
+        # Bytes held by the columns and the operand pool (temps take no pool space)
+        columns = (self.ops, self.arg1, self.arg2, self.result)
+        return (sum(c.itemsize * len(c) for c in columns)
+                + sum(len(s) + 49 for s in self.pool) + 8 * len(self.pool))
+
+    # --- Rendering ---
+
+    def tac_line(self, i):
+        # Three-address code text of instruction i
+        name = self.operand
+        return _RENDER[self.ops[i]](name(self.arg1[i]), name(self.arg2[i]), name(self.result[i]))
+
+    def quadruple(self, i):
+        # (op, arg1, arg2, result) dict of instruction i
+        name = self.operand
+        return {
+            "op": OPCODES[self.ops[i]],
+            "arg1": name(self.arg1[i]),
+            "arg2": name(self.arg2[i]),
+            "result": name(self.result[i]),
+        }
+
+    def iter_tac(self):
+        # TAC lines one at a time, in order
+        names, render = self._names(), _RENDER
+        for code, a1, a2, res in zip(self.ops, self.arg1, self.arg2, self.result):
+            yield render[code](names[a1], names[a2], names[res])
+
+    def iter_quadruples(self):
+        # Quadruple dicts one at a time, in order
+        names = self._names()
+        for code, a1, a2, res in zip(self.ops, self.arg1, self.arg2, self.result):
+            yield {"op": OPCODES[code], "arg1": names[a1], "arg2": names[a2], "result": names[res]}
+
+    def tac(self):
+        names, render = self._names(), _RENDER
+        return [render[code](names[a1], names[a2], names[res])
+                for code, a1, a2, res in zip(self.ops, self.arg1, self.arg2, self.result)]
+
+    def quadruples(self):
+        names, ops = self._names(), OPCODES
+        return [{"op": ops[code], "arg1": names[a1], "arg2": names[a2], "result": names[res]}
+                for code, a1, a2, res in zip(self.ops, self.arg1, self.arg2, self.result)]
+
+    def render(self, views=("tac", "quadruples")):
+        # { tac, quadruples }, or only the views asked for
+        result = {}
+        if "tac" in views:
+            result["tac"] = self.tac()
+        if "quadruples" in views:
+            result["quadruples"] = self.quadruples()
+        return result
+
+
+def _binary(op):
+    return lambda a1, a2, res: f"{res} = {a1} {op} {a2}"
+
+
+# TAC text per opcode, from (arg1, arg2, result)
+_RENDER = [_binary(op) for op in OPCODES]
+_RENDER[OP_ASSIGN]  = lambda a1, a2, res: f"{res} = {a1}"
+_RENDER[OP_UMINUS]  = lambda a1, a2, res: f"{res} = uminus {a1}"
+_RENDER[OP_IFFALSE] = lambda a1, a2, res: f"ifFalse {a1} goto {res}"
+_RENDER[OP_GOTO]    = lambda a1, a2, res: f"goto {res}"
+_RENDER[OP_LABEL]   = lambda a1, a2, res: f"{a1}:"
+_RENDER[OP_CALL]    = lambda a1, a2, res: f"call {a1}, {a2}"
+_RENDER[OP_RETURN]  = lambda a1, a2, res: f"return {a1}" if a1 else "return"
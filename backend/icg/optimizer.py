@@ -0,0 +1,301 @@
+# Local value numbering over generated code — constant folding, algebraic identities and
+# common-subexpression elimination inside each basic block
+#
+# One forward pass over an InstructionBuffer writes an optimized copy. Within a basic block (the
+# same leaders as cfg.py: labels, and whatever follows a jump or return) every value gets a
+# number: a constant is its own operand, a kept temp is its own operand, and a variable gets a
+# fresh number on each store unless it is copied from another variable or a temp. A constant
+# stored into a variable is not carried on through it: the code does not say whether the
+# variable is an int or a float, and the store converts the value to that type (after
+# "float f = 7", f / 2 is 3.5, not 3). Then, per operator:
+#   • all operands constant  -> the result is folded to a constant
+#   • x + 0, 0 + x, x - 0, x * 1, 1 * x, x / 1 (integer 0 / 1) -> x
+#   • the same operator on the same value numbers earlier in the block -> that earlier temp
+#     (level "lvn" only)
+# The temp such an instruction defined is dropped and its uses read the constant, x or the
+# earlier temp instead — for temps whose uses all lie in their own block and that no call's
+# argument text names; other temps keep a plain copy. Stores to variables, calls and jumps are
+# always kept (a branch on a constant becomes a goto, or nothing). Temps keep their names, so
+# the optimized code lines up with the original.
+#
+# ++/-- on something that is not a variable (--7, ++(a + b)) makes the generator store into a
+# constant or define a temp twice; such code has no C meaning and is returned unoptimized.
+
+import math
+import operator
+import re
+from array import array
+
+from .ir import (
+    OPCODE_CODES,
+    OP_ASSIGN, OP_UMINUS, OP_IFFALSE, OP_GOTO, OP_LABEL, OP_CALL, OP_RETURN,
+)
+
+OPTIMIZE_LEVELS = ('off', 'fold', 'lvn')   # nothing / constants and identities / + CSE
+
+OP_ADD, OP_SUB, OP_MUL, OP_DIV = (OPCODE_CODES[op] for op in "+-*/")
+
+# Binary operators as Python functions (comparisons give C's 1 / 0); "/" is handled by _fold
+_APPLY = {
+    OP_ADD: operator.add, OP_SUB: operator.sub, OP_MUL: operator.mul,
+    OPCODE_CODES["=="]: lambda x, y: int(x == y), OPCODE_CODES["!="]: lambda x, y: int(x != y),
+    OPCODE_CODES["<"]:  lambda x, y: int(x < y),  OPCODE_CODES[">"]:  lambda x, y: int(x > y),
+    OPCODE_CODES["<="]: lambda x, y: int(x <= y), OPCODE_CODES[">="]: lambda x, y: int(x >= y),
+}
+_OPERATORS   = frozenset(_APPLY) | {OP_DIV, OP_UMINUS}
+_COMMUTATIVE = frozenset(OPCODE_CODES[op] for op in ("+", "*", "==", "!="))
+_INT_RANGE   = range(-2**31, 2**31)           # folded int results must fit C's int
+_TEMP_NAME   = re.compile(r'\bt(\d+)\b')      # temps named inside a call's argument text
+
+
+class LocalValueNumbering:
+
+    def __init__(self, level='lvn'):
+        if level not in OPTIMIZE_LEVELS:
+            raise ValueError(f"Unknown optimize level {level!r} — expected one of {', '.join(OPTIMIZE_LEVELS)}")
+        self.level   = level
+        self.before  = 0      # instructions in / out of the last optimize() call
+        self.after   = 0
+        self.dropped = {"folded": 0, "identities": 0, "cse": 0}   # instructions dropped, by reason
+
+    def optimize(self, ir):
+        # Optimized copy of ir (ir is left untouched); level "off" returns ir itself
+        self.before = self.after = len(ir)
+        self.dropped = dict.fromkeys(self.dropped, 0)
+        if self.level == 'off':
+            return ir
+
+        temps = self._temp_uses(ir)
+        if temps is None:
+            return ir
+        droppable, uses = temps
+        out     = ir.empty_copy()
+        emit    = out.emit
+        intern  = out.intern
+        pool    = out.pool
+        dropped = self.dropped
+        cse     = self.level == 'lvn'
+
+        numbers = {}        # operand -> numeric value, or None if not a constant
+        values  = {}        # variable -> value number            } reset at
+        exprs   = {}        # (opcode, value numbers) -> temp      } every
+        pending = {}        # variable -> dropped temps reading it } block start
+        alias   = {}        # dropped temp -> operand its uses read instead
+        fresh   = -ir.temps - 1   # next value number for an unknown variable value
+
+        def number(op):
+            # Numeric value of a constant operand, else None
+            value = numbers.get(op, numbers)
+            if value is numbers:
+                value = numbers[op] = _literal(pool[op]) if op >= 0 else None
+            return value
+
+        def read(op):
+            # Operand to read in place of op: a dropped temp's replacement
+            if op < 0:
+                uses[-op] -= 1
+                return alias.get(op, op)
+            return op
+
+        def value_number(op):
+            nonlocal fresh
+            if op < 0 or number(op) is not None:
+                return op
+            value = values.get(op)
+            if value is None:
+                value = values[op] = fresh
+                fresh -= 1
+            return value
+
+        def store(var, op):
+            # var now holds op's value — a constant's converted to var's type, so a new number
+            nonlocal fresh
+            before_store(var)
+            if number(op) is None:
+                values[var] = value_number(op)
+            else:
+                values[var] = fresh
+                fresh -= 1
+
+        def before_store(var):
+            # var is about to change — dropped temps still reading it get their copy back
+            for temp in pending.pop(var, ()):
+                if uses[-temp] > 0:
+                    emit(OP_ASSIGN, var, 0, temp)
+                    del alias[temp]
+                    dropped["identities"] -= 1
+
+        def end_block():
+            values.clear()
+            exprs.clear()
+            pending.clear()
+
+        for code, a1, a2, res in zip(ir.ops, ir.arg1, ir.arg2, ir.result):
+            if code in _OPERATORS:
+                x     = read(a1)
+                y     = read(a2) if code != OP_UMINUS else 0
+                cx    = number(x)
+                cy    = number(y)
+                place = reason = key = None
+
+                if cx is not None and (cy is not None or code == OP_UMINUS):
+                    value = -cx if code == OP_UMINUS else _fold(code, cx, cy)
+                    if value is not None and (type(value) is float or value in _INT_RANGE):
+                        place, reason = intern(_text(value)), "folded"
+                if place is None and code != OP_UMINUS:
+                    place = _identity(code, x, y, cx, cy)
+                    reason = "identities"
+                if place is None and cse:
+                    if code == OP_UMINUS:
+                        key = (code, value_number(x))
+                    else:
+                        vx, vy = value_number(x), value_number(y)
+                        key = (code, vy, vx) if code in _COMMUTATIVE and vy < vx else (code, vx, vy)
+                    place, reason = exprs.get(key), "cse"
+
+                if place is None:
+                    if res >= 0:
+                        before_store(res)
+                        values.pop(res, None)
+                    emit(code, x, y, res)
+                    if key is not None and res < 0:
+                        exprs[key] = res
+                elif res < 0 and droppable[-res]:
+                    alias[res] = place
+                    dropped[reason] += 1
+                    if place >= 0 and number(place) is None:
+                        pending.setdefault(place, []).append(res)
+                else:
+                    if res >= 0:
+                        store(res, place)
+                    emit(OP_ASSIGN, place, 0, res)
+
+            elif code == OP_ASSIGN:
+                x = read(a1)
+                if res < 0:
+                    emit(code, x, 0, res)
+                elif x == res:                       # "a = a", left by an identity
+                    dropped["identities"] += 1
+                else:
+                    store(res, x)
+                    emit(code, x, 0, res)
+
+            elif code == OP_IFFALSE:
+                x    = read(a1)
+                cond = number(x)
+                if cond is None:
+                    emit(code, x, 0, res)
+                elif not cond:                       # always taken
+                    emit(OP_GOTO, 0, 0, res)
+                else:                                # never taken
+                    dropped["folded"] += 1
+                end_block()
+
+            elif code == OP_LABEL or code == OP_GOTO:
+                end_block()
+                emit(code, a1, a2, res)
+
+            elif code == OP_RETURN:
+                emit(code, read(a1), 0, 0)
+                end_block()
+
+            else:                                    # call — scanf may store into any variable
+                for var in list(pending):
+                    before_store(var)
+                values.clear()
+                emit(code, a1, a2, res)
+
+        self.after = len(out)
+        return out
+
+    @staticmethod
+    def _temp_uses(ir):
+        # Per temp number: whether it may be dropped (every use in its own block, none inside a
+        # call's argument text) and how many operand uses it has — None if some instruction
+        # stores into a constant or into an already defined temp
+        temps     = ir.temps
+        droppable = bytearray(temps + 1)
+        uses      = array('i', [0]) * (temps + 1)
+        home      = array('i', [-1]) * (temps + 1)
+        pool      = ir.pool
+        block     = 0
+        for code, a1, a2, res in zip(ir.ops, ir.arg1, ir.arg2, ir.result):
+            if code == OP_LABEL:
+                block += 1
+            if res < 0:
+                if home[-res] >= 0:
+                    return None
+                home[-res]      = block
+                droppable[-res] = 1
+            elif code == OP_ASSIGN and _literal(pool[res]) is not None:
+                return None
+            for op in (a1, a2):
+                if op < 0:
+                    uses[-op] += 1
+                    if home[-op] != block:
+                        droppable[-op] = 0
+            if code == OP_CALL:
+                for n in _TEMP_NAME.findall(pool[a2]):
+                    if int(n) <= temps:
+                        droppable[int(n)] = 0
+            elif code == OP_GOTO or code == OP_IFFALSE or code == OP_RETURN:
+                block += 1
+        return droppable, uses
+
+    def report(self):
+        # What the last optimize() call did, as a JSON-ready dict
+        return {
+            "level":               self.level,
+            "before":              self.before,
+            "after":               self.after,
+            "removed":             self.before - self.after,
+            "folded":              self.dropped["folded"],
+            "identities":          self.dropped["identities"],
+            "commonSubexpressions": self.dropped["cse"],
+        }
+
+
+def _literal(text):
+    # Value of a numeric constant operand ("12", "3.5", or "-4" after folding), else None
+    digits = text[1:] if text[:1] == "-" else text
+    if not digits[:1].isdigit():
+        return None
+    return float(text) if "." in text or "e" in text else int(text)
+
+
+def _text(value):
+    # Operand text of a folded constant
+    return repr(value) if type(value) is float else str(value)
+
+
+def _fold(code, x, y):
+    # x <op> y on two constants as C computes it, or None (division by zero, inf / nan)
+    if code == OP_DIV:
+        if y == 0:
+            return None
+        if type(x) is int and type(y) is int:
+            quotient = abs(x) // abs(y)              # C truncates toward zero
+            return quotient if (x < 0) == (y < 0) else -quotient
+        value = x / y
+    else:
+        value = _APPLY[code](x, y)
+    return value if type(value) is int or math.isfinite(value) else None
+
+
+def _identity(code, x, y, cx, cy):
+    # The operand x <op> y reduces to, or None. Only integer 0 / 1 qualify: x * 1.0 is a float
+    # even when x is an int
+    if code == OP_ADD:
+        if cy == 0 and type(cy) is int:
+            return x
+        if cx == 0 and type(cx) is int:
+            return y
+    elif code == OP_SUB or code == OP_DIV:
+        if cy == (0 if code == OP_SUB else 1) and type(cy) is int:
+            return x
+    elif code == OP_MUL:
+        if cy == 1 and type(cy) is int:
+            return x
+        if cx == 1 and type(cx) is int:
+            return y
+    return None
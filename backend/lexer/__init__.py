@@ -1,5 +1,8 @@
 # Make lexer a package
 from .tokenizer import Tokenizer, Token
+from .token_stream import TokenStream
+from .incremental import IncrementalLexer
+from .line_index import LineIndex
 from .token_types import *
 
-__all__ = ['Tokenizer', 'Token']
+__all__ = ['Tokenizer', 'Token', 'TokenStream', 'IncrementalLexer', 'LineIndex']
@@ -0,0 +1,240 @@
+# Table-driven DFA lexer engine — compiled once from token_types.py into dense transition tables
+#
+# Scanning is maximal munch with backtracking to the last accepting state. Pairs of
+# (state, position) that are known not to reach an accepting state are memoized, so an
+# input full of unterminated `"` or `/*` is still scanned in linear time (Reps, 1998).
+
+from .token_types import (
+    KEYWORD, IDENTIFIER, NUMBER, OPERATOR, SEPARATOR, STRING,
+    KEYWORDS, OPERATORS, SEPARATORS,
+    TOKEN_TYPE_CODES,
+)
+from .token_stream import TokenStream
+
+_DEAD  = 0
+_START = 1
+
+# Column used for every non-ASCII character while building
+_NON_ASCII = 128
+_ALL_CHARS = tuple(range(129))
+
+# Accept labels for tokens that are scanned but never emitted
+_SKIP_CODE    = -1
+_COMMENT_CODE = -2
+_NEWLINE_CODE = -3
+
+_UNKNOWN_CODE = TOKEN_TYPE_CODES['UNKNOWN']
+
+_IDENT_START = frozenset(map(ord, 'abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ_'))
+_DIGITS      = frozenset(map(ord, '0123456789'))
+_IDENT_CHARS = _IDENT_START | _DIGITS
+
+
+class _Builder:
+    # Sparse DFA under construction — one {column: target} dict per state
+
+    def __init__(self):
+        self.edges  = [{}, {}]        # _DEAD, _START
+        self.accept = [None, None]
+
+    def state(self, accept=None):
+        self.edges.append({})
+        self.accept.append(accept)
+        return len(self.edges) - 1
+
+    def edge(self, src, columns, dst):
+        for col in columns:
+            old = self.edges[src].get(col)
+            if old is not None and old != dst:
+                raise ValueError(f"DFA conflict on {chr(col)!r} from state {src}")
+            self.edges[src][col] = dst
+
+
+def _build():
+    # Build the sparse DFA for the C subset described in token_types.py
+    b        = _Builder()
+    keyword  = TOKEN_TYPE_CODES[KEYWORD]
+    ident    = TOKEN_TYPE_CODES[IDENTIFIER]
+    number   = TOKEN_TYPE_CODES[NUMBER]
+    operator = TOKEN_TYPE_CODES[OPERATOR]
+    sep      = TOKEN_TYPE_CODES[SEPARATOR]
+    string   = TOKEN_TYPE_CODES[STRING]
+
+    # Identifiers, with a trie of keyword prefixes so keywords are recognised by state
+    ident_loop = b.state(ident)
+    b.edge(ident_loop, _IDENT_CHARS, ident_loop)
+
+    trie = {'': _START}
+    for word in sorted(KEYWORDS):
+        for n in range(1, len(word) + 1):
+            prefix = word[:n]
+            if prefix not in trie:
+                trie[prefix] = b.state(ident)
+        b.accept[trie[word]] = keyword
+
+    for prefix, src in trie.items():
+        for col in (_IDENT_START if src == _START else _IDENT_CHARS):
+            nxt = trie.get(prefix + chr(col), ident_loop)
+            b.edge(src, (col,), nxt)
+
+    # Numbers: digits, optionally followed by `.digits`
+    num      = b.state(number)
+    num_dot  = b.state()
+    fraction = b.state(number)
+    b.edge(_START, _DIGITS, num)
+    b.edge(num, _DIGITS, num)
+    b.edge(num, (ord('.'),), num_dot)
+    b.edge(num_dot, _DIGITS, fraction)
+    b.edge(fraction, _DIGITS, fraction)
+
+    # Operators and separators as a trie over their spellings
+    fixed = {'': _START}
+    for spelling, label in sorted([(op, operator) for op in OPERATORS] +
+                                  [(s, sep) for s in SEPARATORS]):
+        for n in range(1, len(spelling) + 1):
+            prefix = spelling[:n]
+            if prefix not in fixed:
+                fixed[prefix] = b.state()
+                b.edge(fixed[spelling[:n - 1]], (ord(spelling[n - 1]),), fixed[prefix])
+        b.accept[fixed[spelling]] = label
+
+    # Comments hang off the `/` operator state
+    slash      = fixed['/']
+    line_cmt   = b.state(_COMMENT_CODE)
+    block      = b.state()
+    block_star = b.state()
+    block_end  = b.state(_COMMENT_CODE)
+    b.edge(slash, (ord('/'),), line_cmt)
+    b.edge(slash, (ord('*'),), block)
+    b.edge(line_cmt, [c for c in _ALL_CHARS if c != ord('\n')], line_cmt)
+    b.edge(block, [c for c in _ALL_CHARS if c != ord('*')], block)
+    b.edge(block, (ord('*'),), block_star)
+    b.edge(block_star, [c for c in _ALL_CHARS if c not in (ord('*'), ord('/'))], block)
+    b.edge(block_star, (ord('*'),), block_star)
+    b.edge(block_star, (ord('/'),), block_end)
+
+    # String literals: no raw newline, backslash escapes any other character
+    in_str  = b.state()
+    str_esc = b.state()
+    str_end = b.state(string)
+    b.edge(_START, (ord('"'),), in_str)
+    b.edge(in_str, [c for c in _ALL_CHARS if c not in (ord('"'), ord('\\'), ord('\n'))], in_str)
+    b.edge(in_str, (ord('"'),), str_end)
+    b.edge(in_str, (ord('\\'),), str_esc)
+    b.edge(str_esc, [c for c in _ALL_CHARS if c != ord('\n')], in_str)
+
+    # Whitespace runs and newlines
+    space   = b.state(_SKIP_CODE)
+    newline = b.state(_NEWLINE_CODE)
+    b.edge(_START, (ord(' '), ord('\t')), space)
+    b.edge(space, (ord(' '), ord('\t')), space)
+    b.edge(_START, (ord('\n'),), newline)
+
+    return b.edges, b.accept
+
+
+class LexerDFA:
+    # Dense, character-class-compressed transition table plus a linear-time scanner
+
+    def __init__(self):
+        edges, accept = _build()
+
+        # Columns with identical transitions across all states share one character class;
+        # non-ASCII is listed first so it always gets class 0
+        classes = {}
+        col_class = {}
+        for col in (_NON_ASCII,) + tuple(range(128)):
+            column = tuple(e.get(col, _DEAD) for e in edges)
+            col_class[col] = classes.setdefault(column, len(classes))
+
+        self.n_states   = len(edges)
+        self.n_classes  = len(classes)
+        self.accept     = accept
+        self.class_table = {col: chr(col_class[col]) for col in range(128)}
+        self.transitions = [_DEAD] * (self.n_states * self.n_classes)
+        for state, e in enumerate(edges):
+            row = state * self.n_classes
+            for col, dst in e.items():
+                self.transitions[row + col_class[col]] = dst
+
+    def scan(self, code):
+        # Tokenize `code` into a TokenStream (same tokens as the regex engine)
+        stream = TokenStream(code)
+        self.scan_into(code, stream)
+        return stream
+
+    def scan_into(self, code, stream, pos=0, line=1, stop=None, stop_from=0):
+        # Append the tokens of code[pos:] to stream — see Tokenizer.scan for `line`, `stop`,
+        # `stop_from` and the (position, line) returned
+        types   = stream.types.append
+        starts  = stream.starts.append
+        ends    = stream.ends.append
+        lines   = stream.lines.append
+
+        trans   = self.transitions
+        accept  = self.accept
+        k       = self.n_classes
+        classes = [c if c < 128 else 0 for c in map(ord, code.translate(self.class_table))]
+        n       = len(code)
+        stride  = n + 1
+        failed  = set()
+
+        while pos < n:
+            state     = _START
+            i         = pos
+            last_end  = pos
+            last_code = None
+            last_state = _START
+
+            while i < n:
+                state = trans[state * k + classes[i]]
+                if state == _DEAD:
+                    break
+                i += 1
+                label = accept[state]
+                if label is not None:
+                    last_end, last_code, last_state = i, label, state
+                elif state * stride + i in failed:
+                    break
+
+            # Nothing past last_end can reach an accepting state — remember that
+            if i > last_end:
+                s = last_state
+                for j in range(last_end, i):
+                    s = trans[s * k + classes[j]]
+                    failed.add(s * stride + j + 1)
+
+            if last_code is None:
+                # No token starts here: one-character fallback, like the regex MISMATCH group
+                last_end  = pos + 1
+                last_code = _SKIP_CODE if code[pos] == '\r' else _UNKNOWN_CODE
+
+            if stop is not None and pos >= stop_from and stop(pos, last_end, last_code):
+                return pos, line
+
+            if last_code < 0:
+                if last_code == _NEWLINE_CODE:
+                    line += 1
+                elif last_code == _COMMENT_CODE:
+                    line += code.count('\n', pos, last_end)
+                pos = last_end
+                continue
+
+            types(last_code)
+            starts(pos)
+            ends(last_end)
+            lines(line)
+            pos = last_end
+
+        return n, line
+
+
+_COMPILED = None
+
+
+def compiled_dfa():
+    # The DFA is built once per process and shared by every Tokenizer
+    global _COMPILED
+    if _COMPILED is None:
+        _COMPILED = LexerDFA()
+    return _COMPILED
@@ -0,0 +1,87 @@
+# Incremental re-lexing — re-scan only the region an edit damaged, splice the rest of the old stream back in
+
+from array import array
+from bisect import bisect_left, bisect_right
+
+from .tokenizer import Tokenizer
+from .token_stream import TokenStream
+
+
+class IncrementalLexer:
+    # Keeps a Tokenizer and turns (old stream, edit) into the stream a full re-tokenize would produce
+
+    def __init__(self, tokenizer=None):
+        self.tokenizer      = tokenizer or Tokenizer()
+        self.last_rescanned = 0   # tokens produced by the re-scan in the last apply_edit()
+
+    def tokenize(self, code):
+        return self.tokenizer.tokenize_stream(code)
+
+    def apply_edit(self, stream, offset, deleted, inserted):
+        # Replace source[offset:offset+deleted] with `inserted`; returns a new TokenStream
+        old_src = stream.source
+        if offset < 0 or deleted < 0 or offset + deleted > len(old_src):
+            raise ValueError(f"Edit ({offset}, {deleted}) is outside the source (length {len(old_src)})")
+
+        new_src    = old_src[:offset] + inserted + old_src[offset + deleted:]
+        delta      = len(inserted) - deleted
+        line_delta = inserted.count('\n') - old_src.count('\n', offset, offset + deleted)
+        edit_end   = offset + deleted          # first untouched char, old coordinates
+
+        restart_idx = self._restart_index(stream, offset)
+        restart     = stream.ends[restart_idx - 1] if restart_idx else 0
+        line_num    = stream.lines[restart_idx - 1] if restart_idx else 1
+
+        result = TokenStream(new_src)
+        result.types  = stream.types[:restart_idx]
+        result.starts = stream.starts[:restart_idx]
+        result.ends   = stream.ends[:restart_idx]
+        result.lines  = stream.lines[:restart_idx]
+
+        old_starts = stream.starts
+        old_count  = len(stream)
+        old_idx    = bisect_left(old_starts, edit_end)
+        synced     = None
+
+        def stop(start, end, type_code):
+            # Past the edit, a token boundary shared with the old stream means the rest is unchanged
+            nonlocal old_idx, synced
+            old_pos = start - delta
+            while old_idx < old_count and old_starts[old_idx] < old_pos:
+                old_idx += 1
+            if old_idx < old_count and old_starts[old_idx] == old_pos:
+                synced = old_idx
+                return True
+            return False
+
+        self.tokenizer.scan(new_src, result, restart, line_num, stop, edit_end + delta)
+        self.last_rescanned = len(result) - restart_idx
+
+        if synced is not None:
+            result.types.extend(stream.types[synced:])
+            result.starts.extend(_shifted(old_starts, synced, delta))
+            result.ends.extend(_shifted(stream.ends, synced, delta))
+            result.lines.extend(_shifted(stream.lines, synced, line_delta))
+
+        return result
+
+    def _restart_index(self, stream, offset):
+        # Index of the first token to re-scan: everything on the edited line onward, and
+        # anything after a `/*` that never closed (a new `*/` could turn it into a comment)
+        src  = stream.source
+        line = src.count('\n', 0, offset) + 1
+        idx  = bisect_left(stream.lines, line)
+
+        # An opener can only be unterminated if no `*/` starts at least two chars after it
+        open_at = src.find('/*', max(0, src.rfind('*/') - 1), offset)
+        if open_at != -1:
+            idx = min(idx, bisect_right(stream.ends, open_at))
+        return idx
+
+
+def _shifted(values, start, delta):
+    # values[start:] with delta added to each element
+    tail = values[start:]
+    if not delta:
+        return tail
+    return array(tail.typecode, [v + delta for v in tail])
@@ -0,0 +1,50 @@
+# Line/column index — line-start offsets built once per source, O(log n) offset → (line, col)
+
+from array import array
+from bisect import bisect_right
+
+
+class LineIndex:
+    # Lines and columns are 1-based; offsets are 0-based (chars for str sources, bytes for bytes)
+
+    __slots__ = ('line_starts', 'length')
+
+    def __init__(self, source):
+        newline = '\n' if isinstance(source, str) else b'\n'
+        starts  = array('I', [0])
+        find    = source.find
+        pos     = find(newline)
+        while pos != -1:
+            starts.append(pos + 1)
+            pos = find(newline, pos + 1)
+        self.line_starts = starts
+        self.length      = len(source)
+
+    def __len__(self):
+        # Number of lines (an empty source has one empty line)
+        return len(self.line_starts)
+
+    def offset_to_line(self, offset):
+        return bisect_right(self.line_starts, offset)
+
+    def offset_to_line_col(self, offset):
+        # (line, col) of a character offset
+        if offset < 0 or offset > self.length:
+            raise IndexError(f"Offset {offset} is outside the source (length {self.length})")
+        line = bisect_right(self.line_starts, offset)
+        return line, offset - self.line_starts[line - 1] + 1
+
+    def column(self, line, offset):
+        # Column of an offset already known to be on `line` — O(1), used for token streams
+        return offset - self.line_starts[line - 1] + 1
+
+    def line_col_to_offset(self, line, col):
+        return self.line_starts[line - 1] + col - 1
+
+    def line_span(self, line):
+        # (start, end) offsets of a line, end excluding its newline
+        if line < 1 or line > len(self.line_starts):
+            raise IndexError(f"Line {line} is outside the source ({len(self.line_starts)} lines)")
+        start = self.line_starts[line - 1]
+        end   = self.line_starts[line] - 1 if line < len(self.line_starts) else self.length
+        return start, end
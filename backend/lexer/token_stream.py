@@ -0,0 +1,117 @@
+# Compact struct-of-arrays token stream — shared by the lexer and the parser
+
+from array import array
+from .token_types import TOKEN_TYPE_NAMES, TOKEN_TYPE_CODES
+
+
+class TokenStream:
+    # Parallel arrays, one slot per token: type code (1 byte), start/end offset and line (4 bytes each)
+    # Token values are not stored — they are sliced from the source on demand
+
+    __slots__ = ('source', 'types', 'starts', 'ends', 'lines')
+
+    def __init__(self, source=''):
+        self.source = source
+        self.types  = array('B')
+        self.starts = array('I')
+        self.ends   = array('I')
+        self.lines  = array('I')
+
+    @classmethod
+    def from_dicts(cls, token_dicts):
+        # Build a stream from plain token dicts — values are laid out in a synthetic source at their
+        # 'start' offsets when the dicts carry them (gaps padded with spaces), end to end otherwise
+        stream = cls()
+        types, starts, ends, lines = stream.types, stream.starts, stream.ends, stream.lines
+        codes  = TOKEN_TYPE_CODES
+        values = []
+        offset = 0
+        for tok in token_dicts:
+            value = tok['value']
+            start = tok.get('start')
+            if start is not None and start > offset:
+                values.append(' ' * (start - offset))
+                offset = start
+            types.append(codes[tok['type']])
+            starts.append(offset)
+            offset += len(value)
+            ends.append(offset)
+            lines.append(tok['line'])
+            values.append(value)
+        stream.source = ''.join(values)
+        return stream
+
+    def __len__(self):
+        return len(self.types)
+
+    def append(self, type_code, start, end, line):
+        self.types.append(type_code)
+        self.starts.append(start)
+        self.ends.append(end)
+        self.lines.append(line)
+
+    def type_name(self, i):
+        return TOKEN_TYPE_NAMES[self.types[i]]
+
+    def value(self, i):
+        return self.source[self.starts[i]:self.ends[i]]
+
+    def line(self, i):
+        return self.lines[i]
+
+    def to_dicts(self, line_index=None):
+        # JSON-ready list of {type, value, line, start, end} — only built at the API boundary
+        # Pass the source's LineIndex to also get a 1-based 'col' per token
+        names, src = TOKEN_TYPE_NAMES, self.source
+        dicts = [
+            {'type': names[t], 'value': src[s:e], 'line': ln, 'start': s, 'end': e}
+            for t, s, e, ln in zip(self.types, self.starts, self.ends, self.lines)
+        ]
+        if line_index is not None:
+            column = line_index.column
+            for d in dicts:
+                d['col'] = column(d['line'], d['start'])
+        return dicts
+
+
+_UTF8_CONTINUATION = bytes(range(0x80, 0xc0))
+
+
+class MappedTokenStream(TokenStream):
+    # TokenStream over a bytes-like UTF-8 buffer (e.g. an mmap) — offsets are byte offsets,
+    # values are decoded to str only when asked for
+
+    __slots__ = ()
+
+    def value(self, i):
+        return self.source[self.starts[i]:self.ends[i]].decode('utf-8')
+
+    def to_dicts(self, line_index=None):
+        # Same dicts as the str path — byte offsets are converted to character offsets
+        # line_index is the LineIndex of the byte buffer (LineIndex(stream.source)); 'col' is
+        # then counted in characters too, as for a str source
+        names, src = TOKEN_TYPE_NAMES, self.source
+        dicts      = []
+        byte_pos   = char_pos = 0
+        col_line   = line_start = None     # line of the last token given a column, its char start
+        for t, s, e, ln in zip(self.types, self.starts, self.ends, self.lines):
+            # Characters in the gap = its bytes minus UTF-8 continuation bytes
+            start = char_pos + len(src[byte_pos:s].translate(None, _UTF8_CONTINUATION))
+            value = src[s:e].decode('utf-8')
+            end   = start + len(value)
+            token = {'type': names[t], 'value': value, 'line': ln, 'start': start, 'end': end}
+            if line_index is not None:
+                if ln != col_line:
+                    line_bytes = src[line_index.line_starts[ln - 1]:s]
+                    col_line   = ln
+                    line_start = start - len(line_bytes.translate(None, _UTF8_CONTINUATION))
+                token['col'] = start - line_start + 1
+            dicts.append(token)
+            byte_pos, char_pos = e, end
+        return dicts
+
+    def close(self):
+        # Release the underlying mapping (values can no longer be read afterwards)
+        close = getattr(self.source, 'close', None)
+        if close:
+            close()
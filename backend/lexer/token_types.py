@@ -26,3 +26,7 @@ OPERATORS = {
 SEPARATORS = {
     ';', '{', '}', '(', ')', ',', '&'
 }
+
+# Small-int type codes used by the compact TokenStream (code = index into TOKEN_TYPE_NAMES)
+TOKEN_TYPE_NAMES = (KEYWORD, IDENTIFIER, NUMBER, OPERATOR, SEPARATOR, STRING, UNKNOWN)
+TOKEN_TYPE_CODES = {name: code for code, name in enumerate(TOKEN_TYPE_NAMES)}
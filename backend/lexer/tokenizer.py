@@ -1,19 +1,50 @@
 # Lexical Analyzer (Tokenizer) for C Code — Phase 2
 
+import mmap
+import os
 import re
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
 from .token_types import (
     KEYWORD, IDENTIFIER, NUMBER, OPERATOR,
     SEPARATOR, STRING, WHITESPACE, COMMENT, UNKNOWN,
-    KEYWORDS, OPERATORS, SEPARATORS
+    KEYWORDS, OPERATORS, SEPARATORS,
+    TOKEN_TYPE_NAMES, TOKEN_TYPE_CODES,
 )
+from .token_stream import TokenStream, MappedTokenStream
+from .dfa import compiled_dfa
+
+# Internal group kinds used only while scanning — never emitted as tokens
+_NEWLINE  = "NEWLINE"
+_MISMATCH = "MISMATCH"
+
+_SKIP_CODE     = -1
+_COMMENT_CODE  = -2
+_NEWLINE_CODE  = -3
+_MISMATCH_CODE = -4
+
+_KEYWORD_CODE    = TOKEN_TYPE_CODES[KEYWORD]
+_IDENTIFIER_CODE = TOKEN_TYPE_CODES[IDENTIFIER]
+_UNKNOWN_CODE    = TOKEN_TYPE_CODES[UNKNOWN]
+_STRING_CODE     = TOKEN_TYPE_CODES[STRING]
+
+_KEYWORDS_BYTES = frozenset(k.encode() for k in KEYWORDS)
+
+# Scanning engines for tokenize_stream() — pick with Tokenizer(engine=...) or CPARSER_LEXER_ENGINE
+ENGINES = ('regex', 'dfa')
+
+# Longest lookahead any pattern needs past a match (`1.` only becomes `1.5` two chars later)
+_LOOKAHEAD = 2
 
 
 class Token:
-    # Represents a single token
-    def __init__(self, token_type, value, line):
+    # Represents a single token — start/end are source offsets ([start, end), resolvable via LineIndex)
+    def __init__(self, token_type, value, line, start=None, end=None):
         self.type  = token_type
         self.value = value
         self.line  = line
+        self.start = start
+        self.end   = end
 
     def to_dict(self):
         # Convert token to dictionary for JSON serialization
@@ -21,69 +52,229 @@ class Token:
             'type':  self.type,
             'value': self.value,
             'line':  self.line,
+            'start': self.start,
+            'end':   self.end,
         }
 
 
 class Tokenizer:
     # Regex-based tokenizer for C code (Phase 2)
 
-    def __init__(self):
+    def __init__(self, engine=None):
+        engine = engine or os.getenv('CPARSER_LEXER_ENGINE', 'regex')
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown lexer engine '{engine}' (expected one of {', '.join(ENGINES)})")
+        self.engine = engine
+        self._dfa   = compiled_dfa() if engine == 'dfa' else None
+
         # Token patterns — ORDER MATTERS (most specific first)
         self.token_patterns = [
-            (STRING,     r'"(?:[^"\\]|\\.)*"'),
+            (STRING,     r'"(?:[^"\\\n]|\\.)*"'),
+            (COMMENT,    r'//.*'),
+            (COMMENT,    r'/\*[\s\S]*?\*/'),
             (OPERATOR,   r'==|!=|<=|>=|\+\+|--'),
             (IDENTIFIER, r'[a-zA-Z_][a-zA-Z0-9_]*'),
             (NUMBER,     r'\d+\.\d+|\d+'),
             (OPERATOR,   r'[+\-*/=<>]'),
             (SEPARATOR,  r'[;{}(),&]'),
             (WHITESPACE, r'[ \t]+'),
-            (COMMENT,    r'//.*'),
-            (COMMENT,    r'/\*[\s\S]*?\*/'),
         ]
 
-        # Build master regex with named groups
+        # Build master regex with named groups — the trailing NEWLINE / MISMATCH
+        # groups make the alternation total, so one finditer() covers the buffer
         self.master_pattern = '|'.join(
-            f'(?P<{name}{i}>{pattern})'
-            for i, (name, pattern) in enumerate(self.token_patterns)
+            [f'(?P<{name}{i}>{pattern})'
+             for i, (name, pattern) in enumerate(self.token_patterns)]
+            + [f'(?P<{_NEWLINE}>\\n)', f'(?P<{_MISMATCH}>.)']
         )
-        self.master_regex = re.compile(self.master_pattern)
+        self.master_regex = re.compile(self.master_pattern, re.ASCII)
 
-    def tokenize(self, code):
-        # Tokenize the input C code, returns list of Token objects (whitespace/comments excluded)
-        tokens    = []
-        lines     = code.split('\n')
+        # Bytes form for memory-mapped sources — MISMATCH takes a whole UTF-8 sequence
+        # so non-ASCII characters still come out as one UNKNOWN token each
+        self.master_pattern_bytes = '|'.join(
+            [f'(?P<{name}{i}>{pattern})'
+             for i, (name, pattern) in enumerate(self.token_patterns)]
+            + [f'(?P<{_NEWLINE}>\\n)', f'(?P<{_MISMATCH}>[\\xc0-\\xff][\\x80-\\xbf]*|.)']
+        ).encode()
+        self.master_regex_bytes = re.compile(self.master_pattern_bytes)
+
+        # Group name → type code, looked up via match.lastgroup (negative codes are never emitted)
+        scan_codes = dict(TOKEN_TYPE_CODES)
+        scan_codes.update({
+            WHITESPACE: _SKIP_CODE,
+            COMMENT:    _COMMENT_CODE,
+            _NEWLINE:   _NEWLINE_CODE,
+            _MISMATCH:  _MISMATCH_CODE,
+        })
+        self._group_codes = {
+            f'{name}{i}': scan_codes[name] for i, (name, _) in enumerate(self.token_patterns)
+        }
+        self._group_codes[_NEWLINE]  = _NEWLINE_CODE
+        self._group_codes[_MISMATCH] = _MISMATCH_CODE
+
+    def tokenize_stream(self, code):
+        # Single pass over the whole buffer into a compact TokenStream (whitespace/comments excluded)
+        stream = TokenStream(code)
+        self.scan(code, stream)
+        return stream
+
+    def tokenize_buffer(self, buffer):
+        # Tokenize a bytes-like UTF-8 buffer in place — values stay as byte offsets into it
+        stream = MappedTokenStream(buffer)
+        self.scan(buffer, stream)
+        return stream
+
+    def scan(self, text, stream, pos=0, line=1, stop=None, stop_from=0):
+        # The scanning loop behind every tokenize path: appends the tokens of text[pos:] to
+        # stream, numbering lines from `line`, and returns the (position, line) it stopped at.
+        # stop(start, end, code), if given, is asked before each match starting at or after
+        # stop_from — tokens and the whitespace, comments and newlines that are never emitted
+        # (negative codes) alike — and a true answer ends the scan at that match. str text
+        # goes through the configured engine; bytes (mapped files) always through the regex one
+        if isinstance(text, str):
+            if self._dfa is not None:
+                return self._dfa.scan_into(text, stream, pos, line, stop, stop_from)
+            regex, keywords, newline, cr = self.master_regex, KEYWORDS, '\n', '\r'
+        else:
+            regex, keywords, newline, cr = self.master_regex_bytes, _KEYWORDS_BYTES, b'\n', b'\r'
 
-        for line_num, line in enumerate(lines, start=1):
-            position = 0
+        types       = stream.types.append
+        starts      = stream.starts.append
+        ends        = stream.ends.append
+        lines       = stream.lines.append
+        group_codes = self._group_codes
 
-            while position < len(line):
-                match = self.master_regex.match(line, position)
+        for match in regex.finditer(text, pos):
+            type_code = group_codes[match.lastgroup]
 
-                if match:
-                    token_type  = None
-                    token_value = match.group()
+            if stop is not None:
+                start, end = match.span()
+                if start >= stop_from and stop(start, end, type_code):
+                    return start, line
 
-                    for i, (pattern_type, _) in enumerate(self.token_patterns):
-                        if match.group(f'{pattern_type}{i}'):
-                            token_type = pattern_type
-                            break
+            if type_code < 0:
+                if type_code == _NEWLINE_CODE:
+                    line += 1
+                    continue
+                if type_code == _COMMENT_CODE:
+                    line += match.group().count(newline)
+                    continue
+                if type_code == _SKIP_CODE or match.group() == cr:
+                    continue
+                type_code = _UNKNOWN_CODE
+            elif type_code == _IDENTIFIER_CODE and match.group() in keywords:
+                type_code = _KEYWORD_CODE
 
-                    if token_type not in (WHITESPACE, COMMENT):
-                        if token_type == IDENTIFIER and token_value in KEYWORDS:
-                            token_type = KEYWORD
+            start, end = match.span()
+            types(type_code)
+            starts(start)
+            ends(end)
+            lines(line)
 
-                        tokens.append(Token(token_type, token_value, line_num))
+        return len(text), line
 
-                    position = match.end()
+    def tokenize_file(self, path):
+        # Memory-map a UTF-8 source file and tokenize it without reading or decoding it whole
+        # The returned stream keeps the mapping open — call stream.close() when done
+        with open(path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return self.tokenize_buffer(b'')
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return self.tokenize_buffer(buffer)
 
-                else:
-                    ch = line[position]
-                    if ch not in (' ', '\t', '\n', '\r'):
-                        tokens.append(Token(UNKNOWN, ch, line_num))
-                    position += 1
+    def tokenize_many(self, sources, workers=None, chunk_size=None):
+        # Tokenize many independent sources across a process pool; returns TokenStreams in input order
+        # Workers send back only the four arrays — the sources never travel back over the pipe
+        sources = list(sources)
+        workers = workers or os.cpu_count() or 1
+        if workers <= 1 or len(sources) <= 1:
+            return [self.tokenize_stream(code) for code in sources]
 
-        return tokens
+        chunk_size = chunk_size or max(1, -(-len(sources) // (workers * 4)))
+        batches    = [sources[i:i + chunk_size] for i in range(0, len(sources), chunk_size)]
+        streams    = []
+
+        with ProcessPoolExecutor(max_workers=min(workers, len(batches))) as pool:
+            for batch, results in zip(batches, pool.map(_tokenize_batch, repeat(self.engine), batches)):
+                for code, (types, starts, ends, lines) in zip(batch, results):
+                    stream        = TokenStream(code)
+                    stream.types  = types
+                    stream.starts = starts
+                    stream.ends   = ends
+                    stream.lines  = lines
+                    streams.append(stream)
+
+        return streams
+
+    def tokenize(self, code):
+        # Tokenize the input C code, returns list of Token objects (whitespace/comments excluded)
+        stream = self.tokenize_stream(code)
+        names  = TOKEN_TYPE_NAMES
+        return [
+            Token(names[t], code[s:e], ln, s, e)
+            for t, s, e, ln in zip(stream.types, stream.starts, stream.ends, stream.lines)
+        ]
+
+    def iter_tokens(self, source, chunk_size=1 << 16):
+        # Lazily yield Token objects from a text file object or an iterable of str chunks
+        # Only the unconsumed tail of the current chunk is kept, plus any block comment still open
+        if hasattr(source, 'read'):
+            reader = source.read
+            source = iter(lambda: reader(chunk_size), '')
+
+        names    = TOKEN_TYPE_NAMES
+        chunks   = iter(source)
+        buf      = ''
+        base     = 0           # absolute offset of buf[0]
+        line_num = 1
+        final    = False
+
+        def hold_back(start, end, type_code):
+            # Stop before anything the next chunk could still extend or complete
+            if final or type_code == _STRING_CODE or (type_code == _COMMENT_CODE and buf[start + 1] == '*'):
+                return False
+            if buf[start] == '"' and buf.find('\n', start) == -1:
+                return True
+            return buf.startswith('/*', start) or end + _LOOKAHEAD > len(buf)
+
+        while not final:
+            chunk = next(chunks, None)
+            if chunk is None:
+                final = True
+            elif not chunk:
+                continue
+            else:
+                buf += chunk
+
+            # Only the last line, or a `/*` that may not be closed yet, can be held back
+            hold_from = buf.rfind('\n')
+            opener    = buf.find('/*', max(0, buf.rfind('*/') - 1))
+            if opener != -1:
+                hold_from = min(hold_from, opener)
+
+            stream        = TokenStream(buf)
+            pos, line_num = self.scan(buf, stream, 0, line_num, hold_back, max(hold_from, 0))
+            for type_code, start, end, line in zip(stream.types, stream.starts, stream.ends, stream.lines):
+                yield Token(names[type_code], buf[start:end], line, base + start, base + end)
+
+            buf   = buf[pos:]
+            base += pos
 
     def tokenize_to_dict(self, code):
         # Tokenize and return list of plain dicts (JSON-ready)
-        return [t.to_dict() for t in self.tokenize(code)]
+        return self.tokenize_stream(code).to_dicts()
+
+
+_worker_tokenizer = None
+
+
+def _tokenize_batch(engine, sources):
+    # Process-pool worker for Tokenizer.tokenize_many — one Tokenizer per worker process
+    global _worker_tokenizer
+    if _worker_tokenizer is None or _worker_tokenizer.engine != engine:
+        _worker_tokenizer = Tokenizer(engine)
+    results = []
+    for code in sources:
+        stream = _worker_tokenizer.tokenize_stream(code)
+        results.append((stream.types, stream.starts, stream.ends, stream.lines))
+    return results
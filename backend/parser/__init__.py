@@ -1,4 +1,5 @@
 # backend/parser/__init__.py
 from .parser import CParser, ParseError
+from .visitor import ASTVisitor
 
-__all__ = ['CParser', 'ParseError']
+__all__ = ['CParser', 'ParseError', 'ASTVisitor']
@@ -0,0 +1,275 @@
+# Compact AST mode — a parsed tree packed into a flat arena of parallel arrays
+#
+# Nodes are numbered breadth-first, so each node's children occupy one contiguous index
+# range. Strings (names, operators, literals) are interned once in a string table.
+# ArenaNode views expose the same attributes as the node classes, so ASTVisitor
+# subclasses (SemanticAnalyzer, ICGGenerator) walk an arena unchanged.
+
+from array import array
+
+from .ast_nodes import (
+    ProgramNode, VarDeclNode, AssignNode, IfNode, WhileNode,
+    PrintfNode, ScanfNode,
+    BinaryOpNode, UnaryOpNode,
+    NumberNode, IdentNode, StringNode,
+)
+from .parser import _ReturnNode, _PostfixStmtNode, _PrefixStmtNode, _ErrorSentinel
+
+KIND_NAMES = (
+    "Program", "VarDecl", "Assign", "If", "While", "Printf", "Scanf", "Return",
+    "PostfixStmt", "PrefixStmt", "BinaryOp", "UnaryOp", "Number", "Identifier",
+    "String", "SyntaxError",
+)
+KIND_CODES = {name: code for code, name in enumerate(KIND_NAMES)}
+
+_NONE = -1   # stored for a missing line / offset
+
+# Strings kept per node kind, in order
+_PAYLOAD = {
+    "VarDecl":     lambda n: (n.var_type, n.name),
+    "Assign":      lambda n: (n.name,),
+    "Printf":      lambda n: (n.fmt_string,),
+    "Scanf":       lambda n: (n.fmt_string, *n.vars_),
+    "BinaryOp":    lambda n: (n.op,),
+    "UnaryOp":     lambda n: (n.op,),
+    "Number":      lambda n: (n.value,),
+    "Identifier":  lambda n: (n.name,),
+    "String":      lambda n: (n.value,),
+    "PostfixStmt": lambda n: (n.op, n.name),
+    "PrefixStmt":  lambda n: (n.op, n.name),
+    "SyntaxError": lambda n: (n.message,),
+}
+
+
+def _optional(value):
+    return _NONE if value is None else value
+
+
+class ASTArena:
+    # One slot per node in each array; node 0 is the root
+
+    __slots__ = ('kinds', 'lines', 'starts', 'ends', 'start_lines', 'end_lines',
+                 'child_start', 'child_count', 'payload_start', 'payload_count',
+                 'payload', 'strings', 'aux')
+
+    def __init__(self):
+        self.kinds         = array('B')
+        self.lines         = array('i')
+        self.starts        = array('i')
+        self.ends          = array('i')
+        self.start_lines   = array('i')
+        self.end_lines     = array('i')
+        self.child_start   = array('I')
+        self.child_count   = array('I')
+        self.payload_start = array('I')
+        self.payload_count = array('H')
+        self.payload       = array('I')   # indices into strings
+        self.strings       = []
+        self.aux           = array('I')   # If: number of then-statements
+
+    @classmethod
+    def from_tree(cls, root):
+        # Pack a typed tree (ProgramNode from CParser.parse_tree()) breadth-first
+        arena      = cls()
+        string_ids = {}
+        strings    = arena.strings
+        payload    = arena.payload
+        kinds, lines, starts, ends = (arena.kinds.append, arena.lines.append,
+                                      arena.starts.append, arena.ends.append)
+        start_lines, end_lines     = arena.start_lines.append, arena.end_lines.append
+        child_start, child_count   = arena.child_start.append, arena.child_count.append
+        payload_start, payload_count, aux = (arena.payload_start.append,
+                                             arena.payload_count.append, arena.aux.append)
+        codes    = KIND_CODES
+        queue    = [root]
+        next_idx = 1
+
+        for node in queue:   # the queue grows while it is iterated
+            kind = node.node_type
+            line = node.line
+
+            kinds(codes[kind])
+            lines(_NONE if line is None else line)
+            starts(_optional(node.start))
+            ends(_optional(node.end))
+            start_lines(_optional(node.start_line))
+            end_lines(_optional(node.end_line))
+
+            children = node.children()
+            child_start(next_idx)
+            child_count(len(children))
+            next_idx += len(children)
+            queue.extend(children)
+
+            extract = _PAYLOAD.get(kind)
+            values  = extract(node) if extract else ()
+            payload_start(len(payload))
+            payload_count(len(values))
+            for value in values:
+                sid = string_ids.get(value)
+                if sid is None:
+                    sid = string_ids[value] = len(strings)
+                    strings.append(value)
+                payload.append(sid)
+
+            aux(len(node.then_body) if kind == "If" else 0)
+
+        return arena
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def root(self):
+        return ArenaNode(self, 0)
+
+    def nbytes(self):
+        # Bytes held by the arrays and the string table (the arena's whole footprint)
+        arrays = (self.kinds, self.lines, self.starts, self.ends, self.start_lines,
+                  self.end_lines, self.child_start, self.child_count, self.payload_start,
+                  self.payload_count, self.payload, self.aux)
+        total  = sum(a.itemsize * len(a) for a in arrays)
+        return total + sum(len(s) + 49 for s in self.strings) + 8 * len(self.strings)
+
+    def to_tree(self, index=0):
+        # Rebuild the node objects under `index` (used for to_dict())
+        return ArenaNode(self, index).materialize()
+
+
+def _value(index):
+    return lambda v: v.arena.strings[v.arena.payload[v.arena.payload_start[v.index] + index]]
+
+
+def _child(index):
+    return lambda v: ArenaNode(v.arena, v.arena.child_start[v.index] + index)
+
+
+def _child_or_none(v):
+    arena = v.arena
+    return ArenaNode(arena, arena.child_start[v.index]) if arena.child_count[v.index] else None
+
+
+# Attribute getters per node kind — mirror the fields of the node classes
+_FIELDS = {
+    "Program":     {'statements': lambda v: v._children()},
+    "VarDecl":     {'var_type': _value(0), 'name': _value(1), 'init_expr': _child_or_none},
+    "Assign":      {'name': _value(0), 'expr': _child(0)},
+    "If":          {'condition': _child(0),
+                    'then_body': lambda v: v._children()[1:1 + v.arena.aux[v.index]],
+                    'else_body': lambda v: v._children()[1 + v.arena.aux[v.index]:] or None},
+    "While":       {'condition': _child(0), 'body': lambda v: v._children()[1:]},
+    "Printf":      {'fmt_string': _value(0), 'args': lambda v: v._children()},
+    "Scanf":       {'fmt_string': _value(0), 'vars_': lambda v: v._payload()[1:]},
+    "Return":      {'expr': _child_or_none},
+    "PostfixStmt": {'op': _value(0), 'name': _value(1)},
+    "PrefixStmt":  {'op': _value(0), 'name': _value(1)},
+    "BinaryOp":    {'op': _value(0), 'left': _child(0), 'right': _child(1)},
+    "UnaryOp":     {'op': _value(0), 'operand': _child(0)},
+    "Number":      {'value': _value(0)},
+    "Identifier":  {'name': _value(0)},
+    "String":      {'value': _value(0)},
+    "SyntaxError": {'message': _value(0)},
+}
+
+
+def _span_field(name):
+    def get(self):
+        value = getattr(self.arena, name)[self.index]
+        return None if value == _NONE else value
+    return property(get)
+
+
+class ArenaNode:
+    # Lightweight view of one arena slot — created on access, holds no node data itself
+
+    __slots__ = ('arena', 'index')
+
+    def __init__(self, arena, index):
+        self.arena = arena
+        self.index = index
+
+    line       = _span_field('lines')
+    start      = _span_field('starts')
+    end        = _span_field('ends')
+    start_line = _span_field('start_lines')
+    end_line   = _span_field('end_lines')
+
+    @property
+    def node_type(self):
+        return KIND_NAMES[self.arena.kinds[self.index]]
+
+    @property
+    def span(self):
+        return self.start_line, self.start, self.end_line, self.end
+
+    def __getattr__(self, name):
+        getter = _FIELDS[KIND_NAMES[self.arena.kinds[self.index]]].get(name)
+        if getter is None:
+            raise AttributeError(f"{self.node_type} node has no attribute '{name}'")
+        return getter(self)
+
+    def __eq__(self, other):
+        return isinstance(other, ArenaNode) and other.arena is self.arena and other.index == self.index
+
+    def __hash__(self):
+        return hash((id(self.arena), self.index))
+
+    def _children(self):
+        arena = self.arena
+        first = arena.child_start[self.index]
+        return [ArenaNode(arena, i) for i in range(first, first + arena.child_count[self.index])]
+
+    def _payload(self):
+        arena = self.arena
+        first = arena.payload_start[self.index]
+        return [arena.strings[sid] for sid in arena.payload[first:first + arena.payload_count[self.index]]]
+
+    def children(self):
+        return self._children()
+
+    def materialize(self):
+        # Equivalent node object (with its whole subtree)
+        kind = self.node_type
+        p    = self._payload
+        kids = [c.materialize() for c in self._children()]
+
+        if kind == "Program":
+            node = ProgramNode(kids)
+        elif kind == "VarDecl":
+            node = VarDeclNode(*p(), kids[0] if kids else None, self.line)
+        elif kind == "Assign":
+            node = AssignNode(p()[0], kids[0], self.line)
+        elif kind == "If":
+            split = 1 + self.arena.aux[self.index]
+            node  = IfNode(kids[0], kids[1:split], kids[split:] or None, self.line)
+        elif kind == "While":
+            node = WhileNode(kids[0], kids[1:], self.line)
+        elif kind == "Printf":
+            node = PrintfNode(p()[0], kids, self.line)
+        elif kind == "Scanf":
+            values = p()
+            node   = ScanfNode(values[0], values[1:], self.line)
+        elif kind == "Return":
+            node = _ReturnNode(kids[0] if kids else None, self.line)
+        elif kind == "PostfixStmt":
+            node = _PostfixStmtNode(*p(), self.line)
+        elif kind == "PrefixStmt":
+            node = _PrefixStmtNode(*p(), self.line)
+        elif kind == "BinaryOp":
+            node = BinaryOpNode(p()[0], kids[0], kids[1], self.line)
+        elif kind == "UnaryOp":
+            node = UnaryOpNode(p()[0], kids[0], self.line)
+        elif kind == "Number":
+            node = NumberNode(p()[0], self.line)
+        elif kind == "Identifier":
+            node = IdentNode(p()[0], self.line)
+        elif kind == "String":
+            node = StringNode(p()[0], self.line)
+        else:
+            node = _ErrorSentinel(p()[0], self.line)
+
+        node.start, node.end           = self.start, self.end
+        node.start_line, node.end_line = self.start_line, self.end_line
+        return node
+
+    def to_dict(self, max_depth=None, view=None):
+        return self.materialize().to_dict(max_depth, view)
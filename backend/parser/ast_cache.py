@@ -0,0 +1,82 @@
+# Server-side cache of parsed trees — lets the visualizer receive a depth-limited, paged AST
+# and expand its collapsed stubs on demand instead of downloading the whole tree up front.
+# An entry can also carry the tree's symbol cross-reference index, for /references
+
+import threading
+import uuid
+from collections import OrderedDict
+
+from .ast_nodes import _statement_dicts
+
+DEFAULT_CACHE_SIZE = 32
+
+
+class CachedTree:
+    # One parsed tree plus what has been handed out collapsed so far: stub id = index in
+    # `stubs`, holding either a node or a (statement list, offset) page. A node or page keeps
+    # its id however often it is collapsed again, so `stubs` is bounded by the tree's size
+
+    __slots__ = ('tree', 'page_size', 'xref', 'stubs', '_ids', '_lock')
+
+    def __init__(self, tree, page_size=None, xref=None):
+        self.tree      = tree
+        self.page_size = page_size
+        self.xref      = xref
+        self.stubs     = []
+        self._ids      = {}     # id(node) or (id(statement list), offset) -> stub id
+        self._lock     = threading.Lock()   # stub ids are handed out in serialization order
+
+    def register(self, item):
+        key     = (id(item[0]), item[1]) if isinstance(item, tuple) else id(item)
+        stub_id = self._ids.get(key)
+        if stub_id is None:
+            stub_id = self._ids[key] = len(self.stubs)
+            self.stubs.append(item)
+        return stub_id
+
+    def to_dict(self, max_depth=None):
+        with self._lock:
+            return self.tree.to_dict(max_depth, self)
+
+    def expand(self, node_id, max_depth=None):
+        # A stub's node, or a "More" entry's next statements, cut at max_depth — None for an
+        # unknown id. A page comes back as {"type": "Page", "children": [...]}
+        if not isinstance(node_id, int) or isinstance(node_id, bool) or not 0 <= node_id < len(self.stubs):
+            return None
+        with self._lock:
+            item = self.stubs[node_id]
+            if isinstance(item, tuple):
+                statements, offset = item
+                depth = None if max_depth is None else max_depth + 1   # a page is no level
+                return {"type": "Page", "children": _statement_dicts(statements, depth, self, offset)}
+            return item.to_dict(max_depth, self)
+
+
+class ASTCache:
+    # Least-recently-used map of tree id -> CachedTree, safe to share between request threads
+
+    def __init__(self, capacity=DEFAULT_CACHE_SIZE):
+        self.capacity = capacity
+        self._entries = OrderedDict()
+        self._lock    = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def put(self, tree, page_size=None, xref=None):
+        # Cache a tree, returns (tree id, CachedTree)
+        entry   = CachedTree(tree, page_size, xref)
+        tree_id = uuid.uuid4().hex
+        with self._lock:
+            self._entries[tree_id] = entry
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+        return tree_id, entry
+
+    def get(self, tree_id):
+        # The cached tree, or None once it has been evicted
+        with self._lock:
+            entry = self._entries.get(tree_id)
+            if entry is not None:
+                self._entries.move_to_end(tree_id)
+            return entry
@@ -1,136 +1,306 @@
 # AST Node Classes for C Parser — Phase 2, each node serializes to dict via .to_dict()
+# Nodes use __slots__ (no per-instance __dict__) so 200k-node programs stay compact
+# Number/Identifier/BinaryOp/UnaryOp carry a structural_hash, set when CParser hash-conses them.
+# A shared node has no position of its own, so statements holding expressions keep theirs:
+# positions is a flat (line, start, end, ...) tuple with one entry per identifier, in source order
+# to_dict(max_depth, view) stops max_depth levels down: deeper nodes become collapsed stubs,
+# and statement lists longer than view.page_size are cut into pages. Stubs and pages are
+# registered with the view (a CachedTree, see ast_cache.py) so they can be expanded later
 
 
 class ASTNode:
-    # Base class for all AST nodes
+    # Base class for all AST nodes — the parser stamps each node's source span:
+    # start/end offsets and the lines of its first and last token
+    __slots__ = ('line', 'start', 'end', 'start_line', 'end_line')
     node_type = "Node"
 
-    def to_dict(self):
+    def __init__(self, line=None):
+        self.line       = line
+        self.start      = None
+        self.end        = None
+        self.start_line = None
+        self.end_line   = None
+
+    @property
+    def span(self):
+        # (start line, start offset, end line, end offset)
+        return self.start_line, self.start, self.end_line, self.end
+
+    def children(self):
+        # Child nodes in source order (used by visitors for generic traversal)
+        return []
+
+    def deeper_than(self, depth):
+        # Whether some node lies more than depth levels below this one — iterative, so it
+        # also answers for trees nested too deep for to_dict()
+        stack = [(self, 0)]
+        while stack:
+            node, level = stack.pop()
+            if level > depth:
+                return True
+            level += 1
+            stack.extend((child, level) for child in node.children())
+        return False
+
+    def label(self):
+        # Display text in the visualizer's tree
+        return self.node_type
+
+    def to_dict(self, max_depth=None, view=None):
         raise NotImplementedError
 
+    def stub(self, view):
+        # Collapsed form — label, span and child count; expanded later through its id
+        return {
+            "type":       self.node_type,
+            "label":      self.label(),
+            "line":       self.line,
+            "start":      self.start,
+            "end":        self.end,
+            "startLine":  self.start_line,
+            "endLine":    self.end_line,
+            "id":         view.register(self),
+            "collapsed":  True,
+            "childCount": len(self.children()),
+            "children":   [],
+        }
+
+
+def _dicts(nodes, max_depth, view):
+    # Serialize child nodes one level further down (to_dict() calls this only with a view)
+    if max_depth is None:
+        return [n.to_dict(None, view) for n in nodes]
+    return [n.to_dict(max_depth - 1, view) for n in nodes]
+
+
+def _statement_dicts(statements, max_depth, view, offset=0):
+    # Like _dicts, for a statement list: past view.page_size statements the rest is
+    # collapsed into one "More" entry, which expands to the next page
+    page_size = view.page_size if view is not None else None
+    if page_size is None or len(statements) - offset <= page_size:
+        return _dicts(statements[offset:] if offset else statements, max_depth, view)
+
+    end   = offset + page_size
+    dicts = _dicts(statements[offset:end], max_depth, view)
+    dicts.append({
+        "type":       "More",
+        "label":      f"… {len(statements) - end} more statements",
+        "id":         view.register((statements, end)),
+        "collapsed":  True,
+        "childCount": len(statements) - end,
+        "children":   [],
+    })
+    return dicts
+
 
 class ProgramNode(ASTNode):
     # Root of the program — holds a list of statements
+    __slots__ = ('statements', 'depth_bound')
     node_type = "Program"
 
     def __init__(self, statements):
-        self.statements = statements
+        super().__init__()
+        self.statements  = statements
+        self.depth_bound = None    # at least the levels below it, set by the parser on the root
+
+    def children(self):
+        return list(self.statements)
+
+    def deeper_than(self, depth):
+        # A root from the parser knows a bound on its depth; only a bound past depth needs a walk
+        if self.depth_bound is not None and self.depth_bound <= depth:
+            return False
+        return super().deeper_than(depth)
+
+    def label(self):
+        return "Program"
 
-    def to_dict(self):
+    def to_dict(self, max_depth=None, view=None):
+        if max_depth == 0:
+            return self.stub(view)
         return {
             "type":       self.node_type,
-            "label":      "Program",
-            "children":   [s.to_dict() for s in self.statements],
+            "label":      self.label(),
+            "start":      self.start,
+            "end":        self.end,
+            "startLine":  self.start_line,
+            "endLine":    self.end_line,
+            "children":   ([s.to_dict() for s in self.statements] if view is None
+                           else _statement_dicts(self.statements, max_depth, view)),
         }
 
 
 class VarDeclNode(ASTNode):
     # Variable declaration: int a = expr; or int a;
+    __slots__ = ('var_type', 'name', 'init_expr', 'positions', 'name_start')
     node_type = "VarDecl"
 
     def __init__(self, var_type, name, init_expr=None, line=0):
+        super().__init__(line)
         self.var_type  = var_type
         self.name      = name
-        self.init_expr = init_expr
-        self.line      = line
+        self.init_expr  = init_expr
+        self.positions  = None
+        self.name_start = None     # offset of the declared name, set by the parser
 
-    def to_dict(self):
+    def children(self):
+        return [self.init_expr] if self.init_expr else []
+
+    def label(self):
+        return f"VarDecl ({self.var_type} {self.name})"
+
+    def to_dict(self, max_depth=None, view=None):
+        if max_depth == 0:
+            return self.stub(view)
         d = {
-            "type":    self.node_type,
-            "label":   f"VarDecl ({self.var_type} {self.name})",
-            "varType": self.var_type,
-            "name":    self.name,
-            "line":    self.line,
-            "children": [],
+            "type":      self.node_type,
+            "label":     self.label(),
+            "varType":   self.var_type,
+            "name":      self.name,
+            "line":      self.line,
+            "start":     self.start,
+            "end":       self.end,
+            "startLine": self.start_line,
+            "endLine":   self.end_line,
+            "children":  [],
         }
         if self.init_expr:
             d["children"].append({
                 "type": "Assign",
                 "label": "= (init)",
-                "children": [self.init_expr.to_dict()],
+                "children": ([self.init_expr.to_dict()] if view is None
+                             else _dicts([self.init_expr], max_depth, view)),
             })
         return d
 
 
 class AssignNode(ASTNode):
     # Assignment: a = expr;
+    __slots__ = ('name', 'expr', 'positions')
     node_type = "Assign"
 
     def __init__(self, name, expr, line=0):
-        self.name = name
-        self.expr = expr
-        self.line = line
+        super().__init__(line)
+        self.name      = name
+        self.expr      = expr
+        self.positions = None
+
+    def children(self):
+        return [self.expr]
 
-    def to_dict(self):
+    def label(self):
+        return f"Assign ({self.name} =)"
+
+    def to_dict(self, max_depth=None, view=None):
+        if max_depth == 0:
+            return self.stub(view)
         return {
-            "type":     self.node_type,
-            "label":    f"Assign ({self.name} =)",
-            "line":     self.line,
-            "children": [self.expr.to_dict()],
+            "type":      self.node_type,
+            "label":     self.label(),
+            "line":      self.line,
+            "start":     self.start,
+            "end":       self.end,
+            "startLine": self.start_line,
+            "endLine":   self.end_line,
+            "children":  ([self.expr.to_dict()] if view is None
+                          else _dicts([self.expr], max_depth, view)),
         }
 
 
 class IfNode(ASTNode):
     # if (cond) { body } [else { else_body }]
+    __slots__ = ('condition', 'then_body', 'else_body', 'positions')
     node_type = "If"
 
     def __init__(self, condition, then_body, else_body=None, line=0):
+        super().__init__(line)
         self.condition = condition
         self.then_body = then_body
         self.else_body = else_body
-        self.line      = line
+        self.positions = None
+
+    def children(self):
+        return [self.condition] + self.then_body + (self.else_body or [])
 
-    def to_dict(self):
+    def label(self):
+        return "If Statement"
+
+    def to_dict(self, max_depth=None, view=None):
+        if max_depth == 0:
+            return self.stub(view)
         children = [
             {
                 "type":     "Condition",
                 "label":    "Condition",
-                "children": [self.condition.to_dict()],
+                "children": ([self.condition.to_dict()] if view is None
+                             else _dicts([self.condition], max_depth, view)),
             },
             {
                 "type":     "Then",
                 "label":    "Then",
-                "children": [s.to_dict() for s in self.then_body],
+                "children": ([s.to_dict() for s in self.then_body] if view is None
+                             else _statement_dicts(self.then_body, max_depth, view)),
             },
         ]
         if self.else_body:
             children.append({
                 "type":     "Else",
                 "label":    "Else",
-                "children": [s.to_dict() for s in self.else_body],
+                "children": ([s.to_dict() for s in self.else_body] if view is None
+                             else _statement_dicts(self.else_body, max_depth, view)),
             })
         return {
-            "type":     self.node_type,
-            "label":    "If Statement",
-            "line":     self.line,
-            "children": children,
+            "type":      self.node_type,
+            "label":     self.label(),
+            "line":      self.line,
+            "start":     self.start,
+            "end":       self.end,
+            "startLine": self.start_line,
+            "endLine":   self.end_line,
+            "children":  children,
         }
 
 
 class WhileNode(ASTNode):
     # while (cond) { body }
+    __slots__ = ('condition', 'body', 'positions')
     node_type = "While"
 
     def __init__(self, condition, body, line=0):
+        super().__init__(line)
         self.condition = condition
         self.body      = body
-        self.line      = line
+        self.positions = None
+
+    def children(self):
+        return [self.condition] + self.body
 
-    def to_dict(self):
+    def label(self):
+        return "While Loop"
+
+    def to_dict(self, max_depth=None, view=None):
+        if max_depth == 0:
+            return self.stub(view)
         return {
-            "type":     self.node_type,
-            "label":    "While Loop",
-            "line":     self.line,
-            "children": [
+            "type":      self.node_type,
+            "label":     self.label(),
+            "line":      self.line,
+            "start":     self.start,
+            "end":       self.end,
+            "startLine": self.start_line,
+            "endLine":   self.end_line,
+            "children":  [
                 {
                     "type":     "Condition",
                     "label":    "Condition",
-                    "children": [self.condition.to_dict()],
+                    "children": ([self.condition.to_dict()] if view is None
+                                 else _dicts([self.condition], max_depth, view)),
                 },
                 {
                     "type":     "Body",
                     "label":    "Body",
-                    "children": [s.to_dict() for s in self.body],
+                    "children": ([s.to_dict() for s in self.body] if view is None
+                                 else _statement_dicts(self.body, max_depth, view)),
                 },
             ],
         }
@@ -138,132 +308,211 @@ class WhileNode(ASTNode):
 
 class PrintfNode(ASTNode):
     # printf("fmt", args...);
+    __slots__ = ('fmt_string', 'args', 'positions')
     node_type = "Printf"
 
     def __init__(self, fmt_string, args, line=0):
+        super().__init__(line)
         self.fmt_string = fmt_string
         self.args       = args
-        self.line       = line
+        self.positions  = None
+
+    def children(self):
+        return list(self.args)
+
+    def label(self):
+        return "printf()"
 
-    def to_dict(self):
+    def to_dict(self, max_depth=None, view=None):
+        if max_depth == 0:
+            return self.stub(view)
         children = [{"type": "Format", "label": f"Format: {self.fmt_string}", "children": []}]
-        children += [a.to_dict() for a in self.args]
+        children += ([a.to_dict() for a in self.args] if view is None
+                     else _dicts(self.args, max_depth, view))
         return {
-            "type":     self.node_type,
-            "label":    "printf()",
-            "line":     self.line,
-            "children": children,
+            "type":      self.node_type,
+            "label":     self.label(),
+            "line":      self.line,
+            "start":     self.start,
+            "end":       self.end,
+            "startLine": self.start_line,
+            "endLine":   self.end_line,
+            "children":  children,
         }
 
 
 class ScanfNode(ASTNode):
     # scanf("fmt", &var, ...);
+    __slots__ = ('fmt_string', 'vars_', 'var_starts')
     node_type = "Scanf"
 
     def __init__(self, fmt_string, vars_, line=0):
+        super().__init__(line)
         self.fmt_string = fmt_string
         self.vars_      = vars_
-        self.line       = line
+        self.var_starts = None     # offsets of the names in vars_, set by the parser
+
+    def label(self):
+        return "scanf()"
 
-    def to_dict(self):
+    def stub(self, view):
+        # The format and &refs are display entries rather than child nodes, but still count
+        collapsed = super().stub(view)
+        collapsed["childCount"] = 1 + len(self.vars_)
+        return collapsed
+
+    def to_dict(self, max_depth=None, view=None):
+        if max_depth == 0:
+            return self.stub(view)
         children = [{"type": "Format", "label": f"Format: {self.fmt_string}", "children": []}]
         children += [{"type": "Ref", "label": f"&{v}", "children": []} for v in self.vars_]
         return {
-            "type":     self.node_type,
-            "label":    "scanf()",
-            "line":     self.line,
-            "children": children,
+            "type":      self.node_type,
+            "label":     self.label(),
+            "line":      self.line,
+            "start":     self.start,
+            "end":       self.end,
+            "startLine": self.start_line,
+            "endLine":   self.end_line,
+            "children":  children,
         }
 
 
 class BinaryOpNode(ASTNode):
     # Binary operation: left op right
+    __slots__ = ('op', 'left', 'right', 'structural_hash')
     node_type = "BinaryOp"
 
     def __init__(self, op, left, right, line=0):
-        self.op    = op
-        self.left  = left
-        self.right = right
-        self.line  = line
+        super().__init__(line)
+        self.op              = op
+        self.left            = left
+        self.right           = right
+        self.structural_hash = None
+
+    def children(self):
+        return [self.left, self.right]
 
-    def to_dict(self):
+    def label(self):
+        return f"BinaryOp ({self.op})"
+
+    def to_dict(self, max_depth=None, view=None):
+        if max_depth == 0:
+            return self.stub(view)
         return {
-            "type":     self.node_type,
-            "label":    f"BinaryOp ({self.op})",
-            "op":       self.op,
-            "line":     self.line,
-            "children": [self.left.to_dict(), self.right.to_dict()],
+            "type":      self.node_type,
+            "label":     self.label(),
+            "op":        self.op,
+            "line":      self.line,
+            "start":     self.start,
+            "end":       self.end,
+            "startLine": self.start_line,
+            "endLine":   self.end_line,
+            "children":  ([self.left.to_dict(), self.right.to_dict()] if view is None
+                          else _dicts([self.left, self.right], max_depth, view)),
         }
 
 
 class UnaryOpNode(ASTNode):
     # Unary operation: op operand
+    __slots__ = ('op', 'operand', 'structural_hash')
     node_type = "UnaryOp"
 
     def __init__(self, op, operand, line=0):
-        self.op      = op
-        self.operand = operand
-        self.line    = line
+        super().__init__(line)
+        self.op              = op
+        self.operand         = operand
+        self.structural_hash = None
+
+    def children(self):
+        return [self.operand]
 
-    def to_dict(self):
+    def label(self):
+        return f"UnaryOp ({self.op})"
+
+    def to_dict(self, max_depth=None, view=None):
+        if max_depth == 0:
+            return self.stub(view)
         return {
-            "type":     self.node_type,
-            "label":    f"UnaryOp ({self.op})",
-            "op":       self.op,
-            "line":     self.line,
-            "children": [self.operand.to_dict()],
+            "type":      self.node_type,
+            "label":     self.label(),
+            "op":        self.op,
+            "line":      self.line,
+            "start":     self.start,
+            "end":       self.end,
+            "startLine": self.start_line,
+            "endLine":   self.end_line,
+            "children":  ([self.operand.to_dict()] if view is None
+                          else _dicts([self.operand], max_depth, view)),
         }
 
 
 class NumberNode(ASTNode):
     # Numeric literal
+    __slots__ = ('value', 'structural_hash')
     node_type = "Number"
 
     def __init__(self, value, line=0):
-        self.value = value
-        self.line  = line
+        super().__init__(line)
+        self.value           = value
+        self.structural_hash = None
 
-    def to_dict(self):
+    def to_dict(self, max_depth=None, view=None):
         return {
-            "type":     self.node_type,
-            "label":    f"Number ({self.value})",
-            "value":    self.value,
-            "line":     self.line,
-            "children": [],
+            "type":      self.node_type,
+            "label":     f"Number ({self.value})",
+            "value":     self.value,
+            "line":      self.line,
+            "start":     self.start,
+            "end":       self.end,
+            "startLine": self.start_line,
+            "endLine":   self.end_line,
+            "children":  [],
         }
 
 
 class IdentNode(ASTNode):
     # Identifier reference
+    __slots__ = ('name', 'structural_hash')
     node_type = "Identifier"
 
     def __init__(self, name, line=0):
-        self.name = name
-        self.line = line
+        super().__init__(line)
+        self.name            = name
+        self.structural_hash = None
 
-    def to_dict(self):
+    def to_dict(self, max_depth=None, view=None):
         return {
-            "type":     self.node_type,
-            "label":    f"Ident ({self.name})",
-            "name":     self.name,
-            "line":     self.line,
-            "children": [],
+            "type":      self.node_type,
+            "label":     f"Ident ({self.name})",
+            "name":      self.name,
+            "line":      self.line,
+            "start":     self.start,
+            "end":       self.end,
+            "startLine": self.start_line,
+            "endLine":   self.end_line,
+            "children":  [],
         }
 
 
 class StringNode(ASTNode):
     # String literal
+    __slots__ = ('value',)
     node_type = "String"
 
     def __init__(self, value, line=0):
+        super().__init__(line)
         self.value = value
-        self.line  = line
 
-    def to_dict(self):
+    def to_dict(self, max_depth=None, view=None):
         return {
-            "type":     self.node_type,
-            "label":    f"String ({self.value})",
-            "value":    self.value,
-            "line":     self.line,
-            "children": [],
+            "type":      self.node_type,
+            "label":     f"String ({self.value})",
+            "value":     self.value,
+            "line":      self.line,
+            "start":     self.start,
+            "end":       self.end,
+            "startLine": self.start_line,
+            "endLine":   self.end_line,
+            "children":  [],
         }
@@ -1,11 +1,17 @@
-# Recursive Descent Parser for C (Subset) - top down parser 
+# Recursive Descent Parser for C (Subset) - top down parser, Pratt-style expressions
+
+from bisect import bisect_left, bisect_right
 
 from .ast_nodes import (
-    ProgramNode, VarDeclNode, AssignNode, IfNode, WhileNode,
+    ASTNode, _dicts, ProgramNode, VarDeclNode, AssignNode, IfNode, WhileNode,
     PrintfNode, ScanfNode,
     BinaryOpNode, UnaryOpNode,
     NumberNode, IdentNode, StringNode,
 )
+from lexer.token_stream import TokenStream, MappedTokenStream
+from lexer.line_index import LineIndex
+from .trace import *
+from lexer.token_types import TOKEN_TYPE_NAMES, TOKEN_TYPE_CODES
 
 KEYWORD    = "KEYWORD"
 IDENTIFIER = "IDENTIFIER"
@@ -14,9 +20,31 @@ OPERATOR   = "OPERATOR"
 SEPARATOR  = "SEPARATOR"
 STRING     = "STRING"
 
+# Type codes as stored in TokenStream.types
+T_KEYWORD    = TOKEN_TYPE_CODES[KEYWORD]
+T_IDENTIFIER = TOKEN_TYPE_CODES[IDENTIFIER]
+T_NUMBER     = TOKEN_TYPE_CODES[NUMBER]
+T_OPERATOR   = TOKEN_TYPE_CODES[OPERATOR]
+T_SEPARATOR  = TOKEN_TYPE_CODES[SEPARATOR]
+T_STRING     = TOKEN_TYPE_CODES[STRING]
+
 VAR_TYPES = {'int', 'float', 'char', 'double', 'long'}
+
+# Recovery mode stops after this many syntax errors
+DEFAULT_MAX_ERRORS = 20
 CMP_OPS = {'==', '!=', '<', '>', '<=', '>='}
 
+# Binding powers of binary operators — higher binds tighter; prefix operators bind tighter than all
+CMP_BP    = 10
+BINARY_BP = {op: CMP_BP for op in CMP_OPS}
+BINARY_BP.update({'+': 20, '-': 20, '*': 30, '/': 30})
+PREFIX_OPS = ('++', '--', '-')
+
+# Operator stack entry kinds used by _parse_expr
+_PAREN  = 0
+_PREFIX = 1
+_BINARY = 2
+
 FRIENDLY = {
     IDENTIFIER: "variable name",
     KEYWORD:    "keyword",
@@ -30,506 +58,1124 @@ FRIENDLY = {
 class ParseError(Exception):
     # Raised when the parser encounters a syntax error — carries structured info
 
-    def __init__(self, message, line=None, expected=None, got=None):
+    def __init__(self, message, line=None, expected=None, got=None, start=None, end=None):
         super().__init__(message)
         self.line     = line
         self.expected = expected
         self.got      = got
+        self.start    = start
+        self.end      = end
+        self.column   = None
 
     def to_dict(self):
         return {
             "message":  str(self),
             "line":     self.line,
+            "column":   self.column,
+            "start":    self.start,
+            "end":      self.end,
             "expected": self.expected,
             "got":      self.got,
         }
 
 
-class CParser:
-    # Recursive descent parser — accepts token list, produces AST + error + trace
+class _ErrorCapReached(Exception):
+    # Unwinds a recovering parse once max_errors syntax errors are recorded
+    pass
+
 
-    def __init__(self, tokens):
+class CParser:
+    # Recursive descent parser — accepts a TokenStream (or token dicts), produces AST + error + trace
+
+    def __init__(self, tokens, trace='full', trace_cap=DEFAULT_TRACE_CAP, hash_cons=False,
+                 recover=False, max_errors=DEFAULT_MAX_ERRORS):
+        # Offsets on AST nodes and errors refer to the stream's source; token dicts
+        # carry no source text, so for them columns are not reported
+        # hash_cons=True shares structurally identical expression subtrees (see _intern)
+        # recover=True keeps parsing after a syntax error (panic mode, see _synchronize)
+        # and records up to max_errors of them
+        if isinstance(tokens, MappedTokenStream):
+            tokens = tokens.to_dicts()
+        self._has_source = isinstance(tokens, TokenStream)
+        if not self._has_source:
+            tokens = TokenStream.from_dicts(tokens)
         self._tokens      = tokens
+        # Offsets and lines are unpacked to lists once, so nodes that refer to the same token
+        # (or line) share one int object instead of boxing a fresh one per array read
+        line_ints         = list(range(max(tokens.lines) + 1)) if len(tokens) else []
+        self._types       = tokens.types
+        self._starts      = tokens.starts.tolist()
+        self._ends        = tokens.ends.tolist()
+        self._lines       = list(map(line_ints.__getitem__, tokens.lines))
+        self._source      = tokens.source
+        self._count       = len(tokens)
         self._pos         = 0
-        self._trace       = []
+        self._trace_level = trace_level(trace)
+        self._trace_cap   = trace_cap
+        self._trace       = ParseTrace(self._trace_level, trace_cap)
         self._parse_error = None
-
-    def _log(self, msg):
-        self._trace.append(msg)
-
-    def _peek(self, offset=0):
+        self._recover     = recover
+        self._max_errors  = max_errors
+        self._errors      = []     # every ParseError recorded, in source order
+        self._deferred    = []     # sentinels for errors recovered mid-statement
+        self._depth_bound = 0      # see _parse_statement
+        self._line_index  = None
+        self._cons_table  = {} if hash_cons else None
+        self._occurrences = []     # identifier positions _intern took off shared nodes
+        self._reuse       = None   # old statement start offset -> node, set by reparse()
+        self._edit        = None
+        self._old         = None   # previous top-level statements, during reparse()
+        self._old_starts  = None
+        self._kept        = 0
+        self.reused_count = 0      # statements taken over by the last reparse()
+
+        # Checked at every trace point, so a disabled level never builds event arguments
+        self._trace_stmts = self._trace_level >= TRACE_STATEMENTS
+        self._trace_full  = self._trace_level >= TRACE_FULL
+
+    # --- Token access (by index into the stream) ---
+
+    def _type(self, offset=0):
+        # Type code of the token at pos+offset, or None past the end
         idx = self._pos + offset
-        return self._tokens[idx] if idx < len(self._tokens) else None
-
-    def _current(self):
-        return self._peek(0)
+        return self._types[idx] if idx < self._count else None
+
+    def _value(self, idx):
+        return self._source[self._starts[idx]:self._ends[idx]]
+
+    def _current_value(self):
+        pos = self._pos
+        return self._source[self._starts[pos]:self._ends[pos]] if pos < self._count else None
+
+    def _current_op(self):
+        # Value of the current token if it is an operator, else None
+        pos = self._pos
+        if pos < self._count and self._types[pos] == T_OPERATOR:
+            return self._source[self._starts[pos]:self._ends[pos]]
+        return None
+
+    def _check(self, type_code, value=None):
+        # True if the current token has this type (and value, if given)
+        pos = self._pos
+        if pos >= self._count or self._types[pos] != type_code:
+            return False
+        return value is None or self._source[self._starts[pos]:self._ends[pos]] == value
 
     def _advance(self):
-        tok = self._tokens[self._pos]
+        # Consume the current token, returns its index
+        idx = self._pos
         self._pos += 1
-        return tok
+        return idx
 
     def _at_end(self):
-        return self._pos >= len(self._tokens)
+        return self._pos >= self._count
+
+    def _eof_offset(self):
+        # Offset used for "end of input" errors — just past the last token
+        return self._ends[self._count - 1] if self._count else 0
+
+    def _spanned(self, node, first):
+        # Stamp node with the span from token `first` through the last consumed token
+        last            = self._pos - 1
+        node.start      = self._starts[first]
+        node.end        = self._ends[last]
+        node.start_line = self._lines[first]
+        node.end_line   = self._lines[last]
+        return node
+
+    def _binary(self, op, left, right, line):
+        # Binary nodes span their operands (the operator line stays in .line)
+        node            = BinaryOpNode(op, left, right, line)
+        node.start      = left.start
+        node.end        = right.end
+        node.start_line = left.start_line
+        node.end_line   = right.end_line
+        return node
 
     def _current_line(self):
-        t = self._current()
-        return t['line'] if t else None
+        return self._lines[self._pos] if self._pos < self._count else None
+
+    def _expect(self, type_code, value=None):
+        # Consume the current token if it matches; raise ParseError otherwise (returns token index)
+        pos = self._pos
+        if pos < self._count and self._types[pos] == type_code and (
+                value is None or self._source[self._starts[pos]:self._ends[pos]] == value):
+            self._pos = pos + 1
+            return pos
 
-    def _expect(self, tok_type, value=None):
-        # Consume the current token if it matches; raise ParseError otherwise
-        tok = self._current()
+        tok_type = TOKEN_TYPE_NAMES[type_code]
+        exp_desc = f"`{value}`" if value else FRIENDLY.get(tok_type, tok_type)
 
-        if tok is None:
-            exp_desc = f"`{value}`" if value else FRIENDLY.get(tok_type, tok_type)
+        if pos >= self._count:
+            eof = self._eof_offset()
             raise ParseError(
                 f"Unexpected end of input — expected {exp_desc}",
                 line=None,
                 expected=value or tok_type,
                 got="end of input",
+                start=eof, end=eof,
             )
 
-        if tok['type'] != tok_type:
-            exp_desc = f"`{value}`" if value else FRIENDLY.get(tok_type, tok_type)
-            raise ParseError(
-                f"Expected {exp_desc}, but got `{tok['value']}` (line {tok['line']})",
-                line=tok['line'],
-                expected=value or tok_type,
-                got=tok['value'],
-            )
+        tok_val  = self._value(pos)
+        tok_line = self._lines[pos]
+        start    = self._starts[pos]
+        end      = self._ends[pos]
 
-        if value is not None and tok['value'] != value:
+        if self._types[pos] != type_code:
             raise ParseError(
-                f"Expected `{value}`, but got `{tok['value']}` (line {tok['line']})",
-                line=tok['line'],
-                expected=value,
-                got=tok['value'],
+                f"Expected {exp_desc}, but got `{tok_val}` (line {tok_line})",
+                line=tok_line,
+                expected=value or tok_type,
+                got=tok_val,
+                start=start, end=end,
             )
 
-        return self._advance()
+        raise ParseError(
+            f"Expected `{value}`, but got `{tok_val}` (line {tok_line})",
+            line=tok_line,
+            expected=value,
+            got=tok_val,
+            start=start, end=end,
+        )
 
-    def _match(self, tok_type, value=None):
+    def _match(self, type_code, value=None):
         # Return True and advance if current token matches, else False
-        tok = self._current()
-        if tok is None:
-            return False
-        if tok['type'] != tok_type:
-            return False
-        if value is not None and tok['value'] != value:
+        if not self._check(type_code, value):
             return False
         self._advance()
         return True
 
     def parse(self):
-        # Parse the token stream, returns dict with ast, error, trace
-        self._trace       = []
+        # Parse the token stream, returns dict with ast (serialized for JSON), error, trace
+        result = self.parse_tree()
+        tree   = result["tree"]
+        return {
+            "ast":    tree.to_dict() if tree is not None else None,
+            "error":  result["error"],
+            "errors": result["errors"],
+            "trace":  result["trace"],
+        }
+
+    def parse_tree(self, compact=False):
+        # Parse the token stream, returns dict with tree (the typed ProgramNode), error, trace
+        # compact=True packs the tree into an ASTArena and returns its root view instead
+        # errors lists every syntax error — more than one only in recovery mode
+        self._trace       = ParseTrace(self._trace_level, self._trace_cap)
         self._parse_error = None
+        self._errors      = []
+        self._deferred    = []
+        self._depth_bound = 0
+        if self._cons_table is not None:
+            self._cons_table  = {}
+            self._occurrences = []
 
-        self._log("▶ Parser started")
+        if self._trace_stmts:
+            self._trace.emit(EV_START)
 
         try:
             program = self._parse_program()
         except Exception as e:
+            error_obj = {"message": f"Internal error: {e}", "line": None, "column": None,
+                         "start": None, "end": None, "expected": None, "got": None}
             return {
-                "ast":   None,
-                "error": {"message": f"Internal error: {e}", "line": None,
-                          "expected": None, "got": None},
-                "trace": self._trace,
+                "tree":   None,
+                "error":  error_obj,
+                "errors": [error_obj],
+                "trace":  self._trace.format(),
             }
 
-        ast_dict  = program.to_dict()
-        error_obj = self._parse_error.to_dict() if self._parse_error else None
+        errors    = [e.to_dict() for e in self._errors]
+        error_obj = errors[0] if errors else None
 
-        if error_obj:
-            self._log(f"✗ Parsing stopped — {error_obj['message']}")
-        else:
-            self._log("✔ Parsing complete — AST built successfully")
+        if self._trace_stmts:
+            if error_obj and self._recover:
+                self._trace.emit(EV_ERRORS, len(errors))
+            elif error_obj:
+                self._trace.emit(EV_STOPPED, error_obj['message'])
+            else:
+                self._trace.emit(EV_DONE)
+
+        if compact:
+            from .arena import ASTArena
+            program = ASTArena.from_tree(program).root()
 
         return {
-            "ast":   ast_dict,
-            "error": error_obj,
-            "trace": self._trace,
+            "tree":   program,
+            "error":  error_obj,
+            "errors": errors,
+            "trace":  self._trace.format(),
         }
 
+    def reparse(self, previous, edit, compact=False):
+        # Incremental parse after an edit — same result as parse_tree() on this parser's tokens.
+        # previous is the ProgramNode parsed from the old source (with the same hash_cons
+        # setting); edit = (start, old_end, new_end) says old source [start, old_end) became
+        # new source [start, new_end).
+        # Top-level statements before the edit are kept as they are. Parsing resumes at the
+        # statement holding the edit and stops at the first statement boundary that lines up
+        # with an old statement after the edit: the rest of the old program is taken over with
+        # its spans shifted. Inside re-parsed blocks, statements lying wholly outside the edit
+        # are reused one by one. The nodes of previous move into the new tree, so previous
+        # must not be used afterwards.
+        # A trace records the whole parse, so with tracing on this is a full parse; so is
+        # recovery mode, where errors after the edit would have to be recorded again
+        if previous is None or self._trace_stmts or self._recover:
+            return self.parse_tree(compact)
+
+        start, old_end, _ = edit
+        old  = previous.statements
+        kept = bisect_right([node.end for node in old], start)
+        if kept and old[kept - 1].node_type == "SyntaxError":
+            kept -= 1
+        if kept and _open_if(old[kept - 1]):
+            kept -= 1   # an `else` typed after it would still belong to it
+
+        self._edit        = edit
+        self._old         = old
+        self._kept        = kept
+        self._old_starts  = [node.start for node in old]
+        self._reuse       = _reusable_statements(old[kept:], start, old_end)
+        self.reused_count = 0
+        try:
+            return self.parse_tree(compact)
+        finally:
+            self._reuse = self._old = self._old_starts = None
+
+    def _reused_prefix(self):
+        # Old top-level statements before the edit, with the parser moved past them
+        kept = self._kept
+        if kept:
+            self._pos          = bisect_left(self._starts, self._old[kept - 1].end)
+            self.reused_count += kept
+            self._depth_bound  = 1 + self._pos
+        return self._old[:kept]
+
+    def _reused_tail(self, stmts):
+        # If the current token starts an old top-level statement after the edit, append that
+        # statement and everything after it (the tokens from here on are the old ones) — the
+        # old parse must have run to the end without an error for that to hold
+        old = self._old
+        if not old or old[-1].node_type == "SyntaxError":
+            return False
+        pos                     = self._pos
+        offset                  = self._starts[pos]
+        start, old_end, new_end = self._edit
+        if offset < new_end:
+            return False
+        old_offset = offset - new_end + old_end
+        idx        = bisect_left(self._old_starts, old_offset, self._kept)
+        if idx == len(old) or self._old_starts[idx] != old_offset:
+            return False
+
+        tail       = old[idx:]
+        line_delta = self._lines[pos] - tail[0].start_line
+        if offset != old_offset or line_delta:
+            for node in tail:
+                _shift_spans(node, offset - old_offset, line_delta)
+        stmts.extend(tail)
+        self._depth_bound  = max(self._depth_bound, 1 + self._count - pos)
+        self._pos          = self._count
+        self.reused_count += len(tail)
+        return True
+
+    def _reused_statement(self):
+        # The old statement starting at the current token, moved into place — or None
+        pos                     = self._pos
+        offset                  = self._starts[pos]
+        start, old_end, new_end = self._edit
+        if offset < start:
+            node = self._reuse.get(offset)
+        elif offset >= new_end:
+            node = self._reuse.get(offset - new_end + old_end)
+        else:
+            return None
+        if node is None:
+            return None
+
+        delta      = offset - node.start
+        line_delta = self._lines[pos] - node.start_line
+        if delta or line_delta:
+            _shift_spans(node, delta, line_delta)
+        self._pos          = bisect_left(self._starts, node.end, pos)
+        self.reused_count += 1
+        return node
+
     def _parse_program(self):
-        self._log("→ Program")
-        stmts = []
+        if self._trace_stmts:
+            self._trace.emit(EV_PROGRAM)
+        stmts = self._reused_prefix() if self._reuse is not None else []
         while not self._at_end():
+            if self._reuse is not None and self._reused_tail(stmts):
+                break
+            first = len(self._errors)
             try:
                 stmt = self._parse_statement()
                 if stmt:
                     stmts.append(stmt)
             except ParseError as e:
-                self._parse_error = e
-                stmts.append(_ErrorSentinel(str(e), e.line))
+                stmts.append(self._record_error(e))
+                if not self._recover or len(self._errors) >= self._max_errors:
+                    break
+                self._synchronize(top_level=True)
+            except _ErrorCapReached:
+                # The statement is dropped along with the blocks that held its error leaves, so
+                # they take its place (the deferred ones are among them)
+                self._deferred = [_ErrorSentinel(str(e), e.line, e.start, e.end)
+                                  for e in self._errors[first:]]
                 break
-        return ProgramNode(stmts)
+            finally:
+                if self._deferred:
+                    stmts.extend(self._deferred)
+                    self._deferred = []
+        program             = ProgramNode(stmts)
+        program.depth_bound = max(self._depth_bound, 1) if stmts else 0   # a lone error leaf is 1
+        if self._pos:
+            self._spanned(program, 0)
+        else:
+            program.start = program.end = 0
+            program.start_line = program.end_line = 1
+        return program
 
     def _parse_statement(self):
-        tok = self._current()
-        if tok is None:
+        # Parse one statement. The blocks it opens nest on an explicit stack of _OpenBlocks
+        # instead of recursing, so nesting depth is bounded by memory rather than the recursion
+        # limit. Each block statement is handled where _statement_head returns it; a syntax
+        # error in its own { } or else belongs to the block around it.
+        # Every level of a statement's subtree takes at least one of its tokens, so its nesting
+        # level plus its token count bounds how deep the tree goes (_depth_bound, kept on the
+        # root for ProgramNode.deeper_than) — a compound statement counts its head's tokens
+        first = self._pos
+        node  = self._statement_head()
+        if 1 + self._pos - first > self._depth_bound:
+            self._depth_bound = 1 + self._pos - first
+        if type(node) is not _OpenBlock:
+            return node
+
+        stack = [node]
+        while True:
+            block = stack[-1]
+            if not self._at_end() and self._current_value() != '}':
+                first = self._pos
+                try:
+                    node = self._statement_head()
+                except ParseError as e:
+                    if not self._recover:
+                        raise
+                    self._recovered(block.stmts, e)
+                    continue
+                if len(stack) + 1 + self._pos - first > self._depth_bound:
+                    self._depth_bound = len(stack) + 1 + self._pos - first
+                if type(node) is _OpenBlock:
+                    stack.append(node)
+                    continue
+                if node:
+                    block.stmts.append(node)
+            else:
+                try:
+                    self._expect(T_SEPARATOR, '}')
+                    node = self._close_block(block)
+                except ParseError as e:
+                    stack.pop()
+                    if not self._recover or not stack:
+                        raise
+                    self._recovered(stack[-1].stmts, e)
+                    continue
+                if node is None:
+                    continue            # the if's else block is open now
+                stack.pop()
+                if not stack:
+                    return node
+                stack[-1].stmts.append(node)
+            if self._deferred:
+                stack[-1].stmts.extend(self._deferred)
+                self._deferred = []
+
+    def _statement_head(self):
+        # A simple statement, parsed whole — or the _OpenBlock of an if, while or { } block
+        # whose opening { has just been read. None at the end of input
+        tok_type = self._type()
+        if tok_type is None:
             return None
 
-        if tok['type'] == SEPARATOR and tok['value'] == '{':
-            return self._parse_block_as_node()
+        if self._reuse is not None:
+            node = self._reused_statement()
+            if node is not None:
+                return node
+
+        value = self._current_value()
 
-        if tok['type'] == KEYWORD and tok['value'] in VAR_TYPES:
+        if tok_type == T_SEPARATOR and value == '{':
+            block = _OpenBlock("Program", self._pos)
+            self._advance()
+            return block
+
+        if tok_type == T_KEYWORD and value in VAR_TYPES:
             return self._parse_var_decl()
 
-        if tok['type'] == KEYWORD:
-            if tok['value'] == 'if':
-                return self._parse_if()
-            if tok['value'] == 'while':
-                return self._parse_while()
-            if tok['value'] == 'printf':
+        if tok_type == T_KEYWORD:
+            if value == 'if':
+                return self._if_head()
+            if value == 'while':
+                return self._while_head()
+            if value == 'printf':
                 return self._parse_printf()
-            if tok['value'] == 'scanf':
+            if value == 'scanf':
                 return self._parse_scanf()
-            if tok['value'] == 'return':
+            if value == 'return':
                 return self._parse_return()
 
-        if tok['type'] == OPERATOR and tok['value'] in ('++', '--'):
+        if tok_type == T_OPERATOR and value in ('++', '--'):
             return self._parse_unary_stmt()
 
-        if tok['type'] == IDENTIFIER:
+        if tok_type == T_IDENTIFIER:
             return self._parse_assign_or_postfix()
 
+        line = self._current_line()
         raise ParseError(
-            f"Unrecognised statement starting with `{tok['value']}` (line {tok['line']})",
-            line=tok['line'],
+            f"Unrecognised statement starting with `{value}` (line {line})",
+            line=line,
             expected="statement",
-            got=tok['value'],
+            got=value,
+            start=self._starts[self._pos], end=self._ends[self._pos],
         )
 
     def _parse_var_decl(self):
-        type_tok = self._advance()
-        var_type = type_tok['value']
-        line     = type_tok['line']
+        type_idx = self._advance()
+        var_type = self._value(type_idx)
+        line     = self._lines[type_idx]
 
-        self._log(f"  → VarDecl: type `{var_type}` (line {line})")
+        if self._trace_stmts:
+            self._trace.emit(EV_VAR_DECL, var_type, line)
 
-        name_tok = self._expect(IDENTIFIER)
-        name     = name_tok['value']
-        self._log(f"    ✓ Identifier `{name}`")
+        name_idx = self._expect(T_IDENTIFIER)
+        name     = self._value(name_idx)
+        if self._trace_full:
+            self._trace.emit(EV_IDENT, name)
 
         init_expr = None
-        if self._current() and self._current()['type'] == OPERATOR \
-                and self._current()['value'] == '=':
+        mark      = len(self._occurrences)
+        if self._check(T_OPERATOR, '='):
             self._advance()
-            self._log(f"    → Parsing initializer expression")
+            if self._trace_full:
+                self._trace.emit(EV_INITIALIZER)
             init_expr = self._parse_expr()
 
         self._expect_semicolon()
-        self._log(f"    ✓ VarDecl complete: {var_type} {name}")
-        return VarDeclNode(var_type, name, init_expr, line)
+        if self._trace_full:
+            self._trace.emit(EV_VAR_DECL_END, var_type, name)
+        node            = VarDeclNode(var_type, name, init_expr, line)
+        node.positions  = self._positions_since(mark)
+        node.name_start = self._starts[name_idx]
+        return self._spanned(node, type_idx)
 
     def _parse_assign_or_postfix(self):
-        name_tok = self._advance()
-        name     = name_tok['value']
-        line     = name_tok['line']
+        name_idx = self._advance()
+        name     = self._value(name_idx)
+        line     = self._lines[name_idx]
 
-        tok = self._current()
-        if tok is None:
+        if self._at_end():
+            eof = self._eof_offset()
             raise ParseError(
                 f"Unexpected end of input after `{name}` (line {line})",
                 line=line, expected="= or ++ or --", got="end of input",
+                start=eof, end=eof,
             )
 
-        if tok['type'] == OPERATOR and tok['value'] in ('++', '--'):
-            op = self._advance()['value']
+        value = self._current_value()
+
+        if self._type() == T_OPERATOR and value in ('++', '--'):
+            self._advance()
             self._expect_semicolon()
-            self._log(f"  → PostfixStmt: {name}{op}")
-            return _PostfixStmtNode(op, name, line)
+            if self._trace_stmts:
+                self._trace.emit(EV_POSTFIX_STMT, name, value)
+            return self._spanned(_PostfixStmtNode(value, name, line), name_idx)
 
-        if tok['type'] == OPERATOR and tok['value'] == '=':
+        if self._type() == T_OPERATOR and value == '=':
             self._advance()
-            self._log(f"  → Assignment: {name} = ...")
+            if self._trace_stmts:
+                self._trace.emit(EV_ASSIGN, name)
+            mark = len(self._occurrences)
             expr = self._parse_expr()
             self._expect_semicolon()
-            self._log(f"    ✓ Assignment complete")
-            return AssignNode(name, expr, line)
+            if self._trace_full:
+                self._trace.emit(EV_ASSIGN_END)
+            node           = AssignNode(name, expr, line)
+            node.positions = self._positions_since(mark)
+            return self._spanned(node, name_idx)
 
         raise ParseError(
             f"Expected `=`, `++` or `--` after `{name}` (line {line})",
-            line=line, expected="= or ++ or --", got=tok['value'],
+            line=line, expected="= or ++ or --", got=value,
+            start=self._starts[self._pos], end=self._ends[self._pos],
         )
 
     def _parse_unary_stmt(self):
-        op_tok = self._advance()
-        op     = op_tok['value']
-        line   = op_tok['line']
-        name_tok = self._expect(IDENTIFIER)
+        op_idx = self._advance()
+        op       = self._value(op_idx)
+        line     = self._lines[op_idx]
+        name_idx = self._expect(T_IDENTIFIER)
+        name     = self._value(name_idx)
         self._expect_semicolon()
-        self._log(f"  → PrefixStmt: {op}{name_tok['value']}")
-        return _PrefixStmtNode(op, name_tok['value'], line)
-
-    def _parse_if(self):
-        line = self._current()['line']
-        self._log(f"  → IfStatement (line {line})")
+        if self._trace_stmts:
+            self._trace.emit(EV_PREFIX_STMT, op, name)
+        node            = _PrefixStmtNode(op, name, line)
+        node.name_start = self._starts[name_idx]
+        return self._spanned(node, op_idx)
+
+    def _if_head(self):
+        first = self._pos
+        line  = self._current_line()
+        if self._trace_stmts:
+            self._trace.emit(EV_IF, line)
         self._advance()
-        self._expect(SEPARATOR, '(')
-        self._log("    → Parsing condition")
-        condition = self._parse_expr()
-        self._expect(SEPARATOR, ')')
-        self._log("    → Parsing then-block")
-        then_body = self._parse_block()
-
-        else_body = None
-        tok = self._current()
-        if tok and tok['type'] == KEYWORD and tok['value'] == 'else':
-            self._advance()
-            self._log("    → Parsing else-block")
-            else_body = self._parse_block()
-
-        self._log("    ✓ IfStatement complete")
-        return IfNode(condition, then_body, else_body, line)
-
-    def _parse_while(self):
-        line = self._current()['line']
-        self._log(f"  → WhileStatement (line {line})")
+        condition, positions = self._condition()
+        if self._trace_full:
+            self._trace.emit(EV_THEN_BLOCK)
+        self._expect(T_SEPARATOR, '{')
+        return _OpenBlock("If", first, line, condition, positions)
+
+    def _while_head(self):
+        first = self._pos
+        line  = self._current_line()
+        if self._trace_stmts:
+            self._trace.emit(EV_WHILE, line)
         self._advance()
-        self._expect(SEPARATOR, '(')
-        self._log("    → Parsing condition")
+        condition, positions = self._condition()
+        if self._trace_full:
+            self._trace.emit(EV_BODY)
+        self._expect(T_SEPARATOR, '{')
+        return _OpenBlock("While", first, line, condition, positions)
+
+    def _condition(self):
+        # ( expr ) of an if or while, with the identifier positions taken off shared nodes
+        self._expect(T_SEPARATOR, '(')
+        if self._trace_full:
+            self._trace.emit(EV_CONDITION)
+        mark      = len(self._occurrences)
         condition = self._parse_expr()
-        self._expect(SEPARATOR, ')')
-        self._log("    → Parsing body")
-        body = self._parse_block()
-        self._log("    ✓ WhileStatement complete")
-        return WhileNode(condition, body, line)
+        positions = self._positions_since(mark)
+        self._expect(T_SEPARATOR, ')')
+        return condition, positions
+
+    def _close_block(self, block):
+        # The finished statement once the } of its block is read — or None if an else block
+        # of the if follows, which is then open in the same _OpenBlock
+        kind = block.kind
+        if kind == "Program":
+            return self._spanned(ProgramNode(block.stmts), block.first)
+
+        if kind == "While":
+            if self._trace_full:
+                self._trace.emit(EV_WHILE_END)
+            node = WhileNode(block.condition, block.stmts, block.line)
+        elif block.then_body is None and self._check(T_KEYWORD, 'else'):
+            self._advance()
+            if self._trace_full:
+                self._trace.emit(EV_ELSE_BLOCK)
+            self._expect(T_SEPARATOR, '{')
+            block.then_body, block.stmts = block.stmts, []
+            return None
+        else:
+            if self._trace_full:
+                self._trace.emit(EV_IF_END)
+            if block.then_body is None:
+                node = IfNode(block.condition, block.stmts, None, block.line)
+            else:
+                node = IfNode(block.condition, block.then_body, block.stmts, block.line)
+        node.positions = block.positions
+        return self._spanned(node, block.first)
 
     def _parse_printf(self):
-        line = self._current()['line']
-        self._log(f"  → Printf (line {line})")
+        first = self._pos
+        line  = self._current_line()
+        if self._trace_stmts:
+            self._trace.emit(EV_PRINTF, line)
         self._advance()
-        self._expect(SEPARATOR, '(')
+        self._expect(T_SEPARATOR, '(')
 
-        fmt_tok = self._expect(STRING)
-        fmt     = fmt_tok['value']
-        self._log(f"    ✓ Format string: {fmt}")
+        fmt = self._value(self._expect(T_STRING))
+        if self._trace_full:
+            self._trace.emit(EV_FORMAT, fmt)
 
         args = []
-        while self._current() and self._current()['value'] == ',':
+        mark = len(self._occurrences)
+        while self._current_value() == ',':
             self._advance()
             args.append(self._parse_expr())
 
-        self._expect(SEPARATOR, ')')
+        self._expect(T_SEPARATOR, ')')
         self._expect_semicolon()
-        self._log("    ✓ Printf complete")
-        return PrintfNode(fmt, args, line)
+        if self._trace_full:
+            self._trace.emit(EV_PRINTF_END)
+        node           = PrintfNode(fmt, args, line)
+        node.positions = self._positions_since(mark)
+        return self._spanned(node, first)
 
     def _parse_scanf(self):
-        line = self._current()['line']
-        self._log(f"  → Scanf (line {line})")
+        first = self._pos
+        line  = self._current_line()
+        if self._trace_stmts:
+            self._trace.emit(EV_SCANF, line)
         self._advance()
-        self._expect(SEPARATOR, '(')
+        self._expect(T_SEPARATOR, '(')
 
-        fmt_tok = self._expect(STRING)
-        fmt     = fmt_tok['value']
-        self._log(f"    ✓ Format string: {fmt}")
+        fmt = self._value(self._expect(T_STRING))
+        if self._trace_full:
+            self._trace.emit(EV_FORMAT, fmt)
 
-        vars_ = []
-        while self._current() and self._current()['value'] == ',':
+        vars_  = []
+        starts = []
+        while self._current_value() == ',':
             self._advance()
-            self._expect(SEPARATOR, '&')
-            name_tok = self._expect(IDENTIFIER)
-            vars_.append(name_tok['value'])
-            self._log(f"    ✓ Variable: &{name_tok['value']}")
-
-        self._expect(SEPARATOR, ')')
+            self._expect(T_SEPARATOR, '&')
+            name_idx = self._expect(T_IDENTIFIER)
+            name     = self._value(name_idx)
+            vars_.append(name)
+            starts.append(self._starts[name_idx])
+            if self._trace_full:
+                self._trace.emit(EV_SCANF_VAR, name)
+
+        self._expect(T_SEPARATOR, ')')
         self._expect_semicolon()
-        self._log("    ✓ Scanf complete")
-        return ScanfNode(fmt, vars_, line)
+        if self._trace_full:
+            self._trace.emit(EV_SCANF_END)
+        node            = ScanfNode(fmt, vars_, line)
+        node.var_starts = starts
+        return self._spanned(node, first)
 
     def _parse_return(self):
-        line = self._current()['line']
-        self._log(f"  → Return (line {line})")
+        first = self._pos
+        line  = self._current_line()
+        if self._trace_stmts:
+            self._trace.emit(EV_RETURN, line)
         self._advance()
         expr = None
-        if self._current() and self._current()['value'] != ';':
+        mark = len(self._occurrences)
+        if not self._at_end() and self._current_value() != ';':
             expr = self._parse_expr()
         self._expect_semicolon()
-        self._log("    ✓ Return complete")
-        return _ReturnNode(expr, line)
-
-    def _parse_block(self):
-        # Parse { stmts } and return list of statement nodes
-        self._expect(SEPARATOR, '{')
-        stmts = []
-        while self._current() and self._current()['value'] != '}':
-            stmt = self._parse_statement()
-            if stmt:
-                stmts.append(stmt)
-        self._expect(SEPARATOR, '}')
-        return stmts
-
-    def _parse_block_as_node(self):
-        stmts = self._parse_block()
-        return ProgramNode(stmts)
+        if self._trace_full:
+            self._trace.emit(EV_RETURN_END)
+        node           = _ReturnNode(expr, line)
+        node.positions = self._positions_since(mark)
+        return self._spanned(node, first)
+
+    # --- Error recovery (recover=True) ---
+
+    def _recovered(self, stmts, e):
+        # A block statement failed: its sentinel leaf goes into the block's stmts, and parsing
+        # resumes after the next `;` or at the block's `}`
+        stmts.append(self._record_error(e))
+        if len(self._errors) >= self._max_errors:
+            raise _ErrorCapReached()
+        self._synchronize(top_level=False)
+        if self._deferred:
+            stmts.extend(self._deferred)
+            self._deferred = []
+
+    def _record_error(self, e):
+        # Keep a syntax error (the first one is also the result's `error`), returns its leaf
+        if self._has_source and e.start is not None:
+            if self._line_index is None:
+                self._line_index = LineIndex(self._source)
+            e.column = self._line_index.offset_to_line_col(e.start)[1]
+        if self._parse_error is None:
+            self._parse_error = e
+        self._errors.append(e)
+        if self._trace_stmts and self._recover:
+            self._trace.emit(EV_RECOVERED, str(e))
+        return _ErrorSentinel(str(e), e.line, e.start, e.end)
+
+    def _synchronize(self, top_level):
+        # Panic mode: skip to just past the next `;`, or up to the next `}` — which closes the
+        # enclosing block, or is stray (and skipped) at top level
+        types, pos, count = self._types, self._pos, self._count
+        while pos < count:
+            if types[pos] == T_SEPARATOR:
+                value = self._value(pos)
+                if value == ';':
+                    pos += 1
+                    break
+                if value == '}':
+                    if top_level:
+                        pos += 1
+                    break
+            pos += 1
+        self._pos = pos
 
     def _parse_expr(self):
-        return self._parse_comparison()
-
-    def _parse_comparison(self):
-        left = self._parse_additive()
-        tok  = self._current()
-        if tok and tok['type'] == OPERATOR and tok['value'] in CMP_OPS:
-            op = self._advance()['value']
-            right = self._parse_additive()
-            line  = left.to_dict().get('line', 0)
-            self._log(f"    ✓ BinaryOp: {op}")
-            return BinaryOpNode(op, left, right, line)
-        return left
-
-    def _parse_additive(self):
-        left = self._parse_term()
-        while True:
-            tok = self._current()
-            if tok and tok['type'] == OPERATOR and tok['value'] in ('+', '-'):
-                op    = self._advance()['value']
-                right = self._parse_term()
-                line  = tok['line']
-                left  = BinaryOpNode(op, left, right, line)
-            else:
-                break
-        return left
+        # Pratt-style expression parser driven by BINARY_BP. Parentheses and prefix operators
+        # go on an explicit operator stack instead of recursing, so nesting depth is bounded
+        # by memory rather than the recursion limit
+        types, starts, ends, lines = self._types, self._starts, self._ends, self._lines
+        src, count = self._source, self._count
+
+        operands = []            # left operands of the binary operators on `ops`
+        ops      = []            # (kind, operator, binding power, token index)
+        cmp_seen = [False]       # per open frame — comparisons do not chain
+        pos      = self._pos
 
-    def _parse_term(self):
-        left = self._parse_factor()
         while True:
-            tok = self._current()
-            if tok and tok['type'] == OPERATOR and tok['value'] in ('*', '/'):
-                op    = self._advance()['value']
-                right = self._parse_factor()
-                line  = tok['line']
-                left  = BinaryOpNode(op, left, right, line)
+            # Operand position: prefix operators and `(` are stacked, a primary completes
+            if pos >= count:
+                self._pos = pos
+                eof = self._eof_offset()
+                raise ParseError(
+                    "Unexpected end of input inside expression",
+                    line=None, expected="expression", got="end of input",
+                    start=eof, end=eof,
+                )
+
+            tok_type = types[pos]
+            start    = starts[pos]
+            end      = ends[pos]
+            value    = src[start:end]
+            line     = lines[pos]
+
+            if tok_type == T_IDENTIFIER:
+                node            = IdentNode(value, line)
+                node.start      = start
+                node.end        = end
+                node.start_line = node.end_line = line
+                pos += 1
+                if pos < count and types[pos] == T_OPERATOR:
+                    op = src[starts[pos]:ends[pos]]
+                    if op == '++' or op == '--':
+                        node            = UnaryOpNode(f'post{op}', node, line)
+                        node.start      = start
+                        node.end        = ends[pos]
+                        node.start_line = line
+                        node.end_line   = lines[pos]
+                        pos += 1
+            elif tok_type == T_NUMBER or tok_type == T_STRING:
+                node            = NumberNode(value, line) if tok_type == T_NUMBER else StringNode(value, line)
+                node.start      = start
+                node.end        = end
+                node.start_line = node.end_line = line
+                pos += 1
+            elif tok_type == T_OPERATOR and value in PREFIX_OPS:
+                ops.append((_PREFIX, value, 0, pos))
+                pos += 1
+                continue
+            elif tok_type == T_SEPARATOR and value == '(':
+                ops.append((_PAREN, None, 0, pos))
+                cmp_seen.append(False)
+                pos += 1
+                continue
             else:
-                break
-        return left
-
-    def _parse_factor(self):
-        tok = self._current()
-        if tok is None:
-            raise ParseError(
-                "Unexpected end of input inside expression",
-                line=None, expected="expression", got="end of input",
-            )
-
-        if tok['type'] == OPERATOR and tok['value'] in ('++', '--'):
-            op = self._advance()['value']
-            line = tok['line']
-            operand = self._parse_factor()
-            return UnaryOpNode(op, operand, line)
-
-        if tok['type'] == OPERATOR and tok['value'] == '-':
-            op = self._advance()['value']
-            line = tok['line']
-            operand = self._parse_factor()
-            return UnaryOpNode('-', operand, line)
-
-        if tok['type'] == NUMBER:
-            self._advance()
-            return NumberNode(tok['value'], tok['line'])
-
-        if tok['type'] == STRING:
-            self._advance()
-            return StringNode(tok['value'], tok['line'])
-
-        if tok['type'] == IDENTIFIER:
-            self._advance()
-            node = IdentNode(tok['value'], tok['line'])
-            nxt = self._current()
-            if nxt and nxt['type'] == OPERATOR and nxt['value'] in ('++', '--'):
-                op = self._advance()['value']
-                return UnaryOpNode(f'post{op}', node, tok['line'])
-            return node
+                self._pos = pos
+                raise ParseError(
+                    f"Unexpected `{value}` inside expression (line {line})",
+                    line=line, expected="expression", got=value,
+                    start=start, end=end,
+                )
+
+            # Operator position: close finished frames until a binary operator continues the expression
+            while True:
+                while ops and ops[-1][0] == _PREFIX:
+                    _, op, _, op_idx = ops.pop()
+                    node            = UnaryOpNode(op, node, lines[op_idx])
+                    node.start      = starts[op_idx]
+                    node.end        = ends[pos - 1]
+                    node.start_line = lines[op_idx]
+                    node.end_line   = lines[pos - 1]
+
+                bp = None
+                if pos < count and types[pos] == T_OPERATOR:
+                    op = src[starts[pos]:ends[pos]]
+                    bp = BINARY_BP.get(op)
+                if bp is not None and not (bp == CMP_BP and cmp_seen[-1]):
+                    break
+
+                if ops and ops[-1][0] == _BINARY:
+                    node = self._fold(ops, operands, node, 0)
+                self._pos = pos
+                if not ops:
+                    return node if self._cons_table is None else self._intern(node)
+                self._expect(T_SEPARATOR, ')')
+                pos = self._pos
+                ops.pop()
+                cmp_seen.pop()
+
+            if ops and ops[-1][0] == _BINARY and ops[-1][2] >= bp:
+                node = self._fold(ops, operands, node, bp)
+            if bp == CMP_BP:
+                cmp_seen[-1] = True
+            operands.append(node)
+            ops.append((_BINARY, op, bp, pos))
+            pos += 1
+
+    def _fold(self, ops, operands, right, min_bp):
+        # Pop binary operators binding at least as tightly as min_bp (left-associative)
+        while ops and ops[-1][0] == _BINARY and ops[-1][2] >= min_bp:
+            _, op, bp, op_idx = ops.pop()
+            left = operands.pop()
+            if bp == CMP_BP:
+                if self._trace_full:
+                    self._trace.emit(EV_BINARY_OP, op)
+                right = self._binary(op, left, right, left.line)
+            else:
+                right = self._binary(op, left, right, self._lines[op_idx])
+        return right
+
+    def _intern(self, root):
+        # Hash-consing: replace Number/Identifier/BinaryOp/UnaryOp nodes by the one shared
+        # node with the same structure. Children are canonical before their parent is looked
+        # up, so a parent's key only needs the identity of its children. A shared node stands
+        # for many occurrences, so it carries no line or span. Identifiers' positions go to
+        # _occurrences instead, in source order (children-first order visits leaves left to
+        # right), and the statement parsed around this expression takes them over
+        order, stack = [], [root]
+        while stack:                 # pre-order, reversed below so children come first
+            node = stack.pop()
+            order.append(node)
+            stack.extend(node.children())
+
+        table       = self._cons_table
+        occurrences = self._occurrences
+        canon       = {}
+        for node in reversed(order):
+            kind = node.node_type
+            if kind == "BinaryOp":
+                left, right = canon[id(node.left)], canon[id(node.right)]
+                node.left, node.right = left, right
+                parts = (left, right)
+            elif kind == "UnaryOp":
+                node.operand = canon[id(node.operand)]
+                parts        = (node.operand,)
+            elif kind == "Number":
+                parts = (node.value,)
+            elif kind == "Identifier":
+                parts = (node.name,)
+                occurrences += (node.line, node.start, node.end)
+            else:
+                parts = None
 
-        if tok['type'] == SEPARATOR and tok['value'] == '(':
-            self._advance()
-            expr = self._parse_expr()
-            self._expect(SEPARATOR, ')')
-            return expr
+            # Strings are not shared, and neither is any expression containing one
+            if parts is None or (kind in ("BinaryOp", "UnaryOp")
+                                 and any(getattr(c, 'structural_hash', None) is None for c in parts)):
+                canon[id(node)] = node
+                continue
 
-        raise ParseError(
-            f"Unexpected `{tok['value']}` inside expression (line {tok['line']})",
-            line=tok['line'], expected="expression", got=tok['value'],
-        )
+            if kind in ("BinaryOp", "UnaryOp"):
+                key   = (kind, node.op, *map(id, parts))
+                shape = (kind, node.op, *(c.structural_hash for c in parts))
+            else:
+                key = shape = (kind, *parts)
+
+            shared = table.get(key)
+            if shared is None:
+                node.structural_hash = hash(shape)
+                node.line = node.start = node.end = node.start_line = node.end_line = None
+                shared = table[key] = node
+            canon[id(node)] = shared
+        return canon[id(root)]
+
+    def _positions_since(self, mark):
+        # Identifier positions _intern recorded since mark, as a flat (line, start, end, ...)
+        # tuple for the statement being parsed; None without hash-consing
+        occurrences = self._occurrences
+        if len(occurrences) == mark:
+            return None
+        positions = tuple(occurrences[mark:])
+        del occurrences[mark:]
+        return positions
 
     def _expect_semicolon(self):
-        tok = self._current()
-        if tok is None:
-            raise ParseError(
+        pos = self._pos
+        if pos >= self._count:
+            eof = self._eof_offset()
+            error = ParseError(
                 "Missing `;` at end of statement",
                 line=None, expected=";", got="end of input",
+                start=eof, end=eof,
             )
-        if tok['type'] != SEPARATOR or tok['value'] != ';':
-            raise ParseError(
-                f"Missing `;` after statement (line {tok['line']}) — got `{tok['value']}`",
-                line=tok['line'], expected=";", got=tok['value'],
+        elif self._types[pos] != T_SEPARATOR or self._value(pos) != ';':
+            value = self._value(pos)
+            line  = self._lines[pos]
+            error = ParseError(
+                f"Missing `;` after statement (line {line}) — got `{value}`",
+                line=line, expected=";", got=value,
+                start=self._starts[pos], end=self._ends[pos],
             )
-        self._advance()
-
-
-class _ErrorSentinel:
+        else:
+            self._pos = pos + 1
+            return
+
+        # Recovery mode: a `;` missing at the end of a line (or of the input) is reported and
+        # then treated as present, so the statement is kept and the next one parses as usual.
+        # The error that reaches max_errors is raised instead, which ends the parse
+        if (self._recover and len(self._errors) + 1 < self._max_errors
+                and (pos >= self._count or self._lines[pos] > self._lines[pos - 1])):
+            self._deferred.append(self._record_error(error))
+            return
+        raise error
+
+
+_BLOCK_STATEMENTS = ("Program", "If", "While")
+
+
+def _open_if(node):
+    # An if without else — a following `else` would extend it
+    return node.node_type == "If" and not node.else_body
+
+
+def _reusable_statements(statements, start, old_end):
+    # Map start offset -> statement node for statements (at any depth) that an edit of old
+    # source [start, old_end) leaves intact. Statements end in `;` or `}`, so one ending at or
+    # before the edit is complete — except an open if; its body statements can still be reused
+    reusable = {}
+    stack    = list(statements)
+    while stack:
+        node = stack.pop()
+        kind = node.node_type
+        if kind == "SyntaxError" or node.start is None:
+            continue
+        if node.start >= old_end or (node.end <= start and not _open_if(node)):
+            reusable[node.start] = node
+        elif kind in _BLOCK_STATEMENTS:
+            stack.extend(node.statements if kind == "Program" else
+                          node.body if kind == "While" else
+                          node.then_body + (node.else_body or []))
+    return reusable
+
+
+def _shift_spans(root, delta, line_delta):
+    # Move a reused subtree by delta characters and line_delta lines
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        if node.start is not None:
+            node.start      += delta
+            node.end        += delta
+            node.start_line += line_delta
+            node.end_line   += line_delta
+        if node.line is not None:
+            node.line += line_delta
+        name_start = getattr(node, 'name_start', None)
+        if name_start is not None:
+            node.name_start = name_start + delta
+        if getattr(node, 'var_starts', None):
+            node.var_starts = [start + delta for start in node.var_starts]
+        positions = getattr(node, 'positions', None)
+        if positions:
+            node.positions = tuple(None if value is None else value + (delta if i % 3 else line_delta)
+                                   for i, value in enumerate(positions))
+        stack.extend(node.children())
+
+
+class _OpenBlock:
+    # An if, while or { } statement whose block is being parsed (see CParser._parse_statement)
+    __slots__ = ('kind', 'first', 'line', 'condition', 'positions', 'then_body', 'stmts')
+
+    def __init__(self, kind, first, line=None, condition=None, positions=None):
+        self.kind      = kind        # node_type of the statement it becomes
+        self.first     = first       # index of its first token
+        self.line      = line
+        self.condition = condition
+        self.positions = positions
+        self.then_body = None        # an if's then block, once its else block is open
+        self.stmts     = []          # statements of the open block
+
+
+class _ErrorSentinel(ASTNode):
     # Displayed as an error leaf in the partial AST when parsing stops
-    def __init__(self, message, line=None):
-        self.message = message
-        self.line = line
-
-    def to_dict(self):
+    __slots__ = ('message',)
+    node_type = "SyntaxError"
+
+    def __init__(self, message, line=None, start=None, end=None):
+        self.message    = message
+        self.line       = line
+        self.start      = start
+        self.end        = end
+        self.start_line = line
+        self.end_line   = line
+
+    def to_dict(self, max_depth=None, view=None):
         return {
-            "type":     "SyntaxError",
-            "label":    f"❌ Syntax Error — {self.message}",
-            "line":     self.line,
-            "children": [],
-            "isError":  True,
+            "type":      "SyntaxError",
+            "label":     f"❌ Syntax Error — {self.message}",
+            "line":      self.line,
+            "start":     self.start,
+            "end":       self.end,
+            "startLine": self.start_line,
+            "endLine":   self.end_line,
+            "children":  [],
+            "isError":   True,
         }
 
 
-class _ReturnNode:
+class _ReturnNode(ASTNode):
+    __slots__ = ('expr', 'positions')
     node_type = "Return"
 
     def __init__(self, expr, line):
-        self.expr = expr
-        self.line = line
+        super().__init__(line)
+        self.expr      = expr
+        self.positions = None
 
-    def to_dict(self):
+    def children(self):
+        return [self.expr] if self.expr else []
+
+    def label(self):
+        return "return"
+
+    def to_dict(self, max_depth=None, view=None):
+        if max_depth == 0:
+            return self.stub(view)
         return {
-            "type":     "Return",
-            "label":    "return",
-            "line":     self.line,
-            "children": [self.expr.to_dict()] if self.expr else [],
+            "type":      "Return",
+            "label":     self.label(),
+            "line":      self.line,
+            "start":     self.start,
+            "end":       self.end,
+            "startLine": self.start_line,
+            "endLine":   self.end_line,
+            "children":  ([] if self.expr is None else [self.expr.to_dict()] if view is None
+                          else _dicts([self.expr], max_depth, view)),
         }
 
 
-class _PostfixStmtNode:
+class _PostfixStmtNode(ASTNode):
+    __slots__ = ('op', 'name')
     node_type = "PostfixStmt"
 
     def __init__(self, op, name, line):
+        super().__init__(line)
         self.op   = op
         self.name = name
-        self.line = line
 
-    def to_dict(self):
+    def to_dict(self, max_depth=None, view=None):
         return {
-            "type":     "PostfixStmt",
-            "label":    f"Postfix ({self.name}{self.op})",
-            "line":     self.line,
-            "children": [],
+            "type":      "PostfixStmt",
+            "label":     f"Postfix ({self.name}{self.op})",
+            "line":      self.line,
+            "start":     self.start,
+            "end":       self.end,
+            "startLine": self.start_line,
+            "endLine":   self.end_line,
+            "children":  [],
         }
 
 
-class _PrefixStmtNode:
+class _PrefixStmtNode(ASTNode):
+    __slots__ = ('op', 'name', 'name_start')
     node_type = "PrefixStmt"
 
     def __init__(self, op, name, line):
-        self.op   = op
-        self.name = name
-        self.line = line
+        super().__init__(line)
+        self.op         = op
+        self.name       = name
+        self.name_start = None
 
-    def to_dict(self):
+    def to_dict(self, max_depth=None, view=None):
         return {
-            "type":     "PrefixStmt",
-            "label":    f"Prefix ({self.op}{self.name})",
-            "line":     self.line,
-            "children": [],
+            "type":      "PrefixStmt",
+            "label":     f"Prefix ({self.op}{self.name})",
+            "line":      self.line,
+            "start":     self.start,
+            "end":       self.end,
+            "startLine": self.start_line,
+            "endLine":   self.end_line,
+            "children":  [],
         }
@@ -0,0 +1,116 @@
+# Structured parser trace — events are (code, args) pairs, formatted to text only when serialized
+
+TRACE_LEVELS = ('off', 'statements', 'full')
+
+TRACE_OFF        = 0
+TRACE_STATEMENTS = 1
+TRACE_FULL       = 2
+
+DEFAULT_TRACE_CAP = 10_000
+
+# Event codes — statement-level events first, then detail events only recorded at `full`
+EV_START        = 0
+EV_DONE         = 1
+EV_STOPPED      = 2
+EV_PROGRAM      = 3
+EV_VAR_DECL     = 4
+EV_POSTFIX_STMT = 5
+EV_ASSIGN       = 6
+EV_PREFIX_STMT  = 7
+EV_IF           = 8
+EV_WHILE        = 9
+EV_PRINTF       = 10
+EV_SCANF        = 11
+EV_RETURN       = 12
+
+EV_IDENT        = 13
+EV_INITIALIZER  = 14
+EV_VAR_DECL_END = 15
+EV_ASSIGN_END   = 16
+EV_CONDITION    = 17
+EV_THEN_BLOCK   = 18
+EV_ELSE_BLOCK   = 19
+EV_IF_END       = 20
+EV_BODY         = 21
+EV_WHILE_END    = 22
+EV_FORMAT       = 23
+EV_PRINTF_END   = 24
+EV_SCANF_VAR    = 25
+EV_SCANF_END    = 26
+EV_RETURN_END   = 27
+EV_BINARY_OP    = 28
+
+# Recovery mode (statement level)
+EV_RECOVERED    = 29
+EV_ERRORS       = 30
+
+_TEMPLATES = (
+    "▶ Parser started",
+    "✔ Parsing complete — AST built successfully",
+    "✗ Parsing stopped — {}",
+    "→ Program",
+    "  → VarDecl: type `{}` (line {})",
+    "  → PostfixStmt: {}{}",
+    "  → Assignment: {} = ...",
+    "  → PrefixStmt: {}{}",
+    "  → IfStatement (line {})",
+    "  → WhileStatement (line {})",
+    "  → Printf (line {})",
+    "  → Scanf (line {})",
+    "  → Return (line {})",
+    "    ✓ Identifier `{}`",
+    "    → Parsing initializer expression",
+    "    ✓ VarDecl complete: {} {}",
+    "    ✓ Assignment complete",
+    "    → Parsing condition",
+    "    → Parsing then-block",
+    "    → Parsing else-block",
+    "    ✓ IfStatement complete",
+    "    → Parsing body",
+    "    ✓ WhileStatement complete",
+    "    ✓ Format string: {}",
+    "    ✓ Printf complete",
+    "    ✓ Variable: &{}",
+    "    ✓ Scanf complete",
+    "    ✓ Return complete",
+    "    ✓ BinaryOp: {}",
+    "  ✗ {} — recovered",
+    "✗ Parsing complete — {} syntax error(s)",
+)
+
+
+def trace_level(level):
+    # Normalise a level name ('off' / 'statements' / 'full') or number; None means `full`
+    if level is None:
+        return TRACE_FULL
+    if isinstance(level, int) and not isinstance(level, bool) and TRACE_OFF <= level <= TRACE_FULL:
+        return level
+    if isinstance(level, str) and level in TRACE_LEVELS:
+        return TRACE_LEVELS.index(level)
+    raise ValueError(f"Unknown trace level {level!r} — expected one of {', '.join(TRACE_LEVELS)}")
+
+
+class ParseTrace:
+    # Bounded event buffer — callers check the level before emitting, so `off` costs one attribute test
+
+    __slots__ = ('level', 'cap', 'events', 'dropped')
+
+    def __init__(self, level=TRACE_FULL, cap=DEFAULT_TRACE_CAP):
+        self.level   = trace_level(level)
+        self.cap     = cap
+        self.events  = []
+        self.dropped = 0
+
+    def emit(self, code, *args):
+        # cap=None keeps every event
+        if self.cap is None or len(self.events) < self.cap:
+            self.events.append((code, args))
+        else:
+            self.dropped += 1
+
+    def format(self):
+        # Render the buffered events as the text lines shown in the UI
+        lines = [_TEMPLATES[code].format(*args) for code, args in self.events]
+        if self.dropped:
+            lines.append(f"… {self.dropped} more trace events not recorded (cap {self.cap})")
+        return lines
@@ -0,0 +1,114 @@
+# Visitor over the typed AST — dispatches on node.node_type to visit_<NodeType> methods
+#
+# Each subclass gets its dispatch table (node type -> handler function) built once, when the
+# class is created, so visiting a node is one dict lookup instead of a string concatenation
+# plus attribute lookup. pre_visit/post_visit hooks and per-node-type call counters are
+# opt-in: a class that overrides neither hook, with profiling off, pays nothing for them.
+#
+# run() walks a tree without recursing into nested statement lists: handlers pass those to
+# defer()/defer_visits() and run() works through them with an explicit stack, so block
+# nesting is bounded by memory rather than by the interpreter's recursion limit.
+
+from collections import Counter
+from itertools import chain, repeat
+
+
+class ASTVisitor:
+    # Subclasses define visit_Program, visit_VarDecl, visit_BinaryOp, ... and call self.visit(child)
+
+    _dispatch = {}
+    _pending  = None   # work deferred by the running handler, while run() is active
+    _counts   = None   # node_counts while profiling, for walks that bypass visit()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._dispatch = {name[len('visit_'):]: getattr(cls, name)
+                         for name in dir(cls)
+                         if name.startswith('visit_') and callable(getattr(cls, name))}
+        if 'visit' not in cls.__dict__:
+            hooked    = (cls.pre_visit is not ASTVisitor.pre_visit
+                         or cls.post_visit is not ASTVisitor.post_visit)
+            cls.visit = ASTVisitor._visit_hooked if hooked else ASTVisitor._visit_plain
+
+    def visit(self, node):
+        return self._visit_plain(node)
+
+    def _visit_plain(self, node):
+        handler = self._dispatch.get(node.node_type)
+        if handler is None:
+            return self.generic_visit(node)
+        return handler(self, node)
+
+    def _visit_hooked(self, node):
+        self.pre_visit(node)
+        pending = self._pending
+        queued  = 0 if pending is None else len(pending)
+        handler = self._dispatch.get(node.node_type)
+        result  = self.generic_visit(node) if handler is None else handler(self, node)
+        if pending is not None and len(pending) > queued:
+            # The node's deferred children still have to run — post_visit comes after them
+            pending.append(((lambda _: self.post_visit(node, result), None),))
+        else:
+            self.post_visit(node, result)
+        return result
+
+    def _visit_counted(self, node):
+        self.node_counts[node.node_type] += 1
+        return type(self).visit(self, node)
+
+    def run(self, node):
+        # Visit node and all the work its handlers defer, depth-first in deferral order. The
+        # stack holds iterators of (fn, arg) work items, one per handler that deferred any
+        stack   = [iter(((self.visit, node),))]
+        pending = self._pending = []
+        try:
+            while stack:
+                for fn, arg in stack[-1]:
+                    fn(arg)
+                    if pending:
+                        stack.append(chain.from_iterable(pending[:]))
+                        pending.clear()
+                        break
+                else:
+                    stack.pop()
+        finally:
+            self._pending = None
+
+    def defer(self, fn, arg=None):
+        # Call fn(arg) once the current handler has returned (immediately outside run())
+        if self._pending is None:
+            fn(arg)
+        else:
+            self._pending.append(((fn, arg),))
+
+    def defer_visits(self, nodes):
+        # Visit each node once the current handler has returned, in order
+        if self._pending is None:
+            for node in nodes:
+                self.visit(node)
+        else:
+            self._pending.append(zip(repeat(self.visit), nodes))
+
+    def pre_visit(self, node):
+        # Called before a node's handler (override to use)
+        pass
+
+    def post_visit(self, node, result):
+        # Called with a node's handler result once it returns (override to use)
+        pass
+
+    def profile(self, enabled=True):
+        # Count visits per node type into self.node_counts until profile(False). Handlers that
+        # walk a subtree themselves instead of visiting it (the expression engines) add the
+        # nodes they walk to self._counts, which is node_counts while profiling and else None
+        if enabled:
+            self.node_counts = self._counts = Counter()
+            self.visit       = self._visit_counted
+        else:
+            self.__dict__.pop('visit', None)
+            self._counts = None
+
+    def generic_visit(self, node):
+        # Fallback for node types without a handler — visit the children, return nothing
+        self.defer_visits(node.children())
+        return None
@@ -1,5 +1,5 @@
 # backend/semantic/__init__.py — Phase 3: Semantic Analysis
 from .semantic_analyzer import SemanticAnalyzer
-from .symbol_table import SymbolTable
+from .symbol_table import SymbolTable, ShadowSymbolTable
 
-__all__ = ['SemanticAnalyzer', 'SymbolTable']
+__all__ = ['SemanticAnalyzer', 'SymbolTable', 'ShadowSymbolTable']
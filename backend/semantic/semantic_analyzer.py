@@ -1,25 +1,57 @@
-# Semantic Analyzer — walks AST dict and performs logical validation (Phase 3)
+# Semantic Analyzer — walks the typed AST from CParser and performs logical validation (Phase 3)
 
+from parser.visitor import ASTVisitor
 from .symbol_table import SymbolTable
+from .xref import CrossReference
 
+_OPERATORS = frozenset(("BinaryOp", "UnaryOp"))
 
-class SemanticAnalyzer:
-    # Accepts an AST dict (from ast_node.to_dict()) and runs semantic checks
-    def __init__(self):
-        self.symbol_table = SymbolTable()
+
+def _name_span(line, name, start):
+    # Span of a name at offset start — without offsets where the parser recorded none (an
+    # ASTArena keeps no name offsets). Assignments and postfix steps start with their name
+    if start is None:
+        return line, None, None
+    return line, start, start + len(name)
+
+
+def _binary_type(left_t, right_t):
+    # float wins over int; otherwise whichever side has a type
+    if left_t == "float" or right_t == "float":
+        return "float"
+    if left_t == "int" or right_t == "int":
+        return "int"
+    return left_t or right_t
+
+
+class SemanticAnalyzer(ASTVisitor):
+    # Accepts the ProgramNode from CParser.parse_tree() and runs semantic checks
+    # symbol_table_class picks the backend: SymbolTable, or ShadowSymbolTable for O(1) lookups
+    # After analyze(), self.xref holds the cross-reference index of the walk (see xref.py)
+    def __init__(self, symbol_table_class=SymbolTable):
+        self.symbol_table_class = symbol_table_class
+        self.symbol_table = symbol_table_class()
         self.errors = []
+        self.xref = CrossReference()
 
-    def analyze(self, ast_dict):
+    def analyze(self, program):
         # Entry point — returns { symbol_table, semantic_errors }
-        self.symbol_table = SymbolTable()
+        self.symbol_table = self.symbol_table_class()
         self.errors = []
+        self.xref = CrossReference()
+        self._log_use = self.xref.log.append      # (symbol id, span) — see xref.py
         self._is_root = True
+        self._generation = 0     # bumped whenever a name's binding changes (see _check_expr)
+        self._memo = {}
+        self._leaves = []        # (message, symbol id) per identifier checked, for the memo
+        self._positions = None
+        self._next_position = 0
 
-        if not ast_dict:
+        if program is None:
             return self._result()
 
         self.symbol_table.push_scope("global")
-        self._visit(ast_dict)
+        self.run(program)
         self.symbol_table.pop_scope()
 
         return self._result()
@@ -33,225 +65,244 @@ class SemanticAnalyzer:
     def _error(self, message, line=None):
         self.errors.append({"message": message, "line": line})
 
-    # --- Visitor dispatch ---
-
-    def _visit(self, node):
-        # Dispatch to handler based on node 'type' field
-        if not node or not isinstance(node, dict):
-            return
+    def _visit_scoped(self, scope_name, statements):
+        # Visit a statement list inside its own scope (deferred — see ASTVisitor.run)
+        self.defer(self.symbol_table.push_scope, scope_name)
+        self.defer_visits(statements)
+        self.defer(self._exit_scope)
 
-        node_type = node.get("type", "")
-        handler = getattr(self, f"_visit_{node_type}", None)
-
-        if handler:
-            handler(node)
-        else:
-            self._visit_children(node)
-
-    def _visit_children(self, node):
-        # Visit all children of a generic node
-        for child in node.get("children", []):
-            self._visit(child)
+    def _exit_scope(self, _=None):
+        self.symbol_table.pop_scope()
+        self._generation += 1
+
+    def _take_positions(self, node):
+        # Hash-consed identifiers carry no position; the statement holding them keeps one per
+        # identifier, which _span hands out in the order the expressions are walked
+        self._positions = getattr(node, "positions", None)
+        self._next_position = 0
+
+    def _span(self, line):
+        # Position of the next identifier without one of its own — the statement line if the
+        # statement recorded none (a tree packed into an arena loses them)
+        positions = self._positions
+        if positions is None:
+            return line, None, None
+        i = self._next_position
+        self._next_position = i + 3
+        return positions[i:i + 3]
 
     # --- Node handlers ---
 
-    def _visit_Program(self, node):
+    def visit_Program(self, node):
         # Root Program just visits children (global scope managed by analyze())
         # Nested Program nodes (standalone { } blocks) get their own block scope
         if self._is_root:
             self._is_root = False
-            for child in node.get("children", []):
-                self._visit(child)
+            self.defer_visits(node.statements)
         else:
-            self.symbol_table.push_scope("block")
-            for child in node.get("children", []):
-                self._visit(child)
-            self.symbol_table.pop_scope()
+            self._visit_scoped("block", node.statements)
 
-    def _visit_VarDecl(self, node):
+    def visit_VarDecl(self, node):
         # Variable declaration — declare in symbol table + type-check initializer
-        name = node.get("name")
-        var_type = node.get("varType")
-        line = node.get("line")
+        name = node.name
+        var_type = node.var_type
+        line = node.line
+        self._take_positions(node)
 
         if name and var_type:
             err = self.symbol_table.declare(name, var_type, line)
             if err:
                 self._error(err, line)
+            else:
+                self._generation += 1
+                self.xref.define(self.symbol_table.lookup(name),
+                                 _name_span(line, name, getattr(node, "name_start", None)))
 
         # Check initializer expression for type mismatch
-        children = node.get("children", [])
-        for child in children:
-            if child.get("type") == "Assign" and child.get("label") == "= (init)":
-                init_children = child.get("children", [])
-                if init_children:
-                    self._check_type_mismatch(name, var_type, init_children[0], line)
-                    self._check_used_variables(init_children[0])
-
-    def _visit_Assign(self, node):
-        # Assignment — check variable is declared + type-check RHS
-        label = node.get("label", "")
-        line = node.get("line")
+        if node.init_expr is not None:
+            self._check_assignment(name, var_type, node.init_expr, line)
 
-        # Extract variable name from label "Assign (varname =)"
-        name = None
-        if label.startswith("Assign (") and label.endswith(" =)"):
-            name = label[8:-3]
+    def visit_Assign(self, node):
+        # Assignment — check variable is declared + type-check RHS
+        name = node.name
+        line = node.line
+        self._take_positions(node)
 
-        if name:
-            sym = self.symbol_table.lookup(name)
-            if sym is None:
-                self._error(f"Variable '{name}' used without declaration", line)
-            else:
-                # Type-check RHS
-                children = node.get("children", [])
-                if children:
-                    self._check_type_mismatch(name, sym.var_type, children[0], line)
-                    self._check_used_variables(children[0])
+        sym = self.symbol_table.lookup(name)
+        if sym is None:
+            self._error(f"Variable '{name}' used without declaration", line)
+        else:
+            self.xref.use(sym, _name_span(line, name, node.start))
+            self._check_assignment(name, sym.var_type, node.expr, line)
 
-    def _visit_If(self, node):
+    def visit_If(self, node):
         # If statement — check condition variables, then visit scoped blocks
-        children = node.get("children", [])
-        for child in children:
-            ctype = child.get("type")
-            if ctype == "Condition":
-                for c in child.get("children", []):
-                    self._check_used_variables(c)
-            elif ctype == "Then":
-                self.symbol_table.push_scope("if")
-                for stmt in child.get("children", []):
-                    self._visit(stmt)
-                self.symbol_table.pop_scope()
-            elif ctype == "Else":
-                self.symbol_table.push_scope("else")
-                for stmt in child.get("children", []):
-                    self._visit(stmt)
-                self.symbol_table.pop_scope()
-
-    def _visit_While(self, node):
+        self._take_positions(node)
+        self._check_expr(node.condition, node.line)
+        self._visit_scoped("if", node.then_body)
+        if node.else_body:
+            self._visit_scoped("else", node.else_body)
+
+    def visit_While(self, node):
         # While loop — check condition variables, then visit scoped body
-        children = node.get("children", [])
-        for child in children:
-            ctype = child.get("type")
-            if ctype == "Condition":
-                for c in child.get("children", []):
-                    self._check_used_variables(c)
-            elif ctype == "Body":
-                self.symbol_table.push_scope("while")
-                for stmt in child.get("children", []):
-                    self._visit(stmt)
-                self.symbol_table.pop_scope()
-
-    def _visit_Printf(self, node):
+        self._take_positions(node)
+        self._check_expr(node.condition, node.line)
+        self._visit_scoped("while", node.body)
+
+    def visit_Printf(self, node):
         # Printf — check that all argument identifiers are declared
-        for child in node.get("children", []):
-            if child.get("type") != "Format":
-                self._check_used_variables(child)
+        self._take_positions(node)
+        for arg in node.args:
+            self._check_expr(arg, node.line)
 
-    def _visit_Scanf(self, node):
+    def visit_Scanf(self, node):
         # Scanf — check that all referenced variables are declared
-        for child in node.get("children", []):
-            if child.get("type") == "Ref":
-                label = child.get("label", "")
-                if label.startswith("&"):
-                    var_name = label[1:]
-                    if not self.symbol_table.lookup(var_name):
-                        line = node.get("line")
-                        self._error(f"Variable '{var_name}' used without declaration", line)
-
-    def _visit_Return(self, node):
+        starts = getattr(node, "var_starts", None) or [None] * len(node.vars_)
+        for var_name, start in zip(node.vars_, starts):
+            sym = self.symbol_table.lookup(var_name)
+            if sym is None:
+                self._error(f"Variable '{var_name}' used without declaration", node.line)
+            else:
+                self.xref.use(sym, _name_span(node.line, var_name, start))
+
+    def visit_Return(self, node):
         # Return — check that any returned identifiers are declared
-        for child in node.get("children", []):
-            self._check_used_variables(child)
+        self._take_positions(node)
+        if node.expr is not None:
+            self._check_expr(node.expr, node.line)
 
-    def _visit_PostfixStmt(self, node):
+    def visit_PostfixStmt(self, node):
         # Postfix e.g. i++ — check identifier is declared
-        label = node.get("label", "")
-        line = node.get("line")
-        # label format: "Postfix (name++)" or "Postfix (name--)"
-        if label.startswith("Postfix (") and label.endswith(")"):
-            inner = label[9:-1]
-            name = inner.rstrip("+-")
-            if name and not self.symbol_table.lookup(name):
-                self._error(f"Variable '{name}' used without declaration", line)
-
-    def _visit_PrefixStmt(self, node):
+        sym = self.symbol_table.lookup(node.name)
+        if sym is None:
+            self._error(f"Variable '{node.name}' used without declaration", node.line)
+        else:
+            self.xref.use(sym, _name_span(node.line, node.name, node.start))
+
+    def visit_PrefixStmt(self, node):
         # Prefix e.g. ++i — check identifier is declared
-        label = node.get("label", "")
-        line = node.get("line")
-        if label.startswith("Prefix (") and label.endswith(")"):
-            inner = label[8:-1]
-            name = inner.lstrip("+-")
-            if name and not self.symbol_table.lookup(name):
-                self._error(f"Variable '{name}' used without declaration", line)
-
-    # --- Helper: check identifiers used in expressions ---
-
-    def _check_used_variables(self, expr):
-        # Recursively check that all identifiers in an expression are declared
-        if not expr or not isinstance(expr, dict):
-            return
+        sym = self.symbol_table.lookup(node.name)
+        if sym is None:
+            self._error(f"Variable '{node.name}' used without declaration", node.line)
+        else:
+            self.xref.use(sym, _name_span(node.line, node.name, getattr(node, "name_start", None)))
+
+    # --- Helper: one pass over an expression ---
+
+    def _check_expr(self, expr, line):
+        # Post-order walk that reports undeclared identifiers and returns the inferred type
+        # ('int', 'float', 'string' or None), with an explicit stack so long operator chains
+        # don't recurse. A hash-consed node can recur across statements, so its result (type,
+        # and the error or symbol of each identifier in it) is memoized until a declaration or
+        # scope exit changes what its names resolve to; a replay takes this occurrence's
+        # identifier positions from the statement. Only nodes with an operator below them are
+        # cached; a leaf-only one is cheaper to recheck than to look up
+        leaves = self._leaves
+        leaves.clear()           # memo entries only slice what this call adds
+        if expr.node_type not in _OPERATORS:
+            return self._leaf_type(expr, line)
+
+        memo   = self._memo
+        types  = []       # inferred types of the finished subexpressions
+        open_  = []       # (operator, memo mark) waiting for its operand types
+        stack  = [expr]   # None = finish the innermost open operator
+        counts = self._counts
+
+        while stack:
+            node = stack.pop()
+
+            if node is None:
+                node, mark = open_.pop()
+                if node.node_type == "BinaryOp":
+                    right_t = types.pop()
+                    result  = _binary_type(types.pop(), right_t)
+                else:
+                    result = types.pop()
+                if mark is not None:
+                    memo[id(node)] = (self._generation, result, leaves[mark:])
+                types.append(result)
+                continue
+
+            etype = node.node_type
+            if etype not in _OPERATORS:
+                types.append(self._leaf_type(node, line))
+                continue
+            if counts is not None:
+                counts[etype] += 1
+
+            if etype == "BinaryOp":
+                left, right = node.left, node.right
+                if left.node_type not in _OPERATORS and right.node_type not in _OPERATORS:
+                    left_t = self._leaf_type(left, line)
+                    types.append(_binary_type(left_t, self._leaf_type(right, line)))
+                    continue
+                operands = (right, left)
+            else:
+                operands = (node.operand,)
+                if node.operand.node_type not in _OPERATORS:
+                    types.append(self._leaf_type(node.operand, line))
+                    continue
+
+            mark = None
+            if getattr(node, "structural_hash", None) is not None:
+                cached = memo.get(id(node))
+                if cached is not None and cached[0] == self._generation:
+                    for message, symbol_id in cached[2]:
+                        span = self._span(line)
+                        if message is None:
+                            self._log_use((symbol_id, span))
+                        else:
+                            self._error(message, span[0])
+                    leaves.extend(cached[2])
+                    types.append(cached[1])
+                    continue
+                mark = len(leaves)
+
+            open_.append((node, mark))
+            stack.append(None)
+            stack.extend(operands)
+
+        return types[0]
+
+    def _leaf_type(self, expr, line):
+        # Type of a non-operator expression, reporting it if it is an undeclared identifier
+        etype = expr.node_type
+        if self._counts is not None:
+            self._counts[etype] += 1
 
-        if expr.get("type") == "Identifier":
-            name = expr.get("name")
-            line = expr.get("line")
-            if name and not self.symbol_table.lookup(name):
-                self._error(f"Variable '{name}' used without declaration", line)
-            return
+        if etype == "Identifier":
+            span = self._span(line) if expr.line is None else (expr.line, expr.start, expr.end)
+            sym  = self.symbol_table.lookup(expr.name)
+            if sym is None:
+                message = f"Variable '{expr.name}' used without declaration"
+                self._error(message, span[0])
+                self._leaves.append((message, None))
+                return None
+            self._log_use((sym.symbol_id, span))
+            self._leaves.append((None, sym.symbol_id))
+            return sym.var_type
+
+        if etype == "Number":
+            return "float" if "." in str(expr.value) else "int"
 
-        for child in expr.get("children", []):
-            self._check_used_variables(child)
+        if etype == "String":
+            return "string"
 
-    # --- Helper: type mismatch detection ---
+        return None
 
-    def _check_type_mismatch(self, var_name, var_type, expr, line):
-        # Check if the RHS expression type conflicts with the declared type
-        if not expr or not isinstance(expr, dict):
-            return
+    # --- Helper: type mismatch detection ---
 
-        rhs_type = self._infer_expr_type(expr)
+    def _check_assignment(self, var_name, var_type, expr, line):
+        # Check the RHS once; a type mismatch is listed before the RHS's undeclared names
+        mark = len(self.errors)
+        rhs_type = self._check_expr(expr, line)
         if rhs_type is None:
             return
 
         if var_type in ("int", "char") and rhs_type == "float":
-            self._error(
-                f"Type mismatch: cannot assign float value to '{var_name}' (declared as {var_type})",
-                line,
-            )
+            self.errors.insert(mark, {
+                "message": f"Type mismatch: cannot assign float value to '{var_name}' (declared as {var_type})",
+                "line": line,
+            })
         elif var_type == "char" and rhs_type == "int":
             pass  # Allow int-to-char in subset C
-
-    def _infer_expr_type(self, expr):
-        # Infer the type of a simple expression — returns 'int', 'float', or None
-        if not expr or not isinstance(expr, dict):
-            return None
-
-        etype = expr.get("type")
-
-        if etype == "Number":
-            val = str(expr.get("value", ""))
-            return "float" if "." in val else "int"
-
-        if etype == "String":
-            return "string"
-
-        if etype == "Identifier":
-            name = expr.get("name")
-            sym = self.symbol_table.lookup(name)
-            return sym.var_type if sym else None
-
-        if etype == "BinaryOp":
-            left_t = self._infer_expr_type(expr.get("children", [None])[0] if expr.get("children") else None)
-            right_t = self._infer_expr_type(expr.get("children", [None, None])[1] if len(expr.get("children", [])) > 1 else None)
-            if left_t == "float" or right_t == "float":
-                return "float"
-            if left_t == "int" or right_t == "int":
-                return "int"
-            return left_t or right_t
-
-        if etype == "UnaryOp":
-            children = expr.get("children", [])
-            if children:
-                return self._infer_expr_type(children[0])
-
-        return None
@@ -8,9 +8,11 @@ class Symbol:
         self.var_type = var_type
         self.scope = scope
         self.line = line
+        self.symbol_id = None   # set by the cross-reference index (see xref.py)
 
     def to_dict(self):
         return {
+            "id": self.symbol_id,
             "name": self.name,
             "type": self.var_type,
             "scope": self.scope,
@@ -79,3 +81,64 @@ class SymbolTable:
     def all_symbols(self):
         # Return flat list of all declared symbols as dicts
         return [s.to_dict() for s in self._all_symbols]
+
+
+class ShadowSymbolTable:
+    # Same API as SymbolTable with O(1) lookup: one dict maps each name to the stack of its
+    # visible declarations (innermost last), and each scope keeps an undo log of the names it
+    # declared so pop_scope removes exactly those
+    def __init__(self):
+        self._bindings = {}      # name -> [(scope id, Symbol), ...]
+        self._scopes = []        # (scope id, scope name, names declared in it)
+        self._next_id = 0
+        self._all_symbols = []
+
+    def push_scope(self, name="block"):
+        # Push a new scope onto the stack
+        self._scopes.append((self._next_id, name, []))
+        self._next_id += 1
+
+    def pop_scope(self):
+        # Pop the top scope, unshadowing whatever it declared
+        if not self._scopes:
+            return
+        _, _, declared = self._scopes.pop()
+        bindings = self._bindings
+        for name in declared:
+            shadows = bindings[name]
+            shadows.pop()
+            if not shadows:
+                del bindings[name]
+
+    def current_scope_name(self):
+        # Return label of the current (top) scope
+        return self._scopes[-1][1] if self._scopes else "unknown"
+
+    def declare(self, name, var_type, line):
+        # Declare a variable in the current scope; returns error string or None
+        if not self._scopes:
+            return f"Internal error: no active scope for '{name}'"
+
+        scope_id, scope_name, declared = self._scopes[-1]
+        shadows = self._bindings.get(name)
+        if shadows and shadows[-1][0] == scope_id:
+            existing = shadows[-1][1]
+            return f"Variable '{name}' already declared in {scope_name} scope (first declared at line {existing.line})"
+
+        sym = Symbol(name, var_type, scope_name, line)
+        if shadows is None:
+            self._bindings[name] = [(scope_id, sym)]
+        else:
+            shadows.append((scope_id, sym))
+        declared.append(name)
+        self._all_symbols.append(sym)
+        return None
+
+    def lookup(self, name):
+        # Innermost visible declaration, or None — independent of nesting depth
+        shadows = self._bindings.get(name)
+        return shadows[-1][1] if shadows else None
+
+    def all_symbols(self):
+        # Return flat list of all declared symbols as dicts
+        return [s.to_dict() for s in self._all_symbols]
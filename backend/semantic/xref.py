@@ -0,0 +1,100 @@
+# Symbol cross-reference index — built by SemanticAnalyzer during its walk
+#
+# Every declared symbol gets an integer id (its position in declaration order, the same
+# order as the symbol table listing). For each id the index keeps the declaration's span and
+# the spans of the uses that resolved to it; positions map back to ids, so "what does the
+# name under the cursor refer to" and "highlight every use" are lookups, not tree walks.
+# A span is (line, start offset, end offset) of the name itself — a declaration's span is its
+# declarator's name, not the whole statement. Offsets are None where the parser recorded none
+# (a tree packed into an ASTArena keeps no name offsets), and the line is then the statement's.
+#
+# The walk only appends (symbol id, span) pairs to `log`; the per-symbol use lists and the
+# offset maps are built from it on the first query.
+
+from bisect import bisect_right
+
+
+class CrossReference:
+
+    __slots__ = ('symbols', 'definitions', 'log', '_uses', '_at', '_starts', '_indexed')
+
+    def __init__(self):
+        self.symbols     = []   # symbol id -> Symbol
+        self.definitions = []   # symbol id -> span of its declaration
+        self.log         = []   # (symbol id, span) per resolved use, in walk order
+        self._uses       = []   # symbol id -> [span, ...]                  } built from log
+        self._at         = {}   # start offset -> symbol id (use -> def)    } by _index()
+        self._starts     = None # sorted (start, end, id) of uses and declarations
+        self._indexed    = 0    # log entries and definitions already indexed
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def define(self, symbol, span):
+        # Register a freshly declared symbol; returns its id
+        symbol_id = symbol.symbol_id = len(self.symbols)
+        self.symbols.append(symbol)
+        self.definitions.append(span)
+        return symbol_id
+
+    def use(self, symbol, span):
+        # Record a use that resolved to `symbol`
+        self.log.append((symbol.symbol_id, span))
+
+    def _index(self):
+        if self._indexed == len(self.log) + len(self.definitions):
+            return
+        uses, at = [[] for _ in self.symbols], {}
+        for symbol_id, span in enumerate(self.definitions):
+            if span[1] is not None:
+                at[span[1]] = symbol_id
+        for symbol_id, span in self.log:
+            uses[symbol_id].append(span)
+            if span[1] is not None:
+                at[span[1]] = symbol_id
+        self._uses, self._at, self._starts = uses, at, None
+        self._indexed = len(self.log) + len(self.definitions)
+
+    def uses(self, symbol_id):
+        # Spans of a symbol's uses, in walk order
+        self._index()
+        return self._uses[symbol_id]
+
+    def symbol_at(self, offset):
+        # Id of the symbol declared or used at a source offset, or None. An exact start is one
+        # dict lookup; otherwise the recorded span containing the offset wins
+        self._index()
+        symbol_id = self._at.get(offset)
+        if symbol_id is not None:
+            return symbol_id
+
+        if self._starts is None:
+            spans  = [(d[1], d[2], i) for i, d in enumerate(self.definitions) if d[1] is not None]
+            spans += [(u[1], u[2], i) for i, u in self.log if u[1] is not None]
+            self._starts = sorted(spans)
+
+        # Spans are names, which never overlap: only the nearest one starting at or before the
+        # offset can contain it
+        spans = self._starts
+        k     = bisect_right(spans, (offset, float('inf'))) - 1
+        if k >= 0:
+            start, end, symbol_id = spans[k]
+            if start <= offset < end:
+                return symbol_id
+        return None
+
+    def references(self, symbol_id):
+        # The symbol, its declaration and all its uses as a JSON-ready dict (None if unknown)
+        if not 0 <= symbol_id < len(self.symbols):
+            return None
+        return {
+            "symbolId":   symbol_id,
+            "symbol":     self.symbols[symbol_id].to_dict(),
+            "definition": _span_dict(self.definitions[symbol_id]),
+            "uses":       [_span_dict(span) for span in self.uses(symbol_id)],
+        }
+
+
+def _span_dict(span):
+    line, start, end = span
+    return {"line": line, "start": start, "end": end}
@@ -0,0 +1,225 @@
+# Assertion-based intermediate code generation tests — run from backend/ folder with pytest
+
+from lexer.tokenizer import Tokenizer
+from parser.parser import CParser
+from icg.icg_generator import ICGGenerator
+
+t = Tokenizer()
+
+
+def parse(code):
+    return CParser(t.tokenize_stream(code), trace='off').parse_tree()['tree']
+
+
+def generate(code):
+    return ICGGenerator().generate(parse(code))
+
+
+def test_statements_and_expressions():
+    result = generate("int a = 1 + 2 * 3;\nwhile (a < 10) { a++; }\nprintf(\"%d\", -a);\nscanf(\"%d\", &a);")
+    assert result['tac'] == [
+        't1 = 2 * 3',
+        't2 = 1 + t1',
+        'a = t2',
+        'L1:',
+        't3 = a < 10',
+        'ifFalse t3 goto L2',
+        't4 = a + 1',
+        'a = t4',
+        'goto L1',
+        'L2:',
+        't5 = uminus a',
+        'call printf, ""%d"", t5',
+        'call scanf, ""%d"", &a',
+    ]
+    assert len(result['quadruples']) == len(result['tac'])
+    assert result['quadruples'][0] == {'op': '*', 'arg1': '2', 'arg2': '3', 'result': 't1'}
+
+
+def test_if_else_labels():
+    result = generate("int a; if (a == 1) { a = 2; } else { --a; }")
+    assert result['tac'] == [
+        't1 = a == 1',
+        'ifFalse t1 goto L1',
+        'a = 2',
+        'goto L2',
+        'L1:',
+        't2 = a - 1',
+        'a = t2',
+        'L2:',
+    ]
+
+
+def test_visitor_dispatch_hooks_and_profiling():
+    from semantic.semantic_analyzer import SemanticAnalyzer
+
+    tree = CParser(t.tokenize_stream("int a = 1 + 2;\nif (a) { a++; } else { printf(\"%d\", a); }"),
+                   trace='off').parse_tree()['tree']
+
+    class Tracing(ICGGenerator):
+        def pre_visit(self, node):
+            self.events.append('+' + node.node_type)
+
+        def post_visit(self, node, result):
+            self.events.append('-' + node.node_type)
+
+    assert set(ICGGenerator._dispatch) >= {'Program', 'BinaryOp', 'If', 'PostfixStmt'}
+    tracing = Tracing()
+    tracing.events = []
+    assert tracing.generate(tree) == generate("int a = 1 + 2;\nif (a) { a++; } else { printf(\"%d\", a); }")
+    # Operands inside an operator subtree are walked by the expression engine, not dispatched;
+    # a block's post_visit waits for its deferred statements
+    assert tracing.events[:5] == ['+Program', '+VarDecl', '+BinaryOp', '-BinaryOp', '-VarDecl']
+    assert tracing.events[-3:] == ['-Printf', '-If', '-Program']
+
+    gen = ICGGenerator()
+    gen.profile()
+    gen.generate(tree)
+    # Operands the expression engine walks count too, so every node is counted once
+    counts = {'Program': 1, 'VarDecl': 1, 'BinaryOp': 1, 'Number': 2, 'If': 1,
+              'Identifier': 2, 'PostfixStmt': 1, 'Printf': 1}
+    assert gen.node_counts == counts
+    analyzer = SemanticAnalyzer()
+    analyzer.profile()
+    analyzer.analyze(tree)
+    assert analyzer.node_counts == counts
+    gen.profile(False)
+    gen.generate(tree)
+    assert gen.node_counts['Program'] == 1
+
+
+def test_deep_nesting_and_long_chains_do_not_recurse():
+    from parser.ast_nodes import ProgramNode, IfNode, WhileNode, AssignNode, IdentNode, NumberNode
+    from semantic.semantic_analyzer import SemanticAnalyzer
+    from semantic.symbol_table import ShadowSymbolTable
+
+    depth = 100_000
+    body  = [AssignNode('a', NumberNode('1', depth + 1), depth + 1)]
+    for d in range(depth, 0, -1):
+        body = [(IfNode if d % 2 else WhileNode)(IdentNode('a', d), body, line=d)]
+    tree   = ProgramNode(body)
+    result = ICGGenerator().generate(tree)
+    assert len(result['tac']) == 2 * (depth // 2) + 4 * (depth // 2) + 1   # if: 2 lines, while: 4
+    assert result['tac'][-1] == 'L1:'
+    # The scope-stack table's lookups walk every enclosing scope; the shadow table's don't
+    errors = SemanticAnalyzer(ShadowSymbolTable).analyze(tree)['semantic_errors']
+    assert len(errors) == depth + 1 and errors[-1]['line'] == depth + 1
+
+    chain = CParser(t.tokenize_stream('int a = 1;\na = ' + ' + '.join(['a'] * depth) + ' - ' + '- ' * depth + 'a;'),
+                    trace='off').parse_tree()['tree']
+    tac = ICGGenerator().generate(chain)['tac']
+    assert len(tac) == 2 * depth + 2
+    assert tac[depth - 1:depth + 1] == [f't{depth - 1} = t{depth - 2} + a', f't{depth} = uminus a']
+    assert tac[-2:] == [f't{2 * depth} = t{depth - 1} - t{2 * depth - 1}', f'a = t{2 * depth}']
+    assert SemanticAnalyzer().analyze(chain)['semantic_errors'] == []
+
+
+def test_instruction_buffer_renders_on_demand():
+    from icg.ir import OPCODES
+
+    code = "int a = 1 + 2;\nwhile (a < 10) { a = a + 2; }\nprintf(\"%d\", a * 2);"
+    tree = CParser(t.tokenize_stream(code), trace='off').parse_tree()['tree']
+    ir = ICGGenerator().generate_ir(tree)
+    full = generate(code)
+
+    assert len(ir) == len(full['tac']) and ir.temps == 4
+    assert ir.pool.count("a") == 1 and ir.pool.count("2") == 1      # operands are pooled once
+    assert all(not name.startswith("t") for name in ir.pool)        # temps are not stored as text
+    assert OPCODES[ir.ops[0]] == "+" and ir.operand(ir.result[0]) == "t1"
+    assert list(ir.iter_tac()) == ir.tac() == full['tac']
+    assert list(ir.iter_quadruples()) == ir.quadruples() == full['quadruples']
+    assert [ir.tac_line(i) for i in range(len(ir))] == full['tac']
+    assert ICGGenerator().generate(tree, views=("tac",)) == {'tac': full['tac']}
+
+
+def test_control_flow_graph_blocks_dominators_and_loops():
+    from icg.cfg import ControlFlowGraph
+
+    code = ("int a = 0;\nwhile (a < 10) {\n  if (a == 5) { a = a + 2; } else { a++; }\n"
+            "  while (a > 20) { a--; }\n}\nreturn a;\nprintf(\"%d\", a);")
+    tree = CParser(t.tokenize_stream(code), trace='off').parse_tree()['tree']
+    ir = ICGGenerator().generate_ir(tree)
+    cfg = ControlFlowGraph.build(ir).to_dict()
+    blocks = cfg['blocks']
+
+    # Leaders: first instruction, labels, and whatever follows a jump or return
+    assert [(b['start'], b['end']) for b in blocks] == [
+        (0, 1), (1, 4), (4, 6), (6, 9), (9, 12), (12, 13), (13, 16), (16, 19), (19, 21), (21, 23), (23, 24),
+    ]
+    assert [b['successors'] for b in blocks] == [[1], [2, 9], [3, 4], [5], [5], [6], [7, 8], [6], [1], [], []]
+    assert [b['predecessors'] for b in blocks] == [[], [0, 8], [1], [2], [2], [3, 4], [5, 7], [6], [6], [1], []]
+    # The code after "return" is unreachable and has no dominator
+    assert [b['idom'] for b in blocks] == [None, 0, 1, 2, 2, 2, 5, 6, 6, 1, None]
+    assert cfg['loops'] == [
+        {'header': 1, 'latches': [8], 'blocks': [1, 2, 3, 4, 5, 6, 7, 8]},
+        {'header': 6, 'latches': [7], 'blocks': [6, 7]},
+    ]
+    assert ControlFlowGraph.build(ICGGenerator().generate_ir(None)).to_dict() == {
+        'entry': None, 'blocks': [], 'loops': [],
+    }
+
+
+def test_local_value_numbering():
+    code = ('int a; int b; scanf("%d %d", &a, &b);\nint c = 2 * 3 + a * 1;\nint d = (a + b) * (b + a);\n'
+            'printf("%d", 4 - 1, a + 0);\nwhile (1) { c = c + 0; d = (0 + a) * (++a); }')
+    result = generate(code)
+    folded = ICGGenerator().generate(parse(code), views=("tac",), optimize="fold")
+    lvn = ICGGenerator().generate(parse(code), optimize="lvn")
+
+    assert folded['tac'] == result['tac'] and 'optimized' not in result
+    assert lvn['optimized']['tac'] == [
+        'call scanf, ""%d %d"", &a, &b',
+        't3 = 6 + a',                         # 2 * 3 folded, a * 1 -> a
+        'c = t3',
+        't4 = a + b',
+        't6 = t4 * t4',                       # b + a is a + b
+        'd = t6',
+        't7 = 3',                             # named in printf's arguments: folded, not dropped
+        't8 = a',
+        'call printf, ""%d"", t7, t8',
+        'L1:',                                # ifFalse 1 never jumps; c = c + 0 is gone
+        't11 = a + 1',
+        't10 = a',                            # 0 + a still has to read a before ++a stores
+        'a = t11',
+        't12 = t10 * t11',
+        'd = t12',
+        'goto L1',
+        'L2:',
+    ]
+    assert len(lvn['optimized']['quadruples']) == len(lvn['optimized']['tac'])
+    assert lvn['optimized']['report'] == {
+        'level': 'lvn', 'before': 23, 'after': 17, 'removed': 6,
+        'folded': 2, 'identities': 3, 'commonSubexpressions': 1,
+    }
+    assert folded['optimized']['report']['removed'] == 5 and 't5 = b + a' in folded['optimized']['tac']
+    assert set(folded['optimized']) == {'tac', 'report'}
+
+    # A store only changes values from there on: a + b after "a = 5" is not the earlier a + b
+    optimized = ICGGenerator().generate(parse('int a; int b; scanf("%d", &a);\n'
+                                              'int c = a + b; a = 5; int d = a + b;'), optimize="lvn")['optimized']
+    assert optimized['tac'][-2:] == ['t2 = a + b', 'd = t2'] and optimized['report']['removed'] == 0
+
+    # A constant stored into a variable takes the variable's type, so it is not folded on
+    # through it: f / 2 is 3.5 for a float f, i * 2 is 4 for an int i = 2.5
+    typed = ICGGenerator().generate(parse('float f = 7; float g = f / 2;\nint i = 2.5; int j = i * 2;'),
+                                    views=("tac",), optimize="lvn")
+    assert typed['optimized']['tac'] == typed['tac'] == [
+        'f = 7', 't1 = f / 2', 'g = t1', 'i = 2.5', 't2 = i * 2', 'j = t2']
+
+    # --7 stores into the constant 7 — code like that is left as it is
+    invalid = ICGGenerator().generate(parse('int a = --7; int b = 7 + 0;'), views=("tac",), optimize="lvn")
+    assert invalid['optimized']['tac'] == invalid['tac'] and invalid['optimized']['report']['removed'] == 0
+
+
+def test_variables_named_like_labels_keep_their_own_operand():
+    # Labels are L1, L2, ...; variables L0 and L1 must not share the pool entry of label L1
+    from icg.ir import OP_LABEL
+
+    code = "int L0 = 5;\nint L1 = L0;\nif (L1 > 0) { L0 = L1; }"
+    ir   = ICGGenerator().generate_ir(parse(code))
+    assert ir.tac() == ['L0 = 5', 'L1 = L0', 't1 = L1 > 0', 'ifFalse t1 goto L1', 'L0 = L1', 'L1:']
+
+    label = ir.arg1[ir.ops.index(OP_LABEL)]
+    assert ir.result[1] == ir.arg1[2] == ir.arg1[4] != label     # variable L1 throughout
+    assert ir.result[0] == ir.arg1[1] == ir.result[4]            # variable L0 throughout
+    assert ir.result[3] == label and ir.pool.count("L1") == 2
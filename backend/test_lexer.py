@@ -0,0 +1,179 @@
+# Assertion-based lexer tests — run from backend/ folder with pytest
+
+from lexer.tokenizer import Tokenizer
+
+t = Tokenizer()
+
+
+def triples(tokens):
+    return [(tok.type, tok.value, tok.line) for tok in tokens]
+
+
+def test_basic_statement():
+    assert triples(t.tokenize("int a = 5;")) == [
+        ('KEYWORD', 'int', 1), ('IDENTIFIER', 'a', 1), ('OPERATOR', '=', 1),
+        ('NUMBER', '5', 1), ('SEPARATOR', ';', 1),
+    ]
+
+
+def test_line_numbers_and_comments():
+    code = 'int a; // trailing\r\n\nprintf("x\\"y", a);\n/* one */ b++;'
+    assert triples(t.tokenize(code)) == [
+        ('KEYWORD', 'int', 1), ('IDENTIFIER', 'a', 1), ('SEPARATOR', ';', 1),
+        ('KEYWORD', 'printf', 3), ('SEPARATOR', '(', 3), ('STRING', '"x\\"y"', 3),
+        ('SEPARATOR', ',', 3), ('IDENTIFIER', 'a', 3), ('SEPARATOR', ')', 3),
+        ('SEPARATOR', ';', 3),
+        ('IDENTIFIER', 'b', 4), ('OPERATOR', '++', 4), ('SEPARATOR', ';', 4),
+    ]
+
+
+def test_block_comment_spans_lines():
+    code = "int a;\n/* first\n   second\n*/ a = 1;"
+    assert triples(t.tokenize(code))[3:] == [
+        ('IDENTIFIER', 'a', 4), ('OPERATOR', '=', 4),
+        ('NUMBER', '1', 4), ('SEPARATOR', ';', 4),
+    ]
+
+
+def test_unknown_and_unterminated():
+    code = 'a @ "open\nb'
+    assert triples(t.tokenize(code)) == [
+        ('IDENTIFIER', 'a', 1), ('UNKNOWN', '@', 1), ('UNKNOWN', '"', 1),
+        ('IDENTIFIER', 'open', 1), ('IDENTIFIER', 'b', 2),
+    ]
+
+
+def test_token_stream_matches_tokens():
+    code   = 'int x = 3.5;\nprintf("%d", x); @'
+    stream = t.tokenize_stream(code)
+    assert len(stream) == len(t.tokenize(code))
+    assert stream.to_dicts() == t.tokenize_to_dict(code)
+    assert (stream.type_name(3), stream.value(3), stream.line(3)) == ('NUMBER', '3.5', 1)
+    assert stream.types.itemsize == 1 and stream.starts.itemsize == 4
+
+
+def test_token_stream_from_dicts_round_trip():
+    from lexer.token_stream import TokenStream
+    dicts = t.tokenize_to_dict('while (a != 0) {\n  a--;\n}')
+    strip = lambda ds: [(d['type'], d['value'], d['line']) for d in ds]
+    assert strip(TokenStream.from_dicts(dicts).to_dicts()) == strip(dicts)
+
+
+def test_iter_tokens_across_chunk_boundaries():
+    code = ('int total = 12;\n/* block\n comment */ float x = 3.25;\n'
+            'printf("a \\"quoted\\" str", total); // tail\nx = x >= 10;\n"open')
+    expected = triples(t.tokenize(code))
+    for lexer in (t, Tokenizer(engine='dfa')):
+        for size in range(1, len(code) + 1):
+            chunks = [code[i:i + size] for i in range(0, len(code), size)]
+            assert triples(lexer.iter_tokens(chunks)) == expected, (lexer.engine, size)
+
+
+def test_iter_tokens_reads_file_objects():
+    import io
+    code = "while (i <= 100) {\n    i++;\n}\n" * 50
+    streamed = list(t.iter_tokens(io.StringIO(code), chunk_size=7))
+    assert [tok.to_dict() for tok in streamed] == t.tokenize_to_dict(code)
+
+
+def test_tokenize_file_matches_str_path(tmp_path):
+    from lexer.line_index import LineIndex
+    code = 'int café = 1; /* ünïcode\n comment */\nprintf("€ %d", café);\r\n'
+    path = tmp_path / "main.c"
+    path.write_bytes(code.encode('utf-8'))
+    stream = t.tokenize_file(str(path))
+    try:
+        assert stream.to_dicts() == t.tokenize_to_dict(code)
+        assert stream.to_dicts(LineIndex(stream.source)) == t.tokenize_stream(code).to_dicts(LineIndex(code))
+        assert stream.value(1) == 'caf'
+    finally:
+        stream.close()
+
+
+def test_tokenize_empty_file(tmp_path):
+    path = tmp_path / "empty.c"
+    path.write_bytes(b'')
+    assert len(t.tokenize_file(str(path))) == 0
+
+
+def _stream_key(stream):
+    return (stream.source, list(stream.types), list(stream.starts),
+            list(stream.ends), list(stream.lines))
+
+
+def test_incremental_edits_match_full_tokenize():
+    from lexer.incremental import IncrementalLexer
+    for engine in ('regex', 'dfa'):
+        _check_incremental_edits(IncrementalLexer(Tokenizer(engine=engine)))
+
+
+def _check_incremental_edits(inc):
+    code = 'int a = 1;\nfloat b = 2.5;\nwhile (a < 10) {\n    a = a + 1;\n}\nprintf("%d", a);\n'
+    edits = [
+        (4, 1, 'abc'),                 # rename a declaration
+        (0, 0, '/* header\n*/\n'),     # prepend a two-line comment
+        (20, 0, '\n\n'),               # insert blank lines mid-file
+        (30, 3, ''),                   # delete across tokens
+        (1, 0, '/*'),                  # open a comment that closes nowhere
+    ]
+    stream = inc.tokenize(code)
+    for offset, deleted, inserted in edits:
+        code   = code[:offset] + inserted + code[offset + deleted:]
+        stream = inc.apply_edit(stream, offset, deleted, inserted)
+        assert _stream_key(stream) == _stream_key(t.tokenize_stream(code))
+
+
+def test_incremental_edit_rescans_locally():
+    from lexer.incremental import IncrementalLexer
+    inc    = IncrementalLexer(t)
+    code   = "int a = 1;\n" * 1000
+    stream = inc.apply_edit(inc.tokenize(code), 5500, 1, 'b')
+    assert inc.last_rescanned <= 10
+    assert stream.to_dicts() == t.tokenize_to_dict(code[:5500] + 'b' + code[5501:])
+
+
+def test_dfa_engine_matches_regex_engine():
+    import random
+    dfa   = Tokenizer(engine='dfa')
+    rng   = random.Random(6)
+    alpha = list('ab1 2.\t\n\r"\\/*+-=<>!;{}(),&@_é') + \
+        ['/*', '*/', '//', 'int', '"s"', '3.5', 'while', 'ifx', 'printf']
+    for _ in range(3000):
+        code = ''.join(rng.choice(alpha) for _ in range(rng.randint(0, 50)))
+        assert dfa.tokenize_to_dict(code) == t.tokenize_to_dict(code), repr(code)
+
+
+def test_dfa_engine_on_adversarial_input():
+    dfa = Tokenizer(engine='dfa')
+    for code in ('/* ' * 2000, '"\\' * 2000 + '\n', '1.' * 2000):
+        assert dfa.tokenize_to_dict(code) == t.tokenize_to_dict(code)
+
+
+def test_engine_selection(monkeypatch):
+    import pytest
+    monkeypatch.setenv('CPARSER_LEXER_ENGINE', 'dfa')
+    assert Tokenizer().engine == 'dfa'
+    assert Tokenizer(engine='regex').engine == 'regex'
+    with pytest.raises(ValueError):
+        Tokenizer(engine='lalr')
+
+
+def test_tokenize_many_matches_serial():
+    sources = [f"int v{i} = {i};\nwhile (v{i} > 0) {{ v{i}--; }}" for i in range(40)]
+    streams = t.tokenize_many(sources, workers=2, chunk_size=7)
+    assert [s.to_dicts() for s in streams] == [t.tokenize_to_dict(c) for c in sources]
+    assert t.tokenize_many([], workers=2) == []
+
+
+def test_line_index_positions():
+    from lexer.line_index import LineIndex
+    code  = "int a;\n\n  a = 42;\n"
+    index = LineIndex(code)
+    assert len(index) == 4
+    assert index.offset_to_line_col(0) == (1, 1)
+    assert index.offset_to_line_col(code.index('42')) == (3, 7)
+    assert index.line_span(3) == (8, 17) and code[8:17] == "  a = 42;"
+    assert index.line_span(2) == (7, 7)
+    assert index.line_col_to_offset(3, 7) == code.index('42')
+    cols = [(d['value'], d['col']) for d in t.tokenize_stream(code).to_dicts(index)]
+    assert cols[-4:] == [('a', 3), ('=', 5), ('42', 7), (';', 9)]
@@ -0,0 +1,347 @@
+# Assertion-based parser tests — run from backend/ folder with pytest
+
+from lexer.tokenizer import Tokenizer
+from parser.parser import CParser
+
+t = Tokenizer()
+
+PROGRAM = '''int a = 10;
+float b = 2.5;
+if (a < b) {
+    printf("%d", a);
+} else {
+    a = a + 1;
+}
+while (b != 0) {
+    b = b - 1;
+    a++;
+}
+scanf("%d", &a);
+int r = (a + b) * 2 - -a / 3;
+return r;'''
+
+
+def test_stream_and_dicts_parse_identically():
+    from_dicts  = CParser(t.tokenize_to_dict(PROGRAM)).parse()
+    from_stream = CParser(t.tokenize_stream(PROGRAM)).parse()
+    assert from_dicts['error'] is None
+    assert from_dicts == from_stream
+
+    # Token dicts need not come in line order
+    shuffled = t.tokenize_to_dict("int a;\nint b;")
+    shuffled[0]['line'], shuffled[-1]['line'] = 2, 1
+    assert CParser(shuffled).parse()['ast']['children'][0]['line'] == 2
+
+
+def test_syntax_error_reports_line():
+    result = CParser(t.tokenize_stream("int a = 1;\nint b = 2\nint c;")).parse()
+    assert result['error']['line'] == 3
+    assert result['error']['expected'] == ';'
+    assert result['ast']['children'][-1]['type'] == 'SyntaxError'
+
+
+def test_nodes_carry_source_offsets():
+    code   = "int a = 1;\nwhile (a < 10) {\n    a = a + 2;\n}"
+    result = CParser(t.tokenize_stream(code)).parse()
+    loop   = result['ast']['children'][1]
+    assert code[loop['start']:loop['end']] == "while (a < 10) {\n    a = a + 2;\n}"
+    assign = loop['children'][1]['children'][0]
+    assert code[assign['start']:assign['end']] == "a = a + 2;"
+    rhs = assign['children'][0]
+    assert code[rhs['start']:rhs['end']] == "a + 2"
+
+
+def test_syntax_error_reports_column():
+    code   = "int a = 1;\nint b = 2\nint c;"
+    result = CParser(t.tokenize_stream(code)).parse()
+    error  = result['error']
+    assert (error['line'], error['column']) == (3, 1)
+    assert code[error['start']:error['end']] == "int"
+
+
+def test_trace_levels():
+    stream = t.tokenize_stream(PROGRAM)
+    full   = CParser(stream).parse()
+    stmts  = CParser(stream, trace='statements').parse()
+    off    = CParser(stream, trace='off').parse()
+    assert full['ast'] == stmts['ast'] == off['ast']
+    assert off['trace'] == []
+    assert stmts['trace'][0] == "▶ Parser started"
+    assert "  → WhileStatement (line 8)" in stmts['trace']
+    assert "    ✓ BinaryOp: <" not in stmts['trace']
+    assert set(stmts['trace']) < set(full['trace'])
+
+
+def test_trace_cap():
+    result = CParser(t.tokenize_stream(PROGRAM), trace_cap=3).parse()
+    assert len(result['trace']) == 4
+    assert result['trace'][-1].startswith("… ")
+
+
+def test_unknown_trace_level():
+    try:
+        CParser(t.tokenize_stream(PROGRAM), trace='verbose')
+    except ValueError:
+        pass
+    else:
+        assert False, "expected ValueError"
+
+
+def test_deeply_nested_parentheses():
+    depth  = 20_000
+    code   = "int a = " + "(" * depth + "1 + 2" + ")" * depth + " * 3;"
+    result = CParser(t.tokenize_stream(code), trace='off').parse()
+    assert result['error'] is None
+    init = result['ast']['children'][0]['children'][0]['children'][0]
+    assert init['label'] == 'BinaryOp (*)'
+    assert init['children'][0]['label'] == 'BinaryOp (+)'
+
+
+def test_deeply_nested_blocks():
+    # Blocks nest on the parser's own stack, not the recursion limit
+    depth = 100_000
+    heads = ["if (a) {", "while (a) {", "{", "if (a) { a++; } else {"]
+    code  = "int a;\n" + "\n".join(heads[d % 4] for d in range(depth)) + " a = 1; a = ; " + "}" * depth
+
+    def innermost(tree):
+        node, levels = tree.statements[1], 0
+        while node.node_type != "Assign":
+            kind = node.node_type
+            body = node.statements if kind == "Program" else node.body if kind == "While" else \
+                node.else_body or node.then_body
+            node, levels = body[0], levels + 1
+        return node, levels, body
+
+    result = CParser(t.tokenize_stream(code), trace='off').parse_tree()
+    assert result['error']['line'] == depth + 1 and result['tree'].statements[-1].node_type == "SyntaxError"
+
+    # A recovered error stays in the innermost block
+    result = CParser(t.tokenize_stream(code), trace='off', recover=True).parse_tree()
+    node, levels, body = innermost(result['tree'])
+    assert levels == depth and node.line == depth + 1
+    assert [s.node_type for s in body] == ["Assign", "SyntaxError"] and len(result['errors']) == 1
+
+
+def test_depth_bound_answers_for_shallow_trees():
+    # The parser bounds the tree's depth, so deeper_than() only walks trees that may be deep
+    from parser.ast_nodes import ASTNode
+
+    code = "int a = 1;\nwhile (a < 3) { if (a) { a = a * (a + 1); } else { printf(\"%d\", -a); } }\n" * 50
+    tree = CParser(t.tokenize_stream(code), trace='off', recover=True).parse_tree()['tree']
+    assert tree.depth_bound < 200 and not tree.deeper_than(200)
+    for depth in range(10):
+        assert tree.deeper_than(depth) == ASTNode.deeper_than(tree, depth)
+
+    chain = CParser(t.tokenize_stream("int b = " + " + ".join(["1"] * 300) + ";"), trace='off').parse_tree()['tree']
+    assert chain.depth_bound > 300 and chain.deeper_than(200) and not chain.deeper_than(301)
+
+
+def test_expression_precedence_and_chaining():
+    result = CParser(t.tokenize_stream("int a = -b * c + d / 2 < e - f;")).parse()
+    cmp_   = result['ast']['children'][0]['children'][0]['children'][0]
+    assert cmp_['label'] == 'BinaryOp (<)'
+    add, sub = cmp_['children']
+    assert [add['label'], sub['label']] == ['BinaryOp (+)', 'BinaryOp (-)']
+    assert add['children'][0]['children'][0]['label'] == 'UnaryOp (-)'
+    # Comparisons do not chain
+    assert CParser(t.tokenize_stream("int a = b < c < d;")).parse()['error']['expected'] == ';'
+
+
+def test_every_node_has_a_span():
+    code   = "int a = 1;\nif (a <\n    2) {\n    return\n        a;\n}\n++a; a--;"
+    result = CParser(t.tokenize_stream(code)).parse()
+
+    def walk(node):
+        if 'start' in node:
+            yield node
+        for child in node.get('children', []):
+            yield from walk(child)
+
+    nodes = list(walk(result['ast']))
+    assert all(n['startLine'] is not None and n['end'] is not None for n in nodes)
+    if_node = result['ast']['children'][1]
+    assert (if_node['startLine'], if_node['endLine']) == (2, 6)
+    cond = if_node['children'][0]['children'][0]
+    assert (cond['startLine'], cond['endLine']) == (2, 3)
+    ret = if_node['children'][1]['children'][0]
+    assert ret['type'] == 'Return' and (ret['startLine'], ret['endLine']) == (4, 5)
+    assert [n['type'] for n in result['ast']['children'][2:]] == ['PrefixStmt', 'PostfixStmt']
+
+
+def test_compact_arena_matches_nodes():
+    from parser.arena import ASTArena
+    from semantic.semantic_analyzer import SemanticAnalyzer
+    from icg.icg_generator import ICGGenerator
+
+    stream = t.tokenize_stream(PROGRAM + "\n{ int z; } ++r; r--; int")
+    nodes  = CParser(stream).parse_tree()['tree']
+    arena  = CParser(stream).parse_tree(compact=True)['tree']
+    assert arena.to_dict() == nodes.to_dict()
+    assert SemanticAnalyzer().analyze(arena) == SemanticAnalyzer().analyze(nodes)
+    assert ICGGenerator().generate(arena) == ICGGenerator().generate(nodes)
+    assert len(ASTArena.from_tree(nodes)) == len(arena.arena)
+    assert not hasattr(nodes.statements[0], '__dict__')
+
+
+def test_hash_consing_shares_identical_expressions():
+    from semantic.semantic_analyzer import SemanticAnalyzer
+    from icg.icg_generator import ICGGenerator
+
+    code   = PROGRAM + "\nint s = (a + b) * 2;\nint u = (a + b) * 2 - q;\nprintf(\"%d\", a + \"x\");"
+    stream = t.tokenize_stream(code)
+    plain  = CParser(stream).parse_tree()['tree']
+    shared = CParser(stream, hash_cons=True).parse_tree()['tree']
+
+    s, u = shared.statements[-3].init_expr, shared.statements[-2].init_expr
+    assert s is u.left and s.structural_hash is not None and s.line is None
+    # Positions stay on statements: spans, and one (line, start, end) per identifier
+    assert shared.statements[-2].span == plain.statements[-2].span
+    assert shared.statements[-2].positions[-3:] == (plain.statements[-2].init_expr.right.line,
+                                                    code.rindex('q'), code.rindex('q') + 1)
+    assert SemanticAnalyzer().analyze(shared) == SemanticAnalyzer().analyze(plain)
+    assert ICGGenerator().generate(shared) == ICGGenerator().generate(plain)
+    # Expressions containing a string literal keep their own node and span
+    arg = shared.statements[-1].args[0]
+    assert arg.structural_hash is None and code[arg.start:arg.end] == 'a + "x"'
+
+
+def test_hash_consing_keeps_identifier_lines():
+    # A shared `x * y` recurs across lines; each undeclared use is reported where it occurs
+    from semantic.semantic_analyzer import SemanticAnalyzer
+    code     = "int a = x * y;\nint b = 1 +\n    x * y;\nwhile (b <\n       x * y) {\n    b = b - 1;\n}"
+    shared = CParser(t.tokenize_stream(code), hash_cons=True).parse_tree()['tree']
+    errors = SemanticAnalyzer().analyze(shared)['semantic_errors']
+    assert [(e['line'], e['message'][10]) for e in errors] == [(1, 'x'), (1, 'y'), (3, 'x'), (3, 'y'),
+                                                              (5, 'x'), (5, 'y')]
+    assert shared.statements[1].init_expr.right is shared.statements[0].init_expr
+
+
+def test_reparse_matches_full_parse():
+    edits = [
+        ("a = a + 1;", "a = a + 2;"),             # inside a block, same length
+        ("int r", "int q = 1;\nint r"),           # inserted line shifts later spans
+        ("} else {", "}\nelse {"),                # splits a statement across lines
+        ("b = b - 1;", "b = b - 1"),              # introduces a syntax error
+        ("scanf", "}\nscanf"),                    # unbalanced brace
+    ]
+    for before, after in edits:
+        start    = PROGRAM.index(before)
+        code     = PROGRAM[:start] + after + PROGRAM[start + len(before):]
+        previous = CParser(t.tokenize_stream(PROGRAM), trace='off').parse_tree()['tree']
+        parser   = CParser(t.tokenize_stream(code), trace='off')
+        result   = parser.reparse(previous, (start, start + len(before), start + len(after)))
+        full     = CParser(t.tokenize_stream(code), trace='off').parse_tree()
+        assert result['tree'].to_dict() == full['tree'].to_dict(), before
+        assert result['error'] == full['error']
+        assert parser.reused_count > 0
+
+
+def test_recovery_reports_every_syntax_error():
+    from semantic.semantic_analyzer import SemanticAnalyzer
+    from icg.icg_generator import ICGGenerator
+
+    code   = "int a = 1\nint b = 2\nwhile (a < b) {\n    a = a + ;\n    b = b - 1;\n}\nint c = = 3;\nprintf(\"%d\", a)"
+    stream = t.tokenize_stream(code)
+    result = CParser(stream, recover=True).parse_tree()
+    assert [(e['line'], e['expected']) for e in result['errors']] == \
+        [(2, ';'), (3, ';'), (4, 'expression'), (7, 'expression'), (None, ';')]
+    assert result['error'] == result['errors'][0] == CParser(stream).parse_tree()['error']
+
+    # Missing `;` at a line end keeps the statement; panic mode drops the broken one
+    program = result['tree']
+    assert [s.node_type for s in program.statements] == \
+        ['VarDecl', 'SyntaxError', 'VarDecl', 'SyntaxError', 'While', 'SyntaxError', 'Printf', 'SyntaxError']
+    assert [s.node_type for s in program.statements[4].body] == ['SyntaxError', 'Assign']
+    # Later phases run on what parsed
+    assert SemanticAnalyzer().analyze(program)['semantic_errors'] == []
+    assert ICGGenerator().generate(program)['tac'][-1] == 'call printf, ""%d"", a'
+
+    capped = CParser(stream, recover=True, max_errors=2).parse_tree()
+    assert len(capped['errors']) == 2
+
+    # The error that reaches the cap inside a block still leaves its leaf, as without recovery
+    nested = t.tokenize_stream("int a;\nif (a) {\n    b = ;\n}")
+    for parser in (CParser(nested, recover=True, max_errors=1), CParser(nested)):
+        statements = parser.parse_tree()['tree'].statements
+        assert [s.node_type for s in statements] == ['VarDecl', 'SyntaxError'] and statements[1].line == 3
+    capped = CParser(t.tokenize_stream("while (a) {\n    a = a\n    b = ;\n}"), recover=True, max_errors=2)
+    result = capped.parse_tree()
+    assert [s.message for s in result['tree'].statements] == [e['message'] for e in result['errors']]
+    assert len(result['errors']) == 2
+
+
+def test_depth_limited_serialization_expands_to_full_tree():
+    from parser.ast_cache import CachedTree
+
+    tree   = CParser(t.tokenize_stream(PROGRAM * 3)).parse_tree()['tree']
+    cached = CachedTree(tree, page_size=4)
+    shallow = cached.to_dict(max_depth=1)
+
+    statements = shallow['children']
+    assert len(statements) == 5 and statements[-1]['type'] == 'More'
+    assert statements[-1]['childCount'] == len(tree.statements) - 4
+    if_stub = statements[2]
+    assert if_stub['collapsed'] and if_stub['childCount'] == 3 and if_stub['children'] == []
+
+    def expand(node):
+        # Replace every stub by its expansion, one level at a time
+        if node.get('collapsed'):
+            expanded = cached.expand(node['id'], max_depth=1)
+            if expanded['type'] == 'Page':
+                return [n for child in expanded['children'] for n in expand(child)]
+            return [expand_children(expanded)]
+        return [expand_children(node)]
+
+    def expand_children(node):
+        node['children'] = [n for child in node['children'] for n in expand(child)]
+        return node
+
+    assert expand_children(shallow) == tree.to_dict()
+    assert cached.expand(10_000) is None
+
+    # Collapsing the same nodes and pages again hands out the ids they already have
+    handed_out = len(cached.stubs)
+    again      = cached.to_dict(max_depth=1)
+    assert again['children'][2]['id'] == if_stub['id']
+    assert expand_children(again) == tree.to_dict() and len(cached.stubs) == handed_out
+
+
+def test_scanf_collapses_past_depth_limit():
+    from parser.ast_cache import CachedTree
+
+    tree = CParser(t.tokenize_stream('int a;\nscanf("%d", &a);')).parse_tree()['tree']
+    stub = CachedTree(tree).to_dict(max_depth=1)['children'][1]
+    assert stub['collapsed'] and stub['label'] == 'scanf()' and stub['childCount'] == 2
+
+
+def test_endpoints_cut_deep_trees():
+    # A 2,000-operand chain nests deeper than to_dict() and the JSON encoder can recurse
+    from app import app, MAX_AST_DEPTH
+    client = app.test_client()
+    code   = "int a = 1;\nint b = " + " + ".join(["a"] * 2000) + ";"
+
+    for path in ('/parse', '/analyze'):
+        response = client.post(path, json={'code': code})
+        assert response.status_code == 200, path
+        body = response.get_json()
+        assert body['astTruncated'] and body['astId']
+
+        node, depth = body['ast']['children'][-1], 1      # int b = ..., then down the left operands
+        while not node.get('collapsed'):
+            node, depth = node['children'][0], depth + 1
+        # MAX_AST_DEPTH node levels, plus the display-only "= (init)" entry
+        assert depth == MAX_AST_DEPTH + 1 and node['label'] == 'BinaryOp (+)'
+        expanded = client.post('/ast/expand', json={'astId': body['astId'], 'nodeId': node['id']})
+        assert expanded.status_code == 200
+
+    shallow = client.post('/analyze', json={'code': code, 'ast_depth': 3}).get_json()
+    assert shallow['astTruncated'] is False
+    assert client.post('/parse', json={'code': 'int a;'}).get_json()['astTruncated'] is False
+
+    # Blocks nested past the recursion limit are parsed and cut the same way
+    nested = "int a;\n" + "if (a) {\n" * 2000 + "a = 1;" + "}" * 2000
+    for path in ('/parse', '/analyze'):
+        response = client.post(path, json={'code': nested})
+        assert response.status_code == 200, path
+        body = response.get_json()
+        assert body['parseError'] is None and body['astTruncated']
@@ -0,0 +1,104 @@
+# Assertion-based semantic analysis tests — run from backend/ folder with pytest
+
+from lexer.tokenizer import Tokenizer
+from parser.parser import CParser
+from semantic.semantic_analyzer import SemanticAnalyzer
+
+t = Tokenizer()
+
+
+def analyze(code):
+    tree = CParser(t.tokenize_stream(code), trace='off').parse_tree()['tree']
+    return SemanticAnalyzer().analyze(tree)
+
+
+def test_scopes_and_undeclared_names():
+    result = analyze("int a = 1;\nif (a < 2) {\n    int b = a;\n}\nb = 3;\nz++;\nscanf(\"%d\", &q);")
+    assert [(s['name'], s['scope']) for s in result['symbol_table']] == [('a', 'global'), ('b', 'if')]
+    assert [e['line'] for e in result['semantic_errors']] == [5, 6, 7]
+
+
+def test_type_mismatch_and_redeclaration():
+    result = analyze("int a = 2.5;\nfloat f = 1;\nint a;\n{ int a; }")
+    messages = [e['message'] for e in result['semantic_errors']]
+    assert messages[0].startswith("Type mismatch")
+    assert "already declared in global scope" in messages[1]
+    assert len(messages) == 2
+
+
+def test_shadow_symbol_table_matches_scope_stack():
+    from semantic.symbol_table import SymbolTable, ShadowSymbolTable
+
+    code = ("int a = 1;\nwhile (a < 3) {\n    float a = 2.5;\n    int b = a;\n    if (b) {\n"
+            "        char a;\n        int b;\n        int b;\n    }\n    b = a;\n}\nb = a;\n{ int c; }\nc = 1;")
+    tree = CParser(t.tokenize_stream(code), trace='off').parse_tree()['tree']
+    assert SemanticAnalyzer(ShadowSymbolTable).analyze(tree) == SemanticAnalyzer(SymbolTable).analyze(tree)
+
+    table = ShadowSymbolTable()
+    table.push_scope("global")
+    table.declare("x", "int", 1)
+    table.push_scope("if")
+    table.declare("x", "float", 2)
+    assert table.lookup("x").var_type == "float"
+    assert "already declared in if scope" in table.declare("x", "char", 3)
+    table.pop_scope()
+    assert table.lookup("x").var_type == "int" and table.current_scope_name() == "global"
+    table.pop_scope()
+    assert table.lookup("x") is None
+
+
+def test_shared_subexpressions_rechecked_after_scope_changes():
+    # Hash-consed `b * 2.5` recurs; its cached result must not outlive a declaration of b
+    code = ("int a = b * 2.5;\nfloat b;\nint c = b * 2.5;\nwhile (a) {\n    int b;\n    int d = b * 2.5;\n}\n"
+            "int e = x + 1 + (b * 2.5);\nint f = x + 1 + (b * 2.5);")
+    tree = CParser(t.tokenize_stream(code), trace='off', hash_cons=True).parse_tree()['tree']
+    result = SemanticAnalyzer().analyze(tree)
+    assert result == analyze(code)
+    errors = [(e['line'], e['message'].split(':')[0].split(' used')[0]) for e in result['semantic_errors']]
+    assert errors == [(1, "Type mismatch"), (1, "Variable 'b'"), (3, "Type mismatch"), (6, "Type mismatch"),
+                      (8, "Type mismatch"), (8, "Variable 'x'"), (9, "Type mismatch"), (9, "Variable 'x'")]
+
+
+def test_cross_reference_index():
+    code = "int a = 1;\nwhile (a < 3) {\n    float a = a + 0.5;\n    a++;\n}\na = a * 2;\nscanf(\"%d\", &a);\nb = 1;"
+    tree = CParser(t.tokenize_stream(code), trace='off').parse_tree()['tree']
+    analyzer = SemanticAnalyzer()
+    result = analyzer.analyze(tree)
+    xref = analyzer.xref
+    assert [s['id'] for s in result['symbol_table']] == [0, 1]
+
+    outer, inner = xref.references(0), xref.references(1)
+    assert outer['definition'] == {"line": 1, "start": 4, "end": 5}   # the declared name only
+    assert [code[u['start']:u['end']] for u in outer['uses']] == ['a', 'a', 'a', 'a']
+    assert [u['line'] for u in outer['uses']] == [2, 6, 6, 7]
+    # As in C, the inner a is in scope from its declarator on, so its initializer reads it
+    assert [(u['line'], code[u['start']:u['end']]) for u in inner['uses']] == [(3, 'a'), (4, 'a')]
+
+    assert xref.symbol_at(code.index('a++')) == 1                  # exact use start: dict lookup
+    assert xref.symbol_at(code.index('float a') + 6) == 1          # the inner declaration
+    assert xref.symbol_at(code.index('float')) is None             # its type keyword
+    assert xref.symbol_at(code.index('a = a * 2') + 4) == 0        # a use
+    assert xref.symbol_at(code.index('b = 1')) is None and xref.references(2) is None
+
+    # Prefix steps and scanf targets are spanned by their names too
+    code = 'int x;\n++x;\nscanf("%d %d", &x, &x);'
+    analyzer = SemanticAnalyzer()
+    analyzer.analyze(CParser(t.tokenize_stream(code), trace='off').parse_tree()['tree'])
+    uses = analyzer.xref.references(0)['uses']
+    assert [code[u['start']:u['end']] for u in uses] == ['x', 'x', 'x']
+    assert [u['start'] for u in uses] == [code.index('x;', 7), code.index('&x') + 1, code.rindex('x')]
+
+
+def test_analyze_caches_trees_only_on_request():
+    from app import app
+    client = app.test_client()
+    code   = "int a = 1;\na = a + 1;"
+
+    assert client.post('/analyze', json={'code': code}).get_json()['astId'] is None
+    stubs = client.post('/analyze', json={'code': code, 'ast_depth': 1}).get_json()['astId']
+    assert client.post('/references', json={'astId': stubs, 'symbolId': 0}).status_code == 404
+
+    ast_id = client.post('/analyze', json={'code': code, 'references': True}).get_json()['astId']
+    refs   = client.post('/references', json={'astId': ast_id, 'symbolId': 0}).get_json()
+    assert refs['symbol']['name'] == 'a' and len(refs['uses']) == 2
+    assert client.post('/analyze', json={'code': code, 'references': 1}).status_code == 400